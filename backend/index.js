@@ -167,6 +167,11 @@ app.get('/api/data/rte-forecasts', async (req, res) => {
 });
 
 // ─── Route : Données combinées (OPTIONNEL - pour compatibilité) ──────────────
+// Lue dans dashboard_series (migration 004), tenue à jour par les scripts
+// Python : une seule lecture par index, sans fusion. L'ETag reprend
+// dashboard_version et le début de la fenêtre (aligné sur l'heure) : tant
+// qu'aucune série n'a changé, le navigateur reçoit un 304 sans requête SQL
+// sur les données.
 app.get('/api/data', async (req, res) => {
   try {
     const { range } = req.query;
@@ -175,65 +180,34 @@ app.get('/api/data', async (req, res) => {
     if (range === '7d') daysToSubtract = 7;
     else if (range === '30d') daysToSubtract = 30;
 
-    // Données réelles
-    const realResult = await pool.query(`
-      SELECT 
-        (timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Europe/Paris') AS date,
-        value AS "true value"
-      FROM historical_data
-      WHERE timestamp >= NOW() - INTERVAL '${daysToSubtract} days'
-      ORDER BY timestamp ASC
-    `);
+    const HOUR = 60 * 60 * 1000;
+    const since = new Date(Math.floor(Date.now() / HOUR) * HOUR - daysToSubtract * 24 * HOUR);
 
-    // Prédictions Chronos
-    const predResult = await pool.query(`
-      SELECT 
-        (timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Europe/Paris') AS date,
-        predicted_value AS "our forecast"
-      FROM predictions
-      WHERE timestamp >= NOW() - INTERVAL '${daysToSubtract} days'
-      ORDER BY timestamp ASC
-    `);
+    const versionResult = await pool.query('SELECT version FROM dashboard_version');
+    const etag = `W/"${versionResult.rows[0].version}-${since.getTime()}"`;
+    res.set('ETag', etag);
+    res.set('Cache-Control', 'no-cache');
+    if (req.get('If-None-Match') === etag) {
+      return res.status(304).end();
+    }
 
-    // Prévisions RTE
-    const rteResult = await pool.query(`
+    const result = await pool.query(`
       SELECT 
         (timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Europe/Paris') AS date,
-        forecast_value AS "rte forecast"
-      FROM rte_forecasts
-      WHERE timestamp >= NOW() - INTERVAL '${daysToSubtract} days'
+        true_value,
+        rte_forecast,
+        our_forecast
+      FROM dashboard_series
+      WHERE timestamp >= $1
       ORDER BY timestamp ASC
-    `);
-
-    // Fusion des 3 sources par timestamp
-    const realMap = new Map();
-    realResult.rows.forEach(row => {
-      realMap.set(new Date(row.date).toISOString(), row["true value"]);
-    });
-
-    const predMap = new Map();
-    predResult.rows.forEach(row => {
-      predMap.set(new Date(row.date).toISOString(), row["our forecast"]);
-    });
-
-    const rteMap = new Map();
-    rteResult.rows.forEach(row => {
-      rteMap.set(new Date(row.date).toISOString(), row["rte forecast"]);
-    });
-
-    // Union de tous les timestamps
-    const allDates = new Set([...realMap.keys(), ...predMap.keys(), ...rteMap.keys()]);
-    const combined = Array.from(allDates)
-      .sort((a, b) => new Date(a) - new Date(b))  // Tri croissant
-      .map(date => ({
-        date,
-        "true value": realMap.get(date) ?? null,
-        "rte forecast": rteMap.get(date) ?? null,
-        "our forecast": predMap.get(date) ?? null,
-        
-      }));
-
-    res.json(combined);
+    `, [since]);
+
+    res.json(result.rows.map(row => ({
+      date: new Date(row.date).toISOString(),
+      "true value": row.true_value,
+      "rte forecast": row.rte_forecast,
+      "our forecast": row.our_forecast,
+    })));
   } catch (err) {
     console.error('Erreur /api/data:', err);
     res.status(500).json({ error: 'Erreur serveur', message: err.message });
@@ -0,0 +1,7 @@
+--
+-- Bandes de quantiles stockées à côté de predicted_value (médiane).
+-- Exemple : {"0.1": 61234.5, "0.9": 65432.1}
+--
+
+ALTER TABLE public.predictions
+    ADD COLUMN IF NOT EXISTS quantiles jsonb;
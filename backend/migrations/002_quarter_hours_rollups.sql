@@ -0,0 +1,29 @@
+--
+-- Séries brutes RTE au quart d'heure et agrégats multi-résolution.
+--
+-- rte_quarter_hours : valeurs 15 min telles que renvoyées par l'API
+--   (REALISED, D-1...), partitionnées par mois sur timestamp. Les
+--   partitions sont créées à la demande par les scripts (db_partitions.py).
+-- rte_rollups : moyenne / min / max / nombre de points par heure, jour et
+--   semaine (jours et semaines en heure de Paris), recalculés par les
+--   scripts pour les seules périodes touchées à chaque écriture.
+--
+
+CREATE TABLE IF NOT EXISTS public.rte_quarter_hours (
+    series_type text NOT NULL,
+    "timestamp" timestamp with time zone NOT NULL,
+    value integer NOT NULL,
+    CONSTRAINT rte_quarter_hours_pkey PRIMARY KEY (series_type, "timestamp")
+) PARTITION BY RANGE ("timestamp");
+
+CREATE TABLE IF NOT EXISTS public.rte_rollups (
+    resolution text NOT NULL CHECK (resolution IN ('hour', 'day', 'week')),
+    series_type text NOT NULL,
+    bucket timestamp with time zone NOT NULL,
+    mean_value double precision NOT NULL,
+    min_value integer NOT NULL,
+    max_value integer NOT NULL,
+    points integer NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT rte_rollups_pkey PRIMARY KEY (resolution, series_type, bucket)
+);
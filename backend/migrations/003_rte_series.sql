@@ -0,0 +1,82 @@
+--
+-- Séries horaires RTE de tous types dans une seule table.
+--
+-- rte_series : moyenne horaire par type de série (REALISED, ID, D-1, D-2)
+--   et heure, partitionnée par mois sur timestamp comme rte_quarter_hours
+--   (partitions créées à la demande par les scripts, db_partitions.py).
+-- historical_data et rte_forecasts deviennent des vues sur rte_series
+--   (REALISED et D-1) avec leurs colonnes d'origine : le backend, les
+--   prédictions et le backtest les lisent sans changement. Les anciennes
+--   tables sont renommées en *_legacy (à supprimer après vérification).
+--
+
+CREATE SEQUENCE IF NOT EXISTS public.rte_series_id_seq;
+
+CREATE TABLE IF NOT EXISTS public.rte_series (
+    id bigint DEFAULT nextval('public.rte_series_id_seq') NOT NULL,
+    series_type text NOT NULL,
+    "timestamp" timestamp with time zone NOT NULL,
+    value double precision NOT NULL,
+    source text,
+    fetched_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT rte_series_pkey PRIMARY KEY (series_type, "timestamp")
+) PARTITION BY RANGE ("timestamp");
+
+ALTER SEQUENCE public.rte_series_id_seq OWNED BY public.rte_series.id;
+
+-- Reprise des tables existantes (sans effet si ce sont déjà des vues)
+DO $$
+DECLARE
+    legacy record;
+    lower_ts timestamptz;
+    upper_ts timestamptz;
+    month timestamp;   -- début de mois UTC
+BEGIN
+    FOR legacy IN
+        SELECT * FROM (VALUES
+            ('historical_data', 'REALISED', 'value',          'source', 'import_date::timestamptz'),
+            ('rte_forecasts',   'D-1',      'forecast_value', 'NULL',   'forecast_date')
+        ) AS t(name, series_type, value_column, source_expr, fetched_expr)
+    LOOP
+        CONTINUE WHEN coalesce(
+            (SELECT relkind NOT IN ('r', 'p') FROM pg_class WHERE oid = to_regclass('public.' || legacy.name)), true
+        );
+
+        EXECUTE format('SELECT min("timestamp"), max("timestamp") FROM public.%I', legacy.name)
+            INTO lower_ts, upper_ts;
+
+        month := date_trunc('month', lower_ts AT TIME ZONE 'UTC');
+        WHILE month <= upper_ts AT TIME ZONE 'UTC' LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.rte_series FOR VALUES FROM (%L) TO (%L)',
+                'rte_series_' || to_char(month, 'YYYY_MM'),
+                month AT TIME ZONE 'UTC',
+                (month + interval '1 month') AT TIME ZONE 'UTC'
+            );
+            month := month + interval '1 month';
+        END LOOP;
+
+        EXECUTE format(
+            'INSERT INTO public.rte_series (id, series_type, "timestamp", value, source, fetched_at)
+             SELECT id, %L, "timestamp", %I, %s, coalesce(%s, now()) FROM public.%I
+             ON CONFLICT (series_type, "timestamp") DO NOTHING',
+            legacy.series_type, legacy.value_column, legacy.source_expr, legacy.fetched_expr, legacy.name
+        );
+        EXECUTE format('ALTER TABLE public.%I RENAME TO %I', legacy.name, legacy.name || '_legacy');
+        RAISE NOTICE '% → rte_series (%), ancienne table renommée %_legacy',
+            legacy.name, legacy.series_type, legacy.name;
+    END LOOP;
+
+    PERFORM setval('public.rte_series_id_seq', greatest((SELECT max(id) FROM public.rte_series), 1));
+END $$;
+
+-- Vues de compatibilité (colonnes et types des anciennes tables)
+CREATE OR REPLACE VIEW public.historical_data AS
+    SELECT id::integer AS id, "timestamp", value, source, fetched_at::timestamp AS import_date
+    FROM public.rte_series
+    WHERE series_type = 'REALISED';
+
+CREATE OR REPLACE VIEW public.rte_forecasts AS
+    SELECT id::integer AS id, "timestamp", value AS forecast_value, fetched_at AS forecast_date
+    FROM public.rte_series
+    WHERE series_type = 'D-1';
@@ -0,0 +1,48 @@
+--
+-- Séries du tableau de bord déjà jointes, une ligne par heure.
+--
+-- dashboard_series : consommation réalisée (REALISED), prévision RTE (D-1)
+--   et notre prévision (modèle DASHBOARD_MODEL de `predictions`) par heure.
+--   Tenue à jour par les scripts qui écrivent ces séries
+--   (dashboard_series.py) : seules les heures touchées sont recalculées.
+--   Remplissage initial avec le modèle par défaut, ou celui de
+--   `SET dashboard.model = '...'` exécuté avant la migration.
+-- dashboard_version : compteur incrémenté à chaque modification de
+--   dashboard_series, utilisé comme ETag par GET /api/data.
+--
+
+CREATE TABLE IF NOT EXISTS public.dashboard_series (
+    "timestamp" timestamp with time zone NOT NULL,
+    true_value double precision,
+    rte_forecast double precision,
+    our_forecast double precision,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT dashboard_series_pkey PRIMARY KEY ("timestamp")
+);
+
+CREATE TABLE IF NOT EXISTS public.dashboard_version (
+    id boolean DEFAULT true NOT NULL,
+    version bigint NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT dashboard_version_pkey PRIMARY KEY (id),
+    CONSTRAINT dashboard_version_single_row CHECK (id)
+);
+
+-- Remplissage initial (sans effet si la table est déjà tenue à jour)
+WITH model AS (
+    SELECT coalesce(nullif(current_setting('dashboard.model', true), ''), 'chronos-fine-tuned-j1') AS name
+)
+INSERT INTO public.dashboard_series ("timestamp", true_value, rte_forecast, our_forecast)
+SELECT hours.ts, real.value, rte.value, ours.predicted_value
+FROM (
+    SELECT "timestamp" AS ts FROM public.rte_series WHERE series_type IN ('REALISED', 'D-1')
+    UNION
+    SELECT "timestamp" FROM public.predictions WHERE model_name = (SELECT name FROM model)
+) hours
+LEFT JOIN public.rte_series real ON real.series_type = 'REALISED' AND real."timestamp" = hours.ts
+LEFT JOIN public.rte_series rte  ON rte.series_type = 'D-1'      AND rte."timestamp"  = hours.ts
+LEFT JOIN public.predictions ours ON ours.model_name = (SELECT name FROM model) AND ours."timestamp" = hours.ts
+ON CONFLICT ("timestamp") DO NOTHING;
+
+INSERT INTO public.dashboard_version (id, version) VALUES (true, 1)
+ON CONFLICT (id) DO NOTHING;
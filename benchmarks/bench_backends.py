@@ -0,0 +1,154 @@
+"""
+Benchmark : backends d'inférence CPU de Chronos (float32, bfloat16, int8, onnx).
+
+Pour chaque backend (chargé dans un processus séparé pour isoler le pic de
+mémoire) :
+  - temps de chargement (poids, conversion/quantification) ;
+  - latence d'une requête J+1 (p50 / p95, un contexte à la fois) ;
+  - débit en séries/s par lots de --batch-size ;
+  - pic de RSS du processus ;
+  - écart de la médiane prédite à celle du float32 (MAPE et écart max, %).
+
+Les contextes sont ceux du pipeline J+1 (504h réelles + 24h RTE) lus dans
+PostgreSQL sur les --days derniers jours d'origine, ou synthétiques avec
+--synthetic N. L'écart inclut le bruit d'échantillonnage : garder
+--num-samples suffisamment grand pour comparer les backends.
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_backends.py --model models/run-0/checkpoint-final --days 30
+    python benchmarks/bench_backends.py --backends float32,int8 --synthetic 32 --tolerance 1.5
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+HORIZON = 24
+
+
+# ─── Contextes : stockés (PostgreSQL) ou synthétiques ────────────────────────
+def stored_contexts(days, end=None):
+    from backtest_day_ahead import build_origins, load_hourly_series
+
+    end_day   = datetime.strptime(end, "%Y-%m-%d") if end else datetime.now().replace(
+        hour=0, minute=0, second=0, microsecond=0) - timedelta(days=2)
+    start_day = end_day - timedelta(days=days - 1)
+    grid, real, rte = load_hourly_series(start_day, end_day)
+    _, contexts, _, _, _ = build_origins(grid, real, rte, start_day, end_day)
+    return contexts.astype(np.float32)
+
+
+def synthetic_contexts(n, length=528, seed=0):
+    rng   = np.random.default_rng(seed)
+    hours = np.arange(length)
+    base  = 55000 + 8000 * np.sin(2 * np.pi * hours / 24) + 4000 * np.sin(2 * np.pi * hours / 168)
+    noise = rng.normal(0, 1500, (n, length)) + rng.uniform(-5000, 5000, (n, 1))
+    return (base + noise).astype(np.float32)
+
+
+# ─── Mesure d'un backend (processus enfant) ──────────────────────────────────
+def run_backend(model_path, backend, contexts, batch_size, num_samples, seed, threads, onnx_dir):
+    import torch
+    from predict_loading import StartupTimings, load_pipeline
+
+    torch.set_num_threads(threads)
+    timings  = StartupTimings()
+    pipeline = load_pipeline(model_path, "cpu", backend, timings, onnx_dir, threads)
+
+    tensors = torch.from_numpy(contexts)
+    pipeline.predict(tensors[:1], HORIZON, num_samples=num_samples)   # warm-up
+
+    latencies, medians = [], []
+    for i in range(len(contexts)):
+        torch.manual_seed(seed + i)
+        start    = time.perf_counter()
+        forecast = pipeline.predict(tensors[i:i + 1], HORIZON, num_samples=num_samples)
+        latencies.append(time.perf_counter() - start)
+        medians.append(np.quantile(forecast.numpy()[0], 0.5, axis=0))
+
+    start = time.perf_counter()
+    for i in range(0, len(contexts), batch_size):
+        pipeline.predict(tensors[i:i + batch_size], HORIZON, num_samples=num_samples)
+    batched = time.perf_counter() - start
+
+    return {
+        "backend":    backend,
+        "load_s":     timings.as_dict()["total"],
+        "p50_ms":     float(np.percentile(latencies, 50) * 1000),
+        "p95_ms":     float(np.percentile(latencies, 95) * 1000),
+        "throughput": len(contexts) / batched,
+        "rss_mb":     resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "medians":    np.stack(medians),
+    }
+
+
+def measure(pool_args):
+    # Un processus neuf par backend : pic de RSS et threads non partagés
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_backend, pool_args)
+
+
+# ─── Rapport ─────────────────────────────────────────────────────────────────
+def deviation(medians, reference):
+    pct = np.abs(medians - reference) / np.abs(reference) * 100
+    return float(pct.mean()), float(pct.max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", "models/run-0/checkpoint-final"))
+    parser.add_argument("--backends", default="float32,bfloat16,int8,onnx")
+    parser.add_argument("--days", type=int, default=30, help="Jours d'origine lus en base")
+    parser.add_argument("--end", default=None, help="Dernier jour d'origine (YYYY-MM-DD)")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N",
+                        help="N contextes synthétiques au lieu de la base")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--num-samples", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="Écart moyen max (MAPE %%) à la médiane float32")
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "float32" not in backends:
+        backends.insert(0, "float32")   # référence de précision
+    backends.sort(key=lambda b: b != "float32")
+
+    contexts = synthetic_contexts(args.synthetic) if args.synthetic else stored_contexts(args.days, args.end)
+    print(f"Contextes : {contexts.shape[0]} × {contexts.shape[1]} h, {args.threads} thread(s), "
+          f"{args.num_samples} échantillons")
+
+    results = []
+    for backend in backends:
+        try:
+            results.append(measure((args.model, backend, contexts, args.batch_size,
+                                    args.num_samples, args.seed, args.threads, args.onnx_dir)))
+        except Exception as e:
+            print(f"⚠ {backend} : {e}")
+
+    reference = results[0]["medians"]
+    print(f"\n{'backend':<10} {'charge.':>8} {'p50':>9} {'p95':>9} {'séries/s':>9} {'RSS':>8} {'MAPE':>7} {'max':>7}")
+    eligible = []
+    for r in results:
+        mape, worst = deviation(r["medians"], reference)
+        if mape <= args.tolerance:
+            eligible.append(r)
+        print(f"{r['backend']:<10} {r['load_s']:7.2f}s {r['p50_ms']:7.0f}ms {r['p95_ms']:7.0f}ms "
+              f"{r['throughput']:9.2f} {r['rss_mb']:6.0f}MB {mape:6.2f}% {worst:6.2f}%")
+
+    best = min(eligible, key=lambda r: r["p50_ms"])
+    print(f"\nBackend recommandé (MAPE ≤ {args.tolerance}%) : PREDICT_BACKEND={best['backend']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark : agrégation quart d'heure → heure (clean_data).
+
+Compare sur des données 15 min synthétiques (heure de Paris, changements
+d'heure inclus) :
+  - l'ancienne implémentation des scripts (apply ligne à ligne, groupby.apply,
+    merge puis sélection de la minute 0 par groupe) ;
+  - scripts/rte_cleaning.aggregate_hourly (to_datetime + resample vectorisés).
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_clean_data.py --years 5
+    python benchmarks/bench_clean_data.py --years 5 --legacy-days 365
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from rte_cleaning import aggregate_hourly, find_missing_hours
+
+
+# ─── Données synthétiques au format de l'API RTE ─────────────────────────────
+def make_quarter_hours(years, start="2019-01-01"):
+    index = pd.date_range(
+        start,
+        pd.Timestamp(start) + pd.DateOffset(years=years),
+        freq="15min",
+        tz="Europe/Paris",
+        inclusive="left"
+    )
+    hours  = np.arange(len(index)) / 4
+    values = 55000 + 8000 * np.sin(2 * np.pi * hours / 24) + np.random.default_rng(0).normal(0, 800, len(index))
+    stamps = pd.Series(index.strftime("%Y-%m-%dT%H:%M:%S%z"))
+    return list(stamps.str[:-2] + ":" + stamps.str[-2:]), values.round().astype(int).tolist()
+
+
+# ─── Ancienne implémentation (copie de clean_data avant mutualisation) ───────
+def legacy_clean_data(all_start_dates, all_values):
+    df = pd.DataFrame({"start_date": all_start_dates, "value": all_values})
+
+    df["date_column"]    = df["start_date"].apply(lambda x: datetime.fromisoformat(x).date().isoformat())
+    df["hour_column"]    = df["start_date"].apply(lambda x: datetime.fromisoformat(x).hour)
+    df["minutes_column"] = df["start_date"].apply(lambda x: datetime.fromisoformat(x).minute)
+
+    mean_value = df.groupby(["date_column", "hour_column"]).apply(
+        lambda g: g["value"].sum() / len(g), include_groups=False
+    ).reset_index(name="mean_value_hourly")
+
+    df_inter = pd.merge(mean_value, df, on=["date_column", "hour_column"], how="inner")
+    df_inter = df_inter.sort_values(['date_column', 'hour_column', 'minutes_column'])
+
+    def select_best_minute(group):
+        zero_min = group[group['minutes_column'] == 0]
+        if len(zero_min) > 0:
+            return zero_min.iloc[0]
+        return group.iloc[0]
+
+    df_final = df_inter.groupby(['date_column', 'hour_column'], as_index=False).apply(
+        select_best_minute, include_groups=False
+    ).reset_index(drop=True)
+
+    df_final = df_final[["start_date", "date_column", "hour_column", "mean_value_hourly"]]
+    df_final = df_final.drop_duplicates(subset=['start_date'], keep='first')
+    return df_final.dropna()
+
+
+def timed(fn, *args):
+    start  = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--legacy-days", type=int, default=None,
+                        help="Limiter l'ancienne implémentation aux N premiers jours (extrapolé)")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    dates, values = make_quarter_hours(args.years)
+    print(f"Données : {len(dates):,} quarts d'heure ({args.years} ans)")
+
+    df_new, t_new = timed(aggregate_hourly, dates, values)
+    _, t_missing  = timed(find_missing_hours, df_new)
+    print(f"Vectorisé  : {t_new:8.3f} s  ({len(df_new):,} heures) + contrôle des trous {t_missing:.3f} s")
+
+    if args.skip_legacy:
+        return
+
+    n = len(dates) if args.legacy_days is None else min(len(dates), args.legacy_days * 96)
+    df_old, t_old = timed(legacy_clean_data, dates[:n], values[:n])
+    t_old_full    = t_old * len(dates) / n
+    suffix        = "" if n == len(dates) else f" (extrapolé depuis {n:,} lignes)"
+    print(f"Historique : {t_old_full:8.3f} s  ({len(df_old):,} heures){suffix}")
+    print(f"Gain       : ×{t_old_full / t_new:.1f}")
+
+    # Les jours de passage à l'heure d'hiver, l'ancienne version fusionnait les deux « 02:00 »
+    extra = len(aggregate_hourly(dates[:n], values[:n])) - len(df_old)
+    print(f"Heures distinctes récupérées (jours de 25h) : {extra}")
+
+if __name__ == "__main__":
+    main()
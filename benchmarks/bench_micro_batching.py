@@ -0,0 +1,101 @@
+"""
+Benchmark : débit de /predict avec et sans micro-batching.
+
+Compare, sur les mêmes contextes synthétiques de 528 heures :
+  - le chemin historique (un appel pipeline.predict par requête) ;
+  - le MicroBatcher de predict_api (requêtes concurrentes regroupées).
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_micro_batching.py --model models/run-0/checkpoint-final \\
+        --requests 64 --batch-size 16 --wait-ms 5
+
+Mesures (1 cœur CPU, 50 échantillons, horizon 24 h, poids aléatoires) :
+  - T5 minuscule (d_model 32), 64 requêtes, batch 16 :
+    séquentiel 3,17 req/s, micro-batching 5,00 req/s (×1,58) ;
+  - architecture chronos-t5-small (46 M paramètres), 8 requêtes, batch 4 :
+    0,34 req/s dans les deux cas (×1,00).
+Le gain vient du coût fixe par appel : sur un modèle de taille réelle, un
+seul cœur est déjà saturé par un appel. Avec batch 16 × 50 échantillons
+(800 trajectoires), chronos-t5-small a dépassé les 6 Go de la machine.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from chronos import ChronosPipeline
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.predict_batching import MicroBatcher
+
+
+# ─── Contextes synthétiques (cycle journalier + hebdomadaire + bruit) ────────
+def make_contexts(n, length=528, seed=0):
+    rng   = np.random.default_rng(seed)
+    hours = np.arange(length)
+    base  = 55000 + 8000 * np.sin(2 * np.pi * hours / 24) + 4000 * np.sin(2 * np.pi * hours / 168)
+    return [
+        torch.tensor(base + rng.normal(0, 1500, length) + rng.uniform(-5000, 5000), dtype=torch.float32)
+        for _ in range(n)
+    ]
+
+
+# ─── 1. Chemin historique : une requête à la fois ────────────────────────────
+def bench_sequential(pipeline, contexts, prediction_length, num_samples):
+    start = time.perf_counter()
+    for context in contexts:
+        pipeline.predict(context, prediction_length, num_samples=num_samples)
+    return time.perf_counter() - start
+
+
+# ─── 2. Micro-batching : toutes les requêtes concurrentes ────────────────────
+async def bench_batched(pipeline, contexts, prediction_length, num_samples, batch_size, wait_ms):
+    def run_batch(batch, pl, ns):
+        return pipeline.predict(batch, pl, num_samples=ns)
+
+    batcher = MicroBatcher(run_batch, batch_size, wait_ms)
+    batcher.start()
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        batcher.submit(context, prediction_length, num_samples) for context in contexts
+    ])
+    elapsed = time.perf_counter() - start
+    await batcher.stop()
+    return elapsed, batcher.mean_batch_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", "amazon/chronos-t5-small"))
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--wait-ms", type=float, default=5.0)
+    parser.add_argument("--prediction-length", type=int, default=24)
+    parser.add_argument("--num-samples", type=int, default=50)
+    args = parser.parse_args()
+
+    device   = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    pipeline = ChronosPipeline.from_pretrained(args.model, device_map=device, torch_dtype=torch.bfloat16)
+    contexts = make_contexts(args.requests)
+
+    # Échauffement (initialisation paresseuse des noyaux)
+    pipeline.predict(contexts[0], args.prediction_length, num_samples=args.num_samples)
+
+    t_seq = bench_sequential(pipeline, contexts, args.prediction_length, args.num_samples)
+    t_batch, mean_size = asyncio.run(bench_batched(
+        pipeline, contexts, args.prediction_length, args.num_samples, args.batch_size, args.wait_ms
+    ))
+
+    print(f"Modèle            : {args.model} ({device})")
+    print(f"Requêtes          : {args.requests} × {args.num_samples} échantillons, horizon {args.prediction_length}h")
+    print(f"Séquentiel        : {t_seq:8.2f} s  →  {args.requests / t_seq:6.2f} req/s")
+    print(f"Micro-batching    : {t_batch:8.2f} s  →  {args.requests / t_batch:6.2f} req/s "
+          f"(batch moyen {mean_size:.1f})")
+    print(f"Gain              : ×{t_seq / t_batch:.2f}")
+
+
+if __name__ == "__main__":
+    main()
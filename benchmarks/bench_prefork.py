@@ -0,0 +1,159 @@
+"""
+Test de charge : débit de /predict selon le nombre de workers pre-fork.
+
+Pour chaque valeur de --workers, lance scripts/serve_prefork.py avec un
+budget de cœurs / workers threads par worker, attend que tous les workers
+soient prêts, puis envoie --requests requêtes (contextes aléatoires, donc
+sans hit de cache) avec --concurrency clients en parallèle. Rapporte :
+  - le débit (requêtes/s) et la latence p50 / p95 ;
+  - la mémoire totale : RSS cumulé et PSS (RSS où les pages partagées sont
+    réparties entre processus) du parent et des workers. Avec des poids
+    partagés, le PSS croît bien moins vite que le RSS cumulé.
+
+Mesures sur 1 cœur CPU (poids aléatoires, backend float32) :
+
+  T5 minuscule (d_model 32), 50 échantillons, 100 requêtes, 16 clients
+    workers  req/s   p50     p95     RSS cumulé  PSS
+    1        4,44    3458ms  4372ms  1083 Mo      711 Mo
+    2        4,18    3832ms  5291ms  1754 Mo     1014 Mo
+    4        3,77    4282ms  6686ms  2420 Mo      941 Mo
+
+  architecture chronos-t5-small (46 M paramètres), 20 échantillons,
+  PREDICT_MAX_BATCH_SIZE=4, 24 requêtes, 8 clients
+    workers  req/s   p50      p95      RSS cumulé  PSS
+    1        0,46    17163ms  18413ms  1520 Mo      973 Mo
+    2        0,45    12265ms  31617ms  2412 Mo     1321 Mo
+
+Sur un seul cœur, chaque worker supplémentaire réduit le débit (partage du
+cœur, changements de contexte) et dégrade le p95. Le passage à l'échelle
+avec plusieurs cœurs n'a pas été mesuré.
+
+Usage (depuis la racine du dépôt) :
+    MODEL_PATH=models/run-0/checkpoint-final \\
+        python benchmarks/bench_prefork.py --workers 1,2,4,8 --requests 200 --concurrency 32
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ─── Mémoire du groupe de processus (Linux) ──────────────────────────────────
+def process_tree(pid):
+    pids = [pid]
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            pids += [int(child) for child in f.read().split()]
+    return pids
+
+
+def memory_mb(pid):
+    rss = pss = 0
+    for p in process_tree(pid):
+        with open(f"/proc/{p}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    rss += int(line.split()[1])
+                elif line.startswith("Pss:"):
+                    pss += int(line.split()[1])
+    return rss / 1024, pss / 1024
+
+
+# ─── Serveur ─────────────────────────────────────────────────────────────────
+def start_server(workers, port):
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    return subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "scripts", "serve_prefork.py"),
+         "--workers", str(workers), "--threads", str(threads), "--port", str(port)],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(url, workers, timeout):
+    """Prêt quand `workers` pids distincts ont répondu « ready » sur /health."""
+    ready    = set()
+    deadline = time.monotonic() + timeout
+    while len(ready) < workers:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{len(ready)}/{workers} workers prêts après {timeout}s")
+        try:
+            health = requests.get(f"{url}/health", timeout=2).json()
+            if health["status"] == "ready":
+                ready.add(health["pid"])
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+
+
+# ─── Charge ──────────────────────────────────────────────────────────────────
+def run_load(url, n_requests, concurrency, context_length, num_samples):
+    rng      = np.random.default_rng(0)
+    base     = 55000 + 8000 * np.sin(2 * np.pi * np.arange(context_length) / 24)
+    contexts = [(base + rng.normal(0, 1500, context_length)).round(1).tolist() for _ in range(n_requests)]
+
+    def call(context):
+        start    = time.perf_counter()
+        response = requests.post(
+            f"{url}/predict",
+            json={"context": context, "num_samples": num_samples},
+            timeout=600
+        )
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, contexts))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, status in results if status == 200]
+    errors    = sum(1 for _, status in results if status != 200)
+    return elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--num-samples", type=int, default=50)
+    parser.add_argument("--context-length", type=int, default=528)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"{os.cpu_count()} cœurs, {args.requests} requêtes, {args.concurrency} clients concurrents\n")
+    print(f"{'workers':>7} {'threads':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'erreurs':>7} {'RSS cumulé':>11} {'PSS':>9}")
+
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        server = start_server(workers, args.port)
+        try:
+            wait_ready(url, workers, args.startup_timeout)
+            elapsed, latencies, errors = run_load(
+                url, args.requests, args.concurrency, args.context_length, args.num_samples
+            )
+            rss, pss = memory_mb(server.pid)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+        throughput = len(latencies) / elapsed
+        baseline   = baseline or throughput
+        p50, p95   = np.percentile(latencies, [50, 95]) * 1000 if latencies else (float("nan"),) * 2
+        print(f"{workers:>7} {max(1, (os.cpu_count() or 1) // workers):>7} {throughput:8.2f} "
+              f"{p50:6.0f}ms {p95:6.0f}ms {errors:>7} {rss:9.0f}Mo {pss:7.0f}Mo  (×{throughput / baseline:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Suite de benchmarks reproductible, sans RTE ni base de production.
+
+Environnement monté pour la durée du run :
+  - benchmarks/fake_rte.py : faux serveur RTE (OAuth + short_term REALISED /
+    D-1, changements d'heure inclus), les scripts y sont dirigés via
+    RTE_API_URL ;
+  - benchmarks/throwaway_db.py : PostgreSQL jetable restauré depuis
+    backend/backup/trading_data_3_tables.sql + migrations ;
+  - benchmarks/tiny_chronos.py : checkpoint Chronos minuscule servi par
+    predict_api (ou --model-path pour un vrai checkpoint).
+
+Cas mesurés, à tailles croissantes (--days jours de données, --contexts
+longueurs de contexte) :
+  etl     : rte_fetch (token + HTTP), clean_data (agrégation horaire de
+            rte_series), insert_historical (lignes nouvelles),
+            insert_historical_conflict (mêmes lignes, ignorées),
+            insert_forecast, insert_predictions, fetch_hybrid_context (sur
+            une table historical_data qui grossit) ;
+  predict : POST /predict (format binaire, sans cache) via uvicorn.
+
+Chaque cas est répété --repeat fois (médiane retenue). Le run est écrit dans
+benchmarks/results/<date>.json et comparé au run précédent : un cas plus
+lent que --threshold × la référence est signalé comme régression.
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --only etl --days 1,30,365,1825
+    python benchmarks/bench_suite.py --admin-dsn "host=localhost user=postgres password=…"
+    python benchmarks/bench_suite.py --baseline benchmarks/results/20260101-120000.json --fail-on-regression
+    python benchmarks/bench_suite.py --compare benchmarks/results/A.json benchmarks/results/B.json
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+import psycopg2
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fake_rte
+from throwaway_db import ThrowawayPostgres
+from tiny_chronos import make_tiny_checkpoint
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Données synthétiques écrites avant le début de la sauvegarde (2025-10-21)
+SYNTHETIC_END = datetime(2025, 10, 1)
+
+
+# ─── Mesure ──────────────────────────────────────────────────────────────────
+class Recorder:
+    def __init__(self):
+        self.results = []
+
+    def record(self, case, size, unit, runs):
+        result = {
+            "case":   case,
+            "size":   size,
+            "unit":   unit,
+            "median": float(np.median(runs)),
+            "min":    float(np.min(runs)),
+            "runs":   [round(r, 6) for r in runs],
+        }
+        self.results.append(result)
+        print(f"  {case:<28} {size:>9,} {unit:<8} médiane {result['median'] * 1000:10.2f} ms"
+              f"  (min {result['min'] * 1000:.2f} ms, {len(runs)} runs)")
+        return result
+
+
+def timed(fn, *args, **kwargs):
+    start  = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# ─── Cas ETL : fetch, clean_data, insertions, contexte hybride ───────────────
+def bench_etl(recorder, days_list, repeat):
+    import our_predictions_day_ahead as day_ahead
+    from rte_ingest import RateLimiter, TokenCache, connect_db, request_window
+    from rte_series import hourly_series, parse_short_term, upsert_hours
+    logging.getLogger().setLevel(logging.WARNING)
+    warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy")
+
+    def insert(conn, series_type, df):
+        upsert_hours(conn, series_type, df["start_date"].tolist(), df["mean_value_hourly"].tolist())
+        conn.commit()
+
+    token_cache = TokenCache()
+    limiter     = RateLimiter(0)
+    cursor      = SYNTHETIC_END
+
+    for days in days_list:
+        # Une fenêtre distincte par répétition : chaque insertion écrit des lignes nouvelles
+        windows = []
+        for _ in range(repeat):
+            windows.append((cursor - timedelta(days=days), cursor))
+            cursor -= timedelta(days=days)
+
+        fetched, t_fetch = zip(*(timed(request_window, token_cache, limiter, s, e, ("REALISED",)) for s, e in windows))
+        quarters = len(fetched[0][0]["values"])
+        recorder.record("rte_fetch", quarters, "quarts", t_fetch)
+
+        # Chemin de production (rte_series.store_short_term, sans l'écriture)
+        frames, t_clean = zip(*(timed(lambda e: hourly_series(parse_short_term(e)), entries) for entries in fetched))
+        recorder.record("clean_data", quarters, "quarts", t_clean)
+
+        hours = len(frames[0])
+        conn  = connect_db()
+        try:
+            t_new      = [timed(insert, conn, "REALISED", df)[1] for df in frames]
+            t_conflict = [timed(insert, conn, "REALISED", df)[1] for df in frames]
+            recorder.record("insert_historical", hours, "heures", t_new)
+            recorder.record("insert_historical_conflict", hours, "heures", t_conflict)
+
+            t_forecast = []
+            for s, e in windows:
+                payload = fake_rte.short_term_payload("D-1", *_utc(s, e))
+                df      = hourly_series(parse_short_term([payload]))
+                t_forecast.append(timed(insert, conn, "D-1", df)[1])
+            recorder.record("insert_forecast", hours, "heures", t_forecast)
+        finally:
+            conn.close()
+
+        t_predictions = []
+        for i, df in enumerate(frames):
+            timestamps  = [datetime.fromisoformat(ts) for ts in df["start_date"]]
+            values      = df["mean_value_hourly"].to_numpy()
+            predictions = day_ahead.prepare_predictions(
+                timestamps, values, f"bench-{days}d-{i}", {"0.1": values * 0.95, "0.9": values * 1.05}
+            )
+            t_predictions.append(timed(day_ahead.insert_predictions, predictions)[1])
+        recorder.record("insert_predictions", hours, "lignes", t_predictions)
+
+        with psycopg2.connect(**day_ahead.DB_CONFIG) as conn, conn.cursor() as cur:
+            cur.execute("ANALYZE rte_series")
+            cur.execute("SELECT count(*) FROM historical_data")
+            table_rows = cur.fetchone()[0]
+        t_context = [timed(day_ahead.fetch_hybrid_context)[1] for _ in range(repeat)]
+        recorder.record("fetch_hybrid_context", table_rows, "lignes", t_context)
+
+
+def _utc(start, end):
+    """Bornes locales naïves (heure de Paris) → Timestamps UTC pour fake_rte."""
+    import pandas as pd
+    return tuple(pd.Timestamp(d).tz_localize("Europe/Paris").tz_convert("UTC") for d in (start, end))
+
+
+# ─── Cas /predict : predict_api servi par uvicorn ────────────────────────────
+def start_api(model_path, backend, port):
+    env = {
+        **os.environ,
+        "MODEL_PATH":                model_path,
+        "PREDICT_BACKEND":           backend,
+        "PREDICT_MODEL_REGISTRY":    "",
+        "PREDICT_CACHE_MAX_ENTRIES": "0",
+        "PREDICT_CACHE_DIR":         "",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "scripts.predict_api:app",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_ready(url, server, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"predict_api arrêtée au démarrage (code {server.returncode})")
+        try:
+            if requests.get(f"{url}/health", timeout=2).json().get("status") == "ready":
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"predict_api non prête après {timeout}s")
+
+
+def bench_predict(recorder, model_path, backend, contexts, num_samples, repeat, port):
+    from chronos_wire import CONTENT_TYPE, encode_request
+
+    url    = f"http://127.0.0.1:{port}"
+    server = start_api(model_path, backend, port)
+    try:
+        wait_ready(url, server, timeout=600)
+        rng     = np.random.default_rng(0)
+        headers = {"Content-Type": CONTENT_TYPE, "Accept": CONTENT_TYPE}
+        with requests.Session() as session:
+            for length in contexts:
+                runs = []
+                for _ in range(repeat):
+                    base    = 55000 + 8000 * np.sin(2 * np.pi * np.arange(length) / 24)
+                    payload = encode_request(base + rng.normal(0, 1500, length), prediction_length=24,
+                                             num_samples=num_samples, quantiles=[0.1, 0.9])
+                    response, seconds = timed(session.post, f"{url}/predict", data=payload,
+                                              headers=headers, timeout=600)
+                    response.raise_for_status()
+                    runs.append(seconds)
+                recorder.record(f"predict_ns{num_samples}", length, "contexte", runs)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+# ─── Stockage et comparaison des runs ────────────────────────────────────────
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+        dirty  = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit, dirty = "", ""
+    return {
+        "commit":   commit + ("-dirty" if dirty else ""),
+        "host":     platform.node(),
+        "platform": platform.platform(),
+        "python":   platform.python_version(),
+        "cpus":     os.cpu_count(),
+    }
+
+
+def save_run(run, directory=RESULTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{datetime.fromisoformat(run['started']):%Y%m%d-%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    return path
+
+
+def latest_run(directory=RESULTS_DIR, exclude=None):
+    paths = sorted(p for p in glob.glob(os.path.join(directory, "*.json")) if p != exclude)
+    return paths[-1] if paths else None
+
+
+def load_run(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold):
+    """Affiche current / baseline par (cas, taille) ; retourne le nombre de régressions."""
+    if baseline["env"].get("cpus") != current["env"].get("cpus") or baseline["env"].get("host") != current["env"].get("host"):
+        print("⚠ Runs issus de machines différentes : comparaison indicative")
+
+    reference   = {(r["case"], r["size"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nComparaison avec {baseline['env'].get('commit')} ({baseline['started']}), seuil ×{threshold}")
+    print(f"  {'cas':<28} {'taille':>9} {'référence':>11} {'actuel':>11} {'ratio':>7}")
+    for result in current["results"]:
+        ref = reference.get((result["case"], result["size"]))
+        if ref is None:
+            continue
+        ratio  = result["median"] / ref["median"] if ref["median"] else float("inf")
+        status = ""
+        if ratio > threshold:
+            status = "⚠ régression"
+            regressions += 1
+        elif ratio < 1 / threshold:
+            status = "✓ plus rapide"
+        print(f"  {result['case']:<28} {result['size']:>9,} {ref['median'] * 1000:9.2f}ms "
+              f"{result['median'] * 1000:9.2f}ms {ratio:6.2f}×  {status}")
+    return regressions
+
+
+# ─── Programme principal ─────────────────────────────────────────────────────
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="etl,predict", help="Groupes de cas : etl, predict")
+    parser.add_argument("--days", default="1,30,180,730", help="Tailles des cas ETL (jours de données)")
+    parser.add_argument("--contexts", default="64,128,256,512", help="Longueurs de contexte de /predict")
+    parser.add_argument("--num-samples", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--model-path", default=None, help="Checkpoint servi (défaut : checkpoint minuscule)")
+    parser.add_argument("--backend", default="float32")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--admin-dsn", default=None, help="Serveur PostgreSQL existant (sinon initdb temporaire)")
+    parser.add_argument("--baseline", default=None, help="Run de référence (défaut : dernier run enregistré)")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", nargs=2, metavar=("REFERENCE", "RUN"), help="Comparer deux runs sans rien mesurer")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.compare:
+        regressions = compare(load_run(args.compare[0]), load_run(args.compare[1]), args.threshold)
+        sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+    groups   = {g.strip() for g in args.only.split(",")}
+    days     = [int(d) for d in args.days.split(",")]
+    recorder = Recorder()
+    run      = {"started": datetime.now().isoformat(timespec="seconds"), "env": environment(), "args": vars(args)}
+
+    # Les scripts écrivent leurs logs dans ./logs et lisent leur configuration à l'import
+    os.chdir(ROOT)
+    os.makedirs("logs", exist_ok=True)
+    os.environ.update({"ETL_METRICS_FORMAT": "none", "RTE_CLIENT_ID": "bench", "RTE_CLIENT_SECRET": "bench"})
+
+    if "etl" in groups:
+        rte, rte_url = fake_rte.serve(max_days=max(days) + 1)
+        os.environ["RTE_API_URL"] = rte_url
+        with ThrowawayPostgres(args.admin_dsn) as db:
+            os.environ.update(db.env())
+            print(f"PostgreSQL jetable prêt ({db.env()['DB_NAME']}, restauré en {db.load_seconds:.1f}s), "
+                  f"faux RTE sur {rte_url}\n")
+            bench_etl(recorder, days, args.repeat)
+        rte.shutdown()
+
+    if "predict" in groups:
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = args.model_path or make_tiny_checkpoint(os.path.join(tmp, "tiny-chronos"))
+            print(f"\n/predict : {model_path} ({args.backend})")
+            bench_predict(recorder, model_path, args.backend, [int(c) for c in args.contexts.split(",")],
+                          args.num_samples, args.repeat, args.port)
+
+    run["results"] = recorder.results
+    path = None
+    if not args.no_save:
+        path = save_run(run)
+        print(f"\n✓ Résultats enregistrés : {os.path.relpath(path, ROOT)}")
+
+    baseline = args.baseline or latest_run(exclude=path)
+    if baseline:
+        regressions = compare(load_run(baseline), run, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Serveur local imitant l'API RTE (OAuth + consumption/v1/short_term).
+
+  - POST /token/oauth/ (client_credentials, Basic auth) → access_token ;
+  - GET  /open_api/consumption/v1/short_term?type=REALISED|D-1[,…]
+         &start_date=…&end_date=… (Bearer) → valeurs au quart d'heure,
+         horodatées en heure de Paris avec le bon décalage (jours de 23h et
+         25h inclus), déterministes pour une même période ;
+  - une période plus longue que --max-days est refusée (400), comme RTE.
+
+Les scripts ETL l'utilisent via RTE_API_URL :
+    python benchmarks/fake_rte.py --port 8090
+    RTE_API_URL=http://127.0.0.1:8090 python scripts/fetch_rte_data.py --start 2024-01-01
+"""
+import argparse
+import base64
+import json
+import secrets
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+SHORT_TERM_PATH = "/open_api/consumption/v1/short_term"
+TOKEN_PATH      = "/token/oauth/"
+SERIES_TYPES    = ("REALISED", "ID", "D-1", "D-2")
+
+
+# ─── Données synthétiques ────────────────────────────────────────────────────
+def quarter_hours(start, end):
+    """Quarts d'heure de [start, end[ en heure de Paris."""
+    return pd.date_range(
+        pd.Timestamp(start).tz_convert("Europe/Paris"),
+        pd.Timestamp(end).tz_convert("Europe/Paris"),
+        freq="15min",
+        inclusive="left"
+    )
+
+
+def consumption(index, series_type):
+    """Profil journalier + hebdomadaire + saisonnier, bruit fixé par l'horodatage."""
+    epoch  = index.asi8 // 10**9
+    hours  = epoch / 3600
+    days   = hours / 24
+    values = (
+        55000
+        + 9000 * np.cos(2 * np.pi * (days - 15) / 365.25)
+        + 6000 * np.sin(2 * np.pi * (hours - 6) / 24)
+        - 3000 * (index.dayofweek >= 5)
+        + (epoch * 2654435761 % 2001) - 1000
+    )
+    if series_type != "REALISED":
+        values = values + 400 * SERIES_TYPES.index(series_type)
+    return values.round().astype(int)
+
+
+def rte_timestamp(ts):
+    text = ts.strftime("%Y-%m-%dT%H:%M:%S%z")
+    return f"{text[:-2]}:{text[-2:]}"
+
+
+def short_term_payload(series_type, start, end):
+    index   = quarter_hours(start, end)
+    values  = consumption(index, series_type)
+    updated = rte_timestamp(pd.Timestamp.now(tz="Europe/Paris").floor("s"))
+    return {
+        "type":       series_type,
+        "start_date": rte_timestamp(pd.Timestamp(start).tz_convert("Europe/Paris")),
+        "end_date":   rte_timestamp(pd.Timestamp(end).tz_convert("Europe/Paris")),
+        "values": [
+            {
+                "start_date":   rte_timestamp(ts),
+                "end_date":     rte_timestamp(ts + pd.Timedelta(minutes=15)),
+                "updated_date": updated,
+                "value":        int(value),
+            }
+            for ts, value in zip(index, values)
+        ],
+    }
+
+
+# ─── Serveur HTTP ────────────────────────────────────────────────────────────
+class FakeRTEHandler(BaseHTTPRequestHandler):
+    server_version = "FakeRTE/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if urlparse(self.path).path != TOKEN_PATH:
+            return self.send_json(404, {"error": "not_found"})
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        auth = self.headers.get("Authorization", "")
+        if not auth.startswith("Basic ") or ":" not in base64.b64decode(auth[6:]).decode(errors="replace"):
+            return self.send_json(401, {"error": "invalid_client"})
+
+        token = secrets.token_hex(16)
+        self.server.tokens.add(token)
+        self.server.stats["tokens"] += 1
+        self.send_json(200, {"access_token": token, "token_type": "Bearer",
+                             "expires_in": self.server.token_ttl})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != SHORT_TERM_PATH:
+            return self.send_json(404, {"error": "not_found"})
+
+        auth = self.headers.get("Authorization", "")
+        if auth[7:] not in self.server.tokens:
+            return self.send_json(401, {"error": "invalid_token"})
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        # « + » non encodé dans l'URL (build_period_url) : parse_qs le lit comme une espace
+        params = {key: values[0].replace(" ", "+") for key, values in parse_qs(url.query).items()}
+        try:
+            start = datetime.fromisoformat(params["start_date"])
+            end   = datetime.fromisoformat(params["end_date"])
+            types = params.get("type", "REALISED").split(",")
+        except (KeyError, ValueError) as e:
+            return self.send_json(400, {"error": "invalid_request", "error_description": str(e)})
+
+        if start.tzinfo is None or end.tzinfo is None or end <= start:
+            return self.send_json(400, {"error": "invalid_request", "error_description": "Période invalide"})
+        if (end - start).days > self.server.max_days:
+            return self.send_json(400, {"error": "CONSUMPTION_SHORT_TERM_F05",
+                                        "error_description": f"Période > {self.server.max_days} jours"})
+        if any(t not in SERIES_TYPES for t in types):
+            return self.send_json(400, {"error": "invalid_request", "error_description": f"type {types}"})
+
+        self.server.stats["requests"] += 1
+        self.send_json(200, {"short_term": [short_term_payload(t, start, end) for t in types]})
+
+
+def serve(port=0, max_days=186, latency_ms=0.0, token_ttl=7200, host="127.0.0.1"):
+    """Démarre le serveur dans un thread ; retourne (serveur, url de base)."""
+    server           = ThreadingHTTPServer((host, port), FakeRTEHandler)
+    server.tokens    = set()
+    server.stats     = {"tokens": 0, "requests": 0}
+    server.max_days  = max_days
+    server.latency   = latency_ms / 1000
+    server.token_ttl = token_ttl
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--max-days", type=int, default=186, help="Période maximale acceptée par requête")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence ajoutée à chaque requête de données")
+    args = parser.parse_args()
+
+    server, url = serve(args.port, args.max_days, args.latency_ms, host=args.host)
+    print(f"Faux RTE sur {url} (RTE_API_URL={url}), Ctrl+C pour arrêter")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Base PostgreSQL jetable pour les benchmarks.
+
+Restaure backend/backup/trading_data_3_tables.sql puis applique
+backend/migrations/*.sql dans :
+  - une base temporaire créée sur un serveur existant (--admin-dsn, ou
+    BENCH_PG_ADMIN_DSN), supprimée à la sortie ;
+  - sinon un cluster temporaire (initdb + pg_ctl, binaires PostgreSQL dans
+    le PATH ou PG_BIN), écoutant uniquement sur une socket Unix, détruit à
+    la sortie.
+
+Usage autonome (garde la base ouverte jusqu'à Ctrl+C et affiche les DB_*) :
+    python benchmarks/throwaway_db.py
+    python benchmarks/throwaway_db.py --admin-dsn "host=localhost user=postgres"
+"""
+import argparse
+import glob
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+
+import psycopg2
+from psycopg2 import sql
+
+ROOT       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKUP_SQL = os.path.join(ROOT, "backend", "backup", "trading_data_3_tables.sql")
+MIGRATIONS = os.path.join(ROOT, "backend", "migrations")
+
+
+# ─── Restauration du dump (sans psql) ────────────────────────────────────────
+def load_dump(conn, path):
+    """
+    Rejoue un dump pg_dump au format texte : instructions SQL et blocs
+    COPY ... FROM stdin. Les méta-commandes psql (\\restrict…) sont ignorées.
+    """
+    with conn.cursor() as cur, open(path, encoding="utf-8") as f:
+        statement = []
+        for line in f:
+            if not statement and (line.startswith("--") or line.startswith("\\") or not line.strip()):
+                continue
+            statement.append(line)
+            if not line.rstrip().endswith(";"):
+                continue
+
+            text      = "".join(statement)
+            statement = []
+            if text.lstrip().upper().startswith("COPY ") and text.rstrip().endswith("FROM stdin;"):
+                rows = []
+                for row in f:
+                    if row.rstrip("\n") == "\\.":
+                        break
+                    rows.append(row)
+                cur.copy_expert(text, io.StringIO("".join(rows)))
+            else:
+                cur.execute(text)
+    conn.commit()
+
+
+def apply_migrations(conn, directory=MIGRATIONS):
+    applied = []
+    with conn.cursor() as cur:
+        for path in sorted(glob.glob(os.path.join(directory, "*.sql"))):
+            with open(path, encoding="utf-8") as f:
+                cur.execute(f.read())
+            applied.append(os.path.basename(path))
+    conn.commit()
+    return applied
+
+
+# ─── Base jetable ────────────────────────────────────────────────────────────
+class ThrowawayPostgres:
+    """
+    Contexte : `with ThrowawayPostgres() as db:` puis `db.config` (kwargs de
+    psycopg2.connect) ou `db.env()` (variables DB_* lues par les scripts).
+    """
+
+    def __init__(self, admin_dsn=None, dump=BACKUP_SQL, migrations=MIGRATIONS, pg_bin=None):
+        self.admin_dsn  = admin_dsn if admin_dsn is not None else os.getenv("BENCH_PG_ADMIN_DSN", "")
+        self.dump       = dump
+        self.migrations = migrations
+        self.pg_bin     = pg_bin or os.getenv("PG_BIN", "")
+        self.config     = None
+        self._tmpdir    = None
+        self._dbname    = None
+
+        self.load_seconds       = None
+        self.migrations_applied = []
+
+    def _bin(self, name):
+        path = os.path.join(self.pg_bin, name) if self.pg_bin else shutil.which(name)
+        if not path or not os.path.exists(path):
+            raise RuntimeError(f"{name} introuvable : installer PostgreSQL, renseigner PG_BIN ou --admin-dsn")
+        return path
+
+    def __enter__(self):
+        try:
+            if self.admin_dsn:
+                self._create_database()
+            else:
+                self._start_cluster()
+
+            started = time.perf_counter()
+            conn    = psycopg2.connect(**self.config)
+            try:
+                load_dump(conn, self.dump)
+                self.migrations_applied = apply_migrations(conn, self.migrations)
+            finally:
+                conn.close()
+            self.load_seconds = time.perf_counter() - started
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        if self.admin_dsn and self._dbname:
+            conn = psycopg2.connect(self.admin_dsn)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(self._dbname)))
+            conn.close()
+            self._dbname = None
+        if self._tmpdir:
+            subprocess.run([self._bin("pg_ctl"), "stop", "-D", os.path.join(self._tmpdir, "data"), "-m", "immediate"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def _create_database(self):
+        self._dbname = f"bench_{uuid.uuid4().hex[:8]}"
+        conn = psycopg2.connect(self.admin_dsn)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(self._dbname)))
+        params = conn.get_dsn_parameters()
+        conn.close()
+        self.config = {
+            "host":     params.get("host"),
+            "port":     params.get("port", "5432"),
+            "dbname":   self._dbname,
+            "user":     params.get("user"),
+            "password": psycopg2.extensions.parse_dsn(self.admin_dsn).get("password", ""),
+        }
+
+    def _start_cluster(self):
+        self._tmpdir = tempfile.mkdtemp(prefix="bench_pg_")
+        data, socket_dir = os.path.join(self._tmpdir, "data"), self._tmpdir
+        subprocess.run(
+            [self._bin("initdb"), "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync"],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        # Durabilité désactivée : base jetable, on mesure les scripts et non les fsync
+        subprocess.run(
+            [self._bin("pg_ctl"), "start", "-D", data, "-w", "-l", os.path.join(self._tmpdir, "postgres.log"),
+             "-o", f"-k {socket_dir} -c listen_addresses='' -c fsync=off -c synchronous_commit=off"],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        self.config = {"host": socket_dir, "port": "5432", "dbname": "postgres", "user": "postgres", "password": ""}
+
+    def env(self):
+        return {
+            "DB_HOST":     self.config["host"],
+            "DB_PORT":     str(self.config["port"]),
+            "DB_NAME":     self.config["dbname"],
+            "DB_USER":     self.config["user"],
+            "DB_PASSWORD": self.config["password"] or "",
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--admin-dsn", default=None)
+    args = parser.parse_args()
+
+    with ThrowawayPostgres(args.admin_dsn) as db:
+        print(f"Base restaurée en {db.load_seconds:.1f}s (migrations : {', '.join(db.migrations_applied)})")
+        for key, value in db.env().items():
+            print(f"export {key}={value}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Checkpoint Chronos minuscule (poids aléatoires) pour les benchmarks.
+
+Même architecture T5 et même configuration Chronos que le modèle fine-tuné
+(tokenizer MeanScaleUniformBins, context_length 512), en quelques centaines
+de Ko : predict_api le charge comme un vrai checkpoint. Les prévisions n'ont
+aucun sens ; seul le coût du service (sérialisation, file, batching, HTTP)
+et l'ordre de grandeur du décodage sont mesurés.
+
+Usage :
+    python benchmarks/tiny_chronos.py /tmp/tiny-chronos
+    MODEL_PATH=/tmp/tiny-chronos PREDICT_BACKEND=float32 uvicorn scripts.predict_api:app
+"""
+import argparse
+import os
+
+
+def make_tiny_checkpoint(path, d_model=32, layers=2, n_tokens=4096, context_length=512, seed=0):
+    """Écrit le checkpoint dans `path` (s'il n'existe pas déjà) et renvoie `path`."""
+    if os.path.isfile(os.path.join(path, "config.json")):
+        return path
+
+    import torch
+    from transformers import T5Config, T5ForConditionalGeneration
+
+    config = T5Config(
+        vocab_size=n_tokens, d_model=d_model, d_ff=2 * d_model, d_kv=16,
+        num_layers=layers, num_decoder_layers=layers, num_heads=2,
+        decoder_start_token_id=0, pad_token_id=0, eos_token_id=1,
+    )
+    config.chronos_config = {
+        "tokenizer_class":   "MeanScaleUniformBins",
+        "tokenizer_kwargs":  {"low_limit": -15.0, "high_limit": 15.0},
+        "n_tokens":          n_tokens,
+        "n_special_tokens":  2,
+        "pad_token_id":      0,
+        "eos_token_id":      1,
+        "use_eos_token":     True,
+        "model_type":        "seq2seq",
+        "context_length":    context_length,
+        "prediction_length": 64,
+        "num_samples":       20,
+        "temperature":       1.0,
+        "top_k":             50,
+        "top_p":             1.0,
+    }
+    torch.manual_seed(seed)
+    T5ForConditionalGeneration(config).save_pretrained(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--d-model", type=int, default=32)
+    parser.add_argument("--layers", type=int, default=2)
+    args = parser.parse_args()
+    print(make_tiny_checkpoint(args.path, args.d_model, args.layers))
+
+
+if __name__ == "__main__":
+    main()
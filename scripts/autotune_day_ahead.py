@@ -0,0 +1,267 @@
+"""
+Réglage de num_samples, de la longueur de contexte et du backend d'inférence
+sous budget de latence.
+
+Chaque combinaison backend × longueur de contexte × num_samples est évaluée
+sur les jours d'origine [--start, --end] du backtest (backtest_day_ahead :
+504 h réelles + 24 h RTE, cible J+1 ; un contexte plus court garde les
+dernières heures, RTE comprises) : une prévision par origine, une requête à
+la fois comme our_predictions_day_ahead, chronométrée. Même graine par
+origine pour toutes les combinaisons : les écarts de précision ne viennent
+pas du tirage.
+
+Les combinaisons sont réparties sur un pool de --workers processus, chacun
+limité à --threads threads torch (workers × threads ≈ nombre de cœurs, pour
+que les latences restent comparables) ; un processus garde les backends
+qu'il a déjà chargés.
+
+Affiche toutes les combinaisons (latence p50/p95, MAE, MAPE) et marque le
+front de Pareto : aucune autre combinaison n'est à la fois plus rapide (p95)
+et plus précise (MAE). Retenue, parmi le front : la plus précise dont la
+latence p95 tient dans --budget-ms ; sans budget, la plus rapide dont la MAE
+reste à --tolerance % de la meilleure. Elle est écrite dans --profile
+(PREDICT_PROFILE) avec --threads, lu au démarrage par predict_api.py (threads
+torch par défaut compris) et our_predictions_day_ahead.py.
+
+Usage (depuis la racine du dépôt) :
+    python scripts/autotune_day_ahead.py --start 2025-01-01 --end 2025-03-31
+    python scripts/autotune_day_ahead.py --start 2025-01-01 --end 2025-01-31 \\
+        --num-samples 10,20,50 --context-lengths 168,336,528 --backends float32,bfloat16 --budget-ms 400
+    python scripts/autotune_day_ahead.py --start 2025-01-01 --end 2025-01-31 --dry-run   # profil non écrit
+"""
+import argparse
+import itertools
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+from dotenv import load_dotenv
+
+from backtest_day_ahead import HORIZON, REAL_HOURS, RTE_HOURS, build_origins, compute_metrics, load_hourly_series
+from predict_profile import save_profile
+
+# ─── Configuration du logging ────────────────────────────────────────────────
+# force=True : remplace la configuration posée à l'import de backtest_day_ahead
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("./logs/autotune_day_ahead.log"),
+        logging.StreamHandler()
+    ],
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+# ─── Chargement des variables d'environnement ────────────────────────────────
+load_dotenv()
+
+MODEL_PATH      = os.getenv("MODEL_PATH", "/home/ubuntu/electricity_consumption_dashbord/models/run-0/checkpoint-final")
+PREDICT_PROFILE = os.getenv("PREDICT_PROFILE", "models/predict_profile.json")
+ONNX_DIR        = os.getenv("PREDICT_ONNX_DIR", "") or None
+
+
+# ─── 1. Évaluation d'une combinaison (processus du pool) ─────────────────────
+_worker = {}
+
+
+def init_worker(model_path, contexts, actuals, threads, seed, onnx_dir):
+    import torch
+
+    torch.set_num_threads(threads)
+    _worker.update(
+        model_path=model_path, contexts=contexts, actuals=actuals,
+        threads=threads, seed=seed, onnx_dir=onnx_dir, pipelines={}
+    )
+
+
+def evaluate(backend, context_length, num_samples):
+    """Latences (ms) et précision de la médiane pour une combinaison, sur toutes les origines."""
+    import torch
+    from predict_loading import StartupTimings, load_pipeline
+
+    pipelines = _worker["pipelines"]
+    if backend not in pipelines:
+        pipelines[backend] = load_pipeline(
+            _worker["model_path"], "cpu", backend, StartupTimings(), _worker["onnx_dir"], _worker["threads"]
+        )
+    pipeline = pipelines[backend]
+
+    contexts = torch.from_numpy(np.ascontiguousarray(_worker["contexts"][:, -context_length:]))
+    pipeline.predict(contexts[:1], HORIZON, num_samples=num_samples)   # warm-up, hors mesure
+
+    latencies, medians = [], []
+    for i in range(len(contexts)):
+        torch.manual_seed(_worker["seed"] + i)
+        started  = time.perf_counter()
+        forecast = pipeline.predict(contexts[i:i + 1], HORIZON, num_samples=num_samples)
+        latencies.append((time.perf_counter() - started) * 1000)
+        medians.append(np.quantile(forecast.numpy()[0], 0.5, axis=0))
+
+    _, _, overall = compute_metrics(np.stack(medians), _worker["actuals"])
+    return {
+        "backend":        backend,
+        "context_length": context_length,
+        "num_samples":    num_samples,
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "mae":            round(overall["mae"], 1),
+        "mape":           round(overall["mape"], 3),
+        "rmse":           round(overall["rmse"], 1),
+    }
+
+
+def sweep(settings, contexts, actuals, model_path, workers, threads, seed, onnx_dir):
+    """Évalue `settings` sur le pool ; une combinaison en échec (backend indisponible...) est ignorée."""
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),   # pas de fork d'un processus torch
+        initializer=init_worker,
+        initargs=(model_path, contexts, actuals, threads, seed, onnx_dir)
+    ) as pool:
+        pending = {pool.submit(evaluate, *setting): setting for setting in settings}
+        for future in as_completed(pending):
+            backend, context_length, num_samples = pending[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning(f"⚠ {backend} / {context_length} h / {num_samples} échantillons : {e}")
+                continue
+            results.append(result)
+            logger.info(
+                f"  {len(results)}/{len(settings)} {backend} / {context_length} h / {num_samples} échantillons : "
+                f"p95 {result['latency_p95_ms']:.0f} ms, MAE {result['mae']:,.0f} MW"
+            )
+    return results
+
+
+# ─── 2. Front de Pareto et choix ─────────────────────────────────────────────
+def pareto_front(results):
+    """Combinaisons qu'aucune autre ne domine (p95 et MAE inférieures ou égales, l'une strictement)."""
+    def dominates(a, b):
+        return (
+            a["latency_p95_ms"] <= b["latency_p95_ms"] and a["mae"] <= b["mae"]
+            and (a["latency_p95_ms"] < b["latency_p95_ms"] or a["mae"] < b["mae"])
+        )
+    return [r for r in results if not any(dominates(other, r) for other in results)]
+
+
+def choose_setting(front, budget_ms=None, tolerance=1.0):
+    if budget_ms is not None:
+        within = [r for r in front if r["latency_p95_ms"] <= budget_ms]
+        if within:
+            return min(within, key=lambda r: r["mae"])
+        logger.warning(f"⚠ Aucune combinaison sous {budget_ms:.0f} ms (p95) : la plus rapide est retenue")
+        return min(front, key=lambda r: r["latency_p95_ms"])
+
+    best_mae = min(r["mae"] for r in front)
+    close    = [r for r in front if r["mae"] <= best_mae * (1 + tolerance / 100)]
+    return min(close, key=lambda r: r["latency_p95_ms"])
+
+
+def log_results(results, front, chosen):
+    logger.info("═══════════════════════════════════════════════════════════")
+    logger.info("  RÉSULTATS — latence par requête et précision J+1")
+    logger.info("═══════════════════════════════════════════════════════════")
+    logger.info(f"  {'backend':<9} | {'contexte':>8} | {'éch.':>4} | {'p50':>8} | {'p95':>8} | {'MAE':>7} | {'MAPE':>7} |")
+    for r in sorted(results, key=lambda r: (r["latency_p95_ms"], r["mae"])):
+        mark = "← retenue" if r is chosen else ("Pareto" if r in front else "")
+        logger.info(
+            f"  {r['backend']:<9} | {r['context_length']:6} h | {r['num_samples']:4} | "
+            f"{r['latency_p50_ms']:5.0f} ms | {r['latency_p95_ms']:5.0f} ms | {r['mae']:7,.0f} | "
+            f"{r['mape']:5.2f} % | {mark}"
+        )
+
+
+# ─── 3. Fonction principale ───────────────────────────────────────────────────
+def int_list(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", required=True, help="Premier jour d'origine (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, help="Dernier jour d'origine (YYYY-MM-DD, inclus)")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--num-samples", type=int_list, default=[10, 20, 50])
+    parser.add_argument("--context-lengths", type=int_list, default=[168, 336, 528],
+                        help="Heures de contexte (24 dernières = prévision RTE), 528 au plus")
+    parser.add_argument("--backends", default="float32,bfloat16,int8")
+    parser.add_argument("--workers", type=int, default=None, help="Processus du pool (défaut : cœurs / --threads)")
+    parser.add_argument("--threads", type=int, default=1, help="Threads torch par processus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Latence p95 max par requête")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="Sans --budget-ms : écart de MAE accepté (%%) par rapport à la meilleure")
+    parser.add_argument("--profile", default=PREDICT_PROFILE, help="Profil écrit (PREDICT_PROFILE)")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche le choix sans écrire le profil")
+    args = parser.parse_args()
+
+    if any(not RTE_HOURS < length <= REAL_HOURS + RTE_HOURS for length in args.context_lengths):
+        parser.error(f"--context-lengths : entre {RTE_HOURS + 1} et {REAL_HOURS + RTE_HOURS} heures")
+    if any(n < 1 for n in args.num_samples):
+        parser.error("--num-samples : au moins 1")
+    args.backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    args.workers  = args.workers or max(1, (os.cpu_count() or 1) // args.threads)
+    return args
+
+
+def main():
+    args      = parse_args()
+    start_day = datetime.strptime(args.start, "%Y-%m-%d")
+    end_day   = datetime.strptime(args.end, "%Y-%m-%d")
+
+    print("\n\n\n")
+    logger.info("═══════════════════════════════════════════════════════════")
+    logger.info(f"  Réglage d'inférence : origines {start_day.date()} → {end_day.date()}")
+    logger.info("═══════════════════════════════════════════════════════════")
+
+    started = time.perf_counter()
+    grid, real, rte = load_hourly_series(start_day, end_day)
+    days, contexts, actuals, _, _ = build_origins(grid, real, rte, start_day, end_day)
+    if len(days) == 0:
+        logger.error("Aucune origine exploitable sur cette période.")
+        return
+
+    settings = list(itertools.product(args.backends, args.context_lengths, args.num_samples))
+    logger.info(
+        f"{len(days)} origines, {len(settings)} combinaison(s) sur {args.workers} processus "
+        f"× {args.threads} thread(s)"
+    )
+    results = sweep(
+        settings, contexts.astype(np.float32), actuals, args.model,
+        args.workers, args.threads, args.seed, ONNX_DIR
+    )
+    if not results:
+        logger.error("✗ Aucune combinaison n'a pu être évaluée.")
+        return
+
+    front  = pareto_front(results)
+    chosen = choose_setting(front, args.budget_ms, args.tolerance)
+    log_results(results, front, chosen)
+    logger.info(
+        f"Retenue : {chosen['backend']}, {chosen['context_length']} h de contexte, "
+        f"{chosen['num_samples']} échantillons (p95 {chosen['latency_p95_ms']:.0f} ms, MAE {chosen['mae']:,.0f} MW)"
+    )
+
+    if not args.dry_run:
+        save_profile(args.profile, {
+            **chosen,
+            "model":      args.model,
+            "origins":    f"{start_day.date()} → {end_day.date()} ({len(days)} jours)",
+            "budget_ms":  args.budget_ms,
+            "threads":    args.threads,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        logger.info(f"✓ Profil écrit dans {args.profile} (lu au prochain démarrage de predict_api)")
+
+    logger.info(f"✓ Réglage terminé en {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
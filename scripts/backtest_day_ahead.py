@@ -0,0 +1,335 @@
+import os
+import argparse
+import logging
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+from db_bulk import bulk_upsert
+
+# ─── Configuration du logging ────────────────────────────────────────────────
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("./logs/backtest_day_ahead.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# ─── Chargement des variables d'environnement ────────────────────────────────
+load_dotenv()
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST'),
+    'port': os.getenv('DB_PORT'),
+    'database': os.getenv('DB_NAME'),
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASSWORD')
+}
+
+MODEL_PATH = os.getenv("MODEL_PATH", "/home/ubuntu/electricity_consumption_dashbord/models/run-0/checkpoint-final")
+
+PARIS_TZ     = "Europe/Paris"
+REAL_HOURS   = 504   # Historique réel avant minuit du jour d'origine
+RTE_HOURS    = 24    # Prévision RTE D-1 du jour d'origine
+HORIZON      = 24    # Jour J+1 prédit
+
+RESULTS_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS backtest_results (
+        run_id            text NOT NULL,
+        model_name        text NOT NULL,
+        origin_date       date NOT NULL,
+        "timestamp"       timestamp with time zone NOT NULL,
+        horizon           text NOT NULL,
+        actual_value      double precision,
+        predicted_value   double precision,
+        rte_forecast      double precision,
+        created_at        timestamp with time zone DEFAULT now(),
+        PRIMARY KEY (run_id, origin_date, "timestamp")
+    )
+"""
+
+DAILY_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS backtest_daily_metrics (
+        run_id            text NOT NULL,
+        model_name        text NOT NULL,
+        origin_date       date NOT NULL,
+        mae               double precision,
+        mape              double precision,
+        rmse              double precision,
+        rte_mae           double precision,
+        rte_mape          double precision,
+        rte_rmse          double precision,
+        created_at        timestamp with time zone DEFAULT now(),
+        PRIMARY KEY (run_id, origin_date)
+    )
+"""
+
+
+# ─── 1. Lecture groupée des séries (une requête par table) ───────────────────
+def load_hourly_series(start_day, end_day):
+    """
+    Charge en une fois tout l'historique réel et les prévisions RTE
+    nécessaires aux jours d'origine [start_day, end_day], sur une grille
+    horaire UTC continue (NaN pour les heures absentes).
+    """
+    first = pd.Timestamp(start_day).tz_localize(PARIS_TZ) - pd.Timedelta(hours=REAL_HOURS + RTE_HOURS)
+    last  = pd.Timestamp(end_day).tz_localize(PARIS_TZ) + pd.Timedelta(days=3)
+
+    logger.info(f"Lecture groupée {first} → {last}...")
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        df_real = pd.read_sql(
+            "SELECT timestamp, value FROM historical_data WHERE timestamp >= %s AND timestamp < %s",
+            conn, params=(first.to_pydatetime(), last.to_pydatetime())
+        )
+        df_rte = pd.read_sql(
+            "SELECT timestamp, forecast_value AS value FROM rte_forecasts WHERE timestamp >= %s AND timestamp < %s",
+            conn, params=(first.to_pydatetime(), last.to_pydatetime())
+        )
+    finally:
+        conn.close()
+
+    logger.info(f"  {len(df_real)} heures réelles, {len(df_rte)} heures de prévisions RTE")
+
+    grid = pd.date_range(first.tz_convert("UTC"), last.tz_convert("UTC"), freq="h", inclusive="left")
+
+    def to_grid(df):
+        series = pd.Series(df["value"].to_numpy(dtype=float), index=pd.to_datetime(df["timestamp"], utc=True))
+        series = series[~series.index.duplicated(keep="last")]
+        return series.reindex(grid).to_numpy()
+
+    return grid, to_grid(df_real), to_grid(df_rte)
+
+
+# ─── 2. Construction vectorisée des contextes hybrides ───────────────────────
+def build_origins(grid, real, rte, start_day, end_day, max_missing_ratio=0.05):
+    """
+    Pour chaque jour d'origine D : cible = 24h à partir de D+1 00:00 (heure
+    de Paris), contexte = les 528 heures qui la précèdent, 504h réelles puis
+    24h RTE (comme our_predictions_day_ahead, qui prend les dernières heures
+    de chaque table). Les positions partent de l'index de D+1 00:00 dans la
+    grille : les jours de 23 ou 25 heures ne décalent pas la cible. Retourne
+    les matrices (n_origines, …) et les origines gardées.
+    """
+    days = pd.date_range(start_day, end_day, freq="D")
+    end  = grid.get_indexer((days + pd.Timedelta(days=1)).tz_localize(PARIS_TZ).tz_convert("UTC"))
+
+    real_idx   = end[:, None] - RTE_HOURS + np.arange(-REAL_HOURS, 0)
+    rte_idx    = end[:, None] + np.arange(-RTE_HOURS, 0)
+    target_idx = end[:, None] + np.arange(0, HORIZON)
+
+    contexts = np.concatenate([real[real_idx], rte[rte_idx]], axis=1)
+    actuals  = real[target_idx]
+    rte_pred = rte[target_idx]
+
+    missing  = np.isnan(contexts).mean(axis=1)
+    keep     = (missing <= max_missing_ratio) & ~np.isnan(actuals).all(axis=1)
+    skipped  = days[~keep]
+    if len(skipped) > 0:
+        logger.warning(f"⚠ {len(skipped)} jour(s) d'origine ignoré(s) (contexte incomplet ou cible absente)")
+
+    targets = grid[target_idx[keep].ravel()]   # aplati : n_origines × 24
+    return days[keep], contexts[keep], actuals[keep], rte_pred[keep], targets
+
+
+# ─── 3. Inférence par lots ───────────────────────────────────────────────────
+def load_pipeline(model_path, backend):
+    import torch
+    from predict_loading import StartupTimings, load_pipeline as load_backend
+
+    device  = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    timings = StartupTimings()
+    logger.info(f"Chargement du modèle {model_path} ({device}, backend {backend})...")
+    pipeline = load_backend(model_path, device, backend, timings)
+    logger.info(f"✓ Modèle chargé ({timings.summary()})")
+    return pipeline
+
+
+def predict_batched(pipeline, contexts, batch_size, num_samples, seed=None):
+    import torch
+
+    if seed is not None:
+        torch.manual_seed(seed)
+
+    medians = []
+    for i in range(0, len(contexts), batch_size):
+        batch    = torch.tensor(contexts[i:i + batch_size], dtype=torch.float32)
+        forecast = pipeline.predict(batch, HORIZON, num_samples=num_samples)
+        medians.append(np.quantile(forecast.numpy(), 0.5, axis=1))
+        logger.info(f"  Lot {i // batch_size + 1} : {min(i + batch_size, len(contexts))}/{len(contexts)} origines")
+    return np.concatenate(medians, axis=0)
+
+
+# ─── 4. Métriques vectorisées ────────────────────────────────────────────────
+def compute_metrics(predicted, actual):
+    """MAE / MAPE (%) / RMSE par horizon (axe 0) et par jour d'origine (axe 1)."""
+    error     = predicted - actual
+    abs_error = np.abs(error)
+    pct_error = abs_error / np.abs(actual) * 100
+
+    def summarize(axis):
+        return {
+            "mae":  np.nanmean(abs_error, axis=axis),
+            "mape": np.nanmean(pct_error, axis=axis),
+            "rmse": np.sqrt(np.nanmean(error ** 2, axis=axis)),
+        }
+
+    overall = {
+        "mae":  float(np.nanmean(abs_error)),
+        "mape": float(np.nanmean(pct_error)),
+        "rmse": float(np.sqrt(np.nanmean(error ** 2))),
+    }
+    return summarize(axis=0), summarize(axis=1), overall
+
+
+def log_metrics(model_name, days, per_hour, rte_per_hour, per_day, rte_per_day, overall, rte_overall):
+    logger.info("═══════════════════════════════════════════════════════════")
+    logger.info(f"  RÉSULTATS BACKTEST — {model_name} vs RTE D-1")
+    logger.info("═══════════════════════════════════════════════════════════")
+    logger.info(f"  Modèle : MAE {overall['mae']:,.0f} MW | MAPE {overall['mape']:.2f} % | RMSE {overall['rmse']:,.0f} MW")
+    logger.info(f"  RTE    : MAE {rte_overall['mae']:,.0f} MW | MAPE {rte_overall['mape']:.2f} % | RMSE {rte_overall['rmse']:,.0f} MW")
+    logger.info("  Horizon | MAE modèle | MAE RTE | MAPE modèle | MAPE RTE")
+    for h in range(HORIZON):
+        logger.info(
+            f"  H+{h + 1:<5} | {per_hour['mae'][h]:10,.0f} | {rte_per_hour['mae'][h]:7,.0f} | "
+            f"{per_hour['mape'][h]:10.2f} % | {rte_per_hour['mape'][h]:7.2f} %"
+        )
+
+    wins = int(np.sum(per_day["mae"] < rte_per_day["mae"]))
+    logger.info(f"  Jours où le modèle bat RTE (MAE) : {wins}/{len(days)}")
+    for i in np.argsort(per_day["mae"])[::-1][:5]:
+        logger.info(
+            f"  Pire jour {days[i].date()} : MAE modèle {per_day['mae'][i]:,.0f} MW, "
+            f"RTE {rte_per_day['mae'][i]:,.0f} MW"
+        )
+
+
+# ─── 5. Écriture des résultats ───────────────────────────────────────────────
+def results_frame(run_id, model_name, days, targets, actuals, predicted, rte_pred):
+    n = len(days)
+    return pd.DataFrame({
+        "run_id":          run_id,
+        "model_name":      model_name,
+        "origin_date":     np.repeat(days.date, HORIZON),
+        "timestamp":       targets,
+        "horizon":         np.tile([f"H+{h + 1}" for h in range(HORIZON)], n),
+        "actual_value":    actuals.ravel(),
+        "predicted_value": predicted.ravel().round(2),
+        "rte_forecast":    rte_pred.ravel(),
+    })
+
+
+def daily_metrics_frame(run_id, model_name, days, per_day, rte_per_day):
+    return pd.DataFrame({
+        "run_id":      run_id,
+        "model_name":  model_name,
+        "origin_date": days.date,
+        "mae":         per_day["mae"],
+        "mape":        per_day["mape"],
+        "rmse":        per_day["rmse"],
+        "rte_mae":     rte_per_day["mae"],
+        "rte_mape":    rte_per_day["mape"],
+        "rte_rmse":    rte_per_day["rmse"],
+    })
+
+
+def save_results(df, df_daily, output=None, to_table=False):
+    if output:
+        root, ext = os.path.splitext(output)
+        df.to_parquet(output, index=False)
+        df_daily.to_parquet(f"{root}_daily{ext or '.parquet'}", index=False)
+        logger.info(f"✓ {len(df)} lignes écrites dans {output} (+ métriques journalières)")
+
+    if to_table:
+        conn = psycopg2.connect(**DB_CONFIG)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(RESULTS_TABLE_DDL)
+                cursor.execute(DAILY_TABLE_DDL)
+            counts = bulk_upsert(
+                conn,
+                "backtest_results",
+                list(df.columns),
+                df.itertuples(index=False, name=None),
+                conflict_columns=["run_id", "origin_date", "timestamp"],
+                update_columns=["actual_value", "predicted_value", "rte_forecast"]
+            )
+            daily_counts = bulk_upsert(
+                conn,
+                "backtest_daily_metrics",
+                list(df_daily.columns),
+                df_daily.itertuples(index=False, name=None),
+                conflict_columns=["run_id", "origin_date"],
+                update_columns=["mae", "mape", "rmse", "rte_mae", "rte_mape", "rte_rmse"]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        logger.info(f"✓ backtest_results : {counts['inserted']} lignes insérées, {counts['updated']} mises à jour")
+        logger.info(
+            f"✓ backtest_daily_metrics : {daily_counts['inserted']} jours insérés, {daily_counts['updated']} mis à jour"
+        )
+
+
+# ─── 6. Fonction principale ───────────────────────────────────────────────────
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backtest à origine glissante du pipeline J+1")
+    parser.add_argument("--start", required=True, help="Premier jour d'origine (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, help="Dernier jour d'origine (YYYY-MM-DD, inclus)")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--model-name", default="chronos-fine-tuned-j1")
+    parser.add_argument("--backend", "--dtype", dest="backend", default="bfloat16",
+                        choices=["float32", "bfloat16", "int8", "onnx"])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--num-samples", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Fichier Parquet des résultats détaillés")
+    parser.add_argument("--to-table", action="store_true", help="Écrire dans les tables backtest_results et backtest_daily_metrics")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start_day = datetime.strptime(args.start, "%Y-%m-%d")
+    end_day   = datetime.strptime(args.end, "%Y-%m-%d")
+    run_id    = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+    print("\n\n\n")
+    logger.info("═══════════════════════════════════════════════════════════")
+    logger.info(f"  Backtest {args.model_name} : origines {start_day.date()} → {end_day.date()} (run {run_id})")
+    logger.info("═══════════════════════════════════════════════════════════")
+
+    started = time.perf_counter()
+    grid, real, rte = load_hourly_series(start_day, end_day)
+    days, contexts, actuals, rte_pred, targets = build_origins(grid, real, rte, start_day, end_day)
+    logger.info(f"{len(days)} origines, contextes {contexts.shape}")
+    if len(days) == 0:
+        logger.error("Aucune origine exploitable sur cette période.")
+        return
+
+    pipeline  = load_pipeline(args.model, args.backend)
+    t_predict = time.perf_counter()
+    predicted = predict_batched(pipeline, contexts, args.batch_size, args.num_samples, args.seed)
+    logger.info(f"✓ Inférence : {time.perf_counter() - t_predict:.1f}s pour {len(days)} origines")
+
+    per_hour, per_day, overall         = compute_metrics(predicted, actuals)
+    rte_per_hour, rte_per_day, rte_overall = compute_metrics(rte_pred, actuals)
+    log_metrics(args.model_name, days, per_hour, rte_per_hour, per_day, rte_per_day, overall, rte_overall)
+
+    df       = results_frame(run_id, args.model_name, days, targets, actuals, predicted, rte_pred)
+    df_daily = daily_metrics_frame(run_id, args.model_name, days, per_day, rte_per_day)
+    save_results(df, df_daily, args.output, args.to_table)
+
+    logger.info(f"✓ Backtest terminé en {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Format binaire de /predict (alternative compacte au JSON).
+
+Type de contenu : application/x-chronos-f32 — tout est little-endian.
+
+Requête :
+    en-tête  <4s B B H H H I q>  magic b"CHRQ", version, flags,
+             prediction_length, num_samples, nb de quantiles,
+             longueur du contexte, graine (ignorée sans FLAG_SEED)
+    corps    quantiles float32[nq], puis contexte float32[n]
+
+Réponse :
+    en-tête  <4s B B H H H>      magic b"CHRS", version, flags,
+             prediction_length, nb de quantiles, num_samples (0 sans échantillons)
+    corps    float32[3] (moyenne, min, max), médiane float32[H],
+             niveaux float32[nq], bandes float32[nq × H],
+             puis échantillons float32[num_samples × H] si FLAG_SAMPLES
+
+Le décodage se fait sans copie (np.frombuffer sur le corps reçu).
+"""
+import struct
+
+import numpy as np
+
+CONTENT_TYPE = "application/x-chronos-f32"
+VERSION      = 1
+
+FLAG_RETURN_SAMPLES = 0x01   # Requête : renvoyer la matrice des échantillons
+FLAG_SEED           = 0x02   # Requête : la graine est renseignée
+FLAG_SAMPLES        = 0x01   # Réponse : la matrice des échantillons est présente
+
+_REQUEST_HEADER  = struct.Struct("<4sBBHHHIq")
+_RESPONSE_HEADER = struct.Struct("<4sBBHHH")
+_F32             = np.dtype("<f4")
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+# ─── Requête ─────────────────────────────────────────────────────────────────
+def encode_request(context, prediction_length=24, num_samples=50,
+                   quantiles=(), return_samples=False, seed=None):
+    context   = np.ascontiguousarray(context, dtype=_F32)
+    quantiles = np.ascontiguousarray(quantiles, dtype=_F32)
+    flags = (FLAG_RETURN_SAMPLES if return_samples else 0) | (FLAG_SEED if seed is not None else 0)
+    header = _REQUEST_HEADER.pack(
+        b"CHRQ", VERSION, flags, prediction_length, num_samples,
+        len(quantiles), len(context), seed or 0
+    )
+    return header + quantiles.tobytes() + context.tobytes()
+
+
+def decode_request(body):
+    if len(body) < _REQUEST_HEADER.size:
+        raise WireFormatError("En-tête binaire incomplet")
+    magic, version, flags, prediction_length, num_samples, n_quantiles, n_context, seed = (
+        _REQUEST_HEADER.unpack_from(body)
+    )
+    if magic != b"CHRQ" or version != VERSION:
+        raise WireFormatError(f"Format binaire inconnu ({magic!r}, v{version})")
+
+    expected = _REQUEST_HEADER.size + 4 * (n_quantiles + n_context)
+    if len(body) != expected:
+        raise WireFormatError(f"Taille du corps incohérente : {len(body)} octets au lieu de {expected}")
+
+    offset    = _REQUEST_HEADER.size
+    quantiles = np.frombuffer(body, dtype=_F32, count=n_quantiles, offset=offset)
+    context   = np.frombuffer(body, dtype=_F32, count=n_context, offset=offset + 4 * n_quantiles)
+
+    return {
+        "context":           context,
+        "prediction_length": prediction_length,
+        "num_samples":       num_samples,
+        "quantiles":         [float(q) for q in quantiles],
+        "return_samples":    bool(flags & FLAG_RETURN_SAMPLES),
+        "seed":              seed if flags & FLAG_SEED else None,
+    }
+
+
+# ─── Réponse ─────────────────────────────────────────────────────────────────
+def encode_response(median, mean, min_value, max_value, levels=(), bands=None, samples=None):
+    median = np.ascontiguousarray(median, dtype=_F32)
+    levels = np.ascontiguousarray(levels, dtype=_F32)
+    bands  = np.ascontiguousarray(
+        bands if bands is not None else np.empty((0, len(median))), dtype=_F32
+    )
+    n_samples = 0 if samples is None else len(samples)
+    header = _RESPONSE_HEADER.pack(
+        b"CHRS", VERSION, FLAG_SAMPLES if samples is not None else 0,
+        len(median), len(levels), n_samples
+    )
+    parts = [
+        header,
+        np.array([mean, min_value, max_value], dtype=_F32).tobytes(),
+        median.tobytes(),
+        levels.tobytes(),
+        bands.tobytes(),
+    ]
+    if samples is not None:
+        parts.append(np.ascontiguousarray(samples, dtype=_F32).tobytes())
+    return b"".join(parts)
+
+
+def decode_response(body):
+    magic, version, flags, horizon, n_quantiles, n_samples = _RESPONSE_HEADER.unpack_from(body)
+    if magic != b"CHRS" or version != VERSION:
+        raise WireFormatError(f"Format binaire inconnu ({magic!r}, v{version})")
+
+    values = np.frombuffer(body, dtype=_F32, offset=_RESPONSE_HEADER.size)
+    stats, values   = values[:3], values[3:]
+    median, values  = values[:horizon], values[horizon:]
+    levels, values  = values[:n_quantiles], values[n_quantiles:]
+    bands, values   = values[:n_quantiles * horizon].reshape(n_quantiles, horizon), values[n_quantiles * horizon:]
+
+    return {
+        "predictions": median,
+        "mean":        float(stats[0]),
+        "min":         float(stats[1]),
+        "max":         float(stats[2]),
+        "quantiles":   {f"{q:g}": bands[i] for i, q in enumerate(levels.round(6))},
+        "samples":     values.reshape(n_samples, horizon) if flags & FLAG_SAMPLES else None,
+    }
@@ -0,0 +1,115 @@
+"""
+Tenue à jour de dashboard_series (migration 004), lue par GET /api/data.
+
+Après un changement de DASHBOARD_MODEL, reconstruire la table :
+    python scripts/dashboard_series.py rebuild
+"""
+import logging
+import os
+import sys
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Table lue par GET /api/data (migration 004) et types RTE qu'elle reprend
+DASHBOARD_TABLE = "dashboard_series"
+DASHBOARD_TYPES = ("REALISED", "D-1")
+
+
+def dashboard_model():
+    """Modèle dont les prédictions sont affichées (un seul, parmi PREDICTION_MODELS)."""
+    return os.getenv("DASHBOARD_MODEL") or os.getenv("PREDICT_DEFAULT_MODEL") or "chronos-fine-tuned-j1"
+
+
+# Heures de [lower, upper[ recalculées à partir des séries sources ; une ligne
+# inchangée n'est pas réécrite. Notre prévision : celle de DASHBOARD_MODEL.
+_REFRESH_QUERY = """
+    INSERT INTO dashboard_series ("timestamp", true_value, rte_forecast, our_forecast)
+    SELECT hours.ts, real.value, rte.value, ours.predicted_value
+    FROM (
+        SELECT "timestamp" AS ts FROM rte_series
+        WHERE series_type IN ('REALISED', 'D-1')
+          AND "timestamp" >= %(lower)s AND "timestamp" < %(upper)s
+        UNION
+        SELECT "timestamp" FROM predictions
+        WHERE model_name = %(model)s
+          AND "timestamp" >= %(lower)s AND "timestamp" < %(upper)s
+    ) hours
+    LEFT JOIN rte_series real ON real.series_type = 'REALISED' AND real."timestamp" = hours.ts
+    LEFT JOIN rte_series rte  ON rte.series_type = 'D-1'      AND rte."timestamp"  = hours.ts
+    LEFT JOIN predictions ours ON ours.model_name = %(model)s AND ours."timestamp" = hours.ts
+    ON CONFLICT ("timestamp") DO UPDATE SET
+        true_value   = EXCLUDED.true_value,
+        rte_forecast = EXCLUDED.rte_forecast,
+        our_forecast = EXCLUDED.our_forecast,
+        updated_at   = now()
+    WHERE (dashboard_series.true_value, dashboard_series.rte_forecast, dashboard_series.our_forecast)
+          IS DISTINCT FROM (EXCLUDED.true_value, EXCLUDED.rte_forecast, EXCLUDED.our_forecast)
+"""
+
+
+def _bump_version(cur, changed):
+    cur.execute("UPDATE dashboard_version SET version = version + 1, updated_at = now() RETURNING version")
+    logger.info(f"Tableau de bord : {changed} heure(s) mise(s) à jour (version {cur.fetchone()[0]})")
+
+
+def refresh_dashboard(conn, timestamps, model=None):
+    """
+    Recalcule les heures de dashboard_series couvertes par `timestamps`
+    (ISO 8601 ou datetimes tz-aware) et, si une ligne a changé, incrémente
+    dashboard_version. Ne fait pas de COMMIT : la mise à jour part avec
+    l'écriture des séries. Retourne le nombre d'heures modifiées.
+    model : défaut dashboard_model().
+    """
+    if len(timestamps) == 0:
+        return 0
+
+    index = pd.DatetimeIndex(pd.to_datetime(list(timestamps), utc=True))
+    lower = index.min().floor("h")
+    upper = index.max().floor("h") + pd.Timedelta(hours=1)
+
+    with conn.cursor() as cur:
+        cur.execute(_REFRESH_QUERY, {"lower": lower.to_pydatetime(), "upper": upper.to_pydatetime(),
+                                     "model": model or dashboard_model()})
+        changed = cur.rowcount
+        if changed:
+            _bump_version(cur, changed)
+    return changed
+
+
+def rebuild_dashboard(conn, model=None):
+    """
+    Reconstruit toute la table (après un changement de DASHBOARD_MODEL) et
+    incrémente dashboard_version. Ne fait pas de COMMIT.
+    """
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM dashboard_series")
+        cur.execute(_REFRESH_QUERY, {"lower": "-infinity", "upper": "infinity",
+                                     "model": model or dashboard_model()})
+        changed = cur.rowcount
+        _bump_version(cur, changed)
+    return changed
+
+
+if __name__ == "__main__":
+    import psycopg2
+    from dotenv import load_dotenv
+
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit(__doc__)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    load_dotenv()
+    conn = psycopg2.connect(
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD")
+    )
+    try:
+        rebuild_dashboard(conn)
+        conn.commit()
+        logger.info(f"✓ dashboard_series reconstruite (modèle {dashboard_model()})")
+    finally:
+        conn.close()
@@ -0,0 +1,147 @@
+import io
+import json
+import logging
+import math
+import os
+from datetime import date, datetime
+
+from psycopg2 import sql
+
+from db_partitions import is_partitioned
+
+logger = logging.getLogger(__name__)
+
+# ─── Taille des lots envoyés par COPY ────────────────────────────────────────
+DEFAULT_BATCH_SIZE = int(os.getenv("DB_BULK_BATCH_SIZE", "10000"))
+
+
+# ─── Sérialisation au format texte de COPY ───────────────────────────────────
+def _copy_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return r"\N"
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    text = str(value)
+    return (
+        text.replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+    )
+
+
+def _copy_buffer(rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(v) for v in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ─── Upsert ensembliste via table de transit ─────────────────────────────────
+def bulk_upsert(conn, table, columns, rows, conflict_columns,
+                update_columns=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insère `rows` (tuples dans l'ordre de `columns`) dans `table` par lots :
+    COPY vers une table temporaire, puis un seul
+    INSERT ... SELECT ... ON CONFLICT par lot.
+
+    - `update_columns` vide : ON CONFLICT DO NOTHING (les doublons sont ignorés) ;
+    - sinon : DO UPDATE de ces colonnes, seulement si une valeur change.
+
+    Les doublons de clé à l'intérieur d'un même lot sont dédoublonnés (la
+    dernière ligne l'emporte en mise à jour, la première sinon).
+    Ne fait pas de COMMIT : la transaction reste à la main de l'appelant.
+
+    Retourne {"inserted", "updated", "skipped"}.
+    """
+    update_columns = list(update_columns or [])
+    stage = sql.Identifier(f"_stage_{table}")
+    cols  = sql.SQL(", ").join(map(sql.Identifier, columns))
+    keys  = sql.SQL(", ").join(map(sql.Identifier, conflict_columns))
+    order = sql.SQL("DESC" if update_columns else "ASC")
+
+    if update_columns:
+        on_conflict = sql.SQL("DO UPDATE SET {sets} WHERE ({current}) IS DISTINCT FROM ({incoming})").format(
+            sets=sql.SQL(", ").join(
+                sql.SQL("{c} = EXCLUDED.{c}").format(c=sql.Identifier(c)) for c in update_columns
+            ),
+            current=sql.SQL(", ").join(
+                sql.SQL("{t}.{c}").format(t=sql.Identifier(table), c=sql.Identifier(c)) for c in update_columns
+            ),
+            incoming=sql.SQL(", ").join(
+                sql.SQL("EXCLUDED.{c}").format(c=sql.Identifier(c)) for c in update_columns
+            ),
+        )
+    else:
+        on_conflict = sql.SQL("DO NOTHING")
+
+    # Insertion ou mise à jour : xmax = 0 pour une ligne neuve. Une table
+    # partitionnée n'expose pas xmax dans RETURNING : on compare alors aux
+    # clés déjà présentes (même instantané que l'INSERT).
+    if is_partitioned(conn, table):
+        existing = sql.SQL(
+            "existing AS (SELECT {keys} FROM {table} t JOIN {stage} s USING ({keys})),"
+        ).format(table=sql.Identifier(table), stage=stage, keys=keys)
+        returning = sql.SQL("({keys}) NOT IN (SELECT {keys} FROM existing)").format(keys=keys)
+    else:
+        existing  = sql.SQL("")
+        returning = sql.SQL("(xmax = 0)")
+
+    upsert = sql.SQL("""
+        WITH {existing} upserted AS (
+            INSERT INTO {table} ({cols})
+            SELECT DISTINCT ON ({keys}) {cols}
+            FROM {stage}
+            ORDER BY {keys}, ctid {order}
+            ON CONFLICT ({keys}) {on_conflict}
+            RETURNING {returning} AS is_insert
+        )
+        SELECT
+            COUNT(*) FILTER (WHERE is_insert),
+            COUNT(*) FILTER (WHERE NOT is_insert)
+        FROM upserted
+    """).format(
+        table=sql.Identifier(table), cols=cols, keys=keys, stage=stage, order=order,
+        on_conflict=on_conflict, existing=existing, returning=returning
+    )
+
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS pg_temp.{stage}").format(stage=stage))
+        cursor.execute(
+            sql.SQL("CREATE TEMP TABLE {stage} AS SELECT {cols} FROM {table} WITH NO DATA").format(
+                stage=stage, cols=cols, table=sql.Identifier(table)
+            )
+        )
+
+        copy = sql.SQL("COPY {stage} ({cols}) FROM STDIN").format(stage=stage, cols=cols).as_string(cursor)
+
+        for batch in _batches(rows, batch_size):
+            cursor.execute(sql.SQL("TRUNCATE {stage}").format(stage=stage))
+            cursor.copy_expert(copy, _copy_buffer(batch))
+            cursor.execute(upsert)
+            inserted, updated = cursor.fetchone()
+
+            counts["inserted"] += inserted
+            counts["updated"]  += updated
+            counts["skipped"]  += len(batch) - inserted - updated
+
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS pg_temp.{stage}").format(stage=stage))
+
+    return counts
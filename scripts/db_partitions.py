@@ -0,0 +1,95 @@
+import logging
+from datetime import datetime, timezone
+
+import pandas as pd
+from psycopg2 import sql
+
+logger = logging.getLogger(__name__)
+
+# Partitions (et tables partitionnées) déjà vérifiées par ce processus : pas
+# de requête catalogue ni de DDL à chaque écriture
+_known_partitions   = set()
+_partitioned_tables = set()
+
+
+# ─── Partitions mensuelles (bornes en UTC) ───────────────────────────────────
+def month_start(ts):
+    ts = ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+    return datetime(ts.year, ts.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(month):
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def months_between(start, end):
+    """Débuts de mois couvrant [start, end] inclus."""
+    month, last = month_start(start), month_start(end)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def partition_name(table, month):
+    return f"{table}_{month:%Y_%m}"
+
+
+def ensure_monthly_partitions(conn, table, start, end, prefix=None):
+    """
+    Crée les partitions mensuelles de `table` couvrant [start, end] si elles
+    manquent. Un verrou consultatif par table sérialise les créations
+    concurrentes ; le COMMIT reste à la main de l'appelant.
+
+    `prefix` : nom des partitions s'il diffère de celui de la table (table
+    en cours de construction sous un nom provisoire, voir partition_tables.py).
+    """
+    missing = [m for m in months_between(start, end) if (table, m) not in _known_partitions]
+    if not missing:
+        return []
+
+    created = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (table,))
+        for month in missing:
+            name = partition_name(prefix or table, month)
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.{name}",))
+            if cur.fetchone()[0]:
+                # Mise en cache seulement une fois visible : une création annulée par
+                # ROLLBACK sera refaite au prochain appel
+                _known_partitions.add((table, month))
+            else:
+                cur.execute(
+                    sql.SQL("CREATE TABLE public.{part} PARTITION OF public.{table} FOR VALUES FROM (%s) TO (%s)").format(
+                        part=sql.Identifier(name), table=sql.Identifier(table)
+                    ),
+                    (month, next_month(month))
+                )
+                created.append(name)
+
+    if created:
+        logger.info(f"Partitions créées : {', '.join(created)}")
+    return created
+
+
+def is_partitioned(conn, table):
+    """Vrai si `table` est une table partitionnée (résultat positif mis en cache)."""
+    if table in _partitioned_tables:
+        return True
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        row = cur.fetchone()
+    if row and row[0]:
+        _partitioned_tables.add(table)
+        return True
+    return False
+
+
+def ensure_partitions_for(conn, table, timestamps):
+    """
+    Partitions couvrant `timestamps` (chaînes ISO ou datetimes) avant une
+    écriture dans `table`. Sans effet si la table n'est pas partitionnée.
+    """
+    if len(timestamps) == 0 or not is_partitioned(conn, table):
+        return []
+    stamps = pd.to_datetime(pd.Series(list(timestamps)), utc=True)
+    return ensure_monthly_partitions(conn, table, stamps.min().to_pydatetime(), stamps.max().to_pydatetime())
@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# ─── Destination des métriques des scripts ETL ───────────────────────────────
+# ETL_METRICS_FORMAT : jsonl, textfile, both ou none
+#   - jsonl    : une ligne JSON par étape dans ETL_METRICS_JSONL
+#   - textfile : <ETL_METRICS_TEXTFILE_DIR>/<job>.prom au format Prometheus
+#                (collecteur textfile de node_exporter)
+# ETL_PUSHGATEWAY_URL renseignée : envoi en plus vers un Pushgateway.
+METRICS_FORMAT       = os.getenv("ETL_METRICS_FORMAT", "jsonl")
+METRICS_JSONL        = os.getenv("ETL_METRICS_JSONL", "./logs/etl_metrics.jsonl")
+METRICS_TEXTFILE_DIR = os.getenv("ETL_METRICS_TEXTFILE_DIR", "./logs/metrics")
+PUSHGATEWAY_URL      = os.getenv("ETL_PUSHGATEWAY_URL", "")
+
+
+class StageTimer:
+    """
+    Durées par étape d'un run ETL (auth, fetch, clean, db_write, predict...).
+
+    Une étape exécutée plusieurs fois (fenêtres du rattrapage, tentatives,
+    modèles) cumule sa durée, son nombre d'appels et ses erreurs ; les champs
+    numériques passés à `stage(..., rows=n)` sont additionnés. Utilisable
+    depuis plusieurs threads. `finish()` écrit le bilan du run.
+    """
+
+    def __init__(self, job):
+        self.job     = job
+        self.run_id  = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.started = time.time()
+        self.stages  = {}
+        self._lock   = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.add(name, time.perf_counter() - start, error, **fields)
+
+    def add(self, name, seconds, error=False, **fields):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "errors": 0})
+            stage["seconds"] += seconds
+            stage["calls"]   += 1
+            stage["errors"]  += int(error)
+            for key, value in fields.items():
+                stage[key] = stage.get(key, 0) + value
+
+    def summary(self):
+        return " | ".join(f"{name} {stage['seconds']:.2f}s" for name, stage in self.stages.items())
+
+    # ─── Écriture du bilan ───────────────────────────────────────────────────
+    def finish(self, success=True):
+        """Écrit les métriques du run ; une erreur d'écriture n'interrompt pas le script."""
+        duration = time.time() - self.started
+        logger.info(f"Durées par étape ({self.job}) : {self.summary()} | total {duration:.2f}s")
+        try:
+            if METRICS_FORMAT in ("jsonl", "both"):
+                self._write_jsonl(success, duration)
+            if METRICS_FORMAT in ("textfile", "both") or PUSHGATEWAY_URL:
+                self._write_prometheus(success, duration)
+        except Exception as e:
+            logger.warning(f"⚠ Métriques ETL non écrites : {e}")
+
+    def _write_jsonl(self, success, duration):
+        timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        lines = [
+            {"ts": timestamp, "job": self.job, "run_id": self.run_id, "stage": name,
+             **{key: round(value, 4) if isinstance(value, float) else value for key, value in stage.items()}}
+            for name, stage in self.stages.items()
+        ]
+        lines.append({"ts": timestamp, "job": self.job, "run_id": self.run_id, "stage": "total",
+                      "seconds": round(duration, 4), "success": success})
+
+        os.makedirs(os.path.dirname(METRICS_JSONL) or ".", exist_ok=True)
+        with open(METRICS_JSONL, "a") as f:
+            for line in lines:
+                f.write(json.dumps(line) + "\n")
+
+    def _write_prometheus(self, success, duration):
+        from prometheus_client import CollectorRegistry, Gauge, push_to_gateway, write_to_textfile
+
+        registry = CollectorRegistry()
+        seconds  = Gauge("etl_stage_duration_seconds", "Durée cumulée de l'étape au dernier run",
+                         ["job", "stage"], registry=registry)
+        calls    = Gauge("etl_stage_calls", "Exécutions de l'étape au dernier run",
+                         ["job", "stage"], registry=registry)
+        errors   = Gauge("etl_stage_errors", "Erreurs de l'étape au dernier run",
+                         ["job", "stage"], registry=registry)
+        for name, stage in self.stages.items():
+            seconds.labels(self.job, name).set(stage["seconds"])
+            calls.labels(self.job, name).set(stage["calls"])
+            errors.labels(self.job, name).set(stage["errors"])
+
+        Gauge("etl_run_duration_seconds", "Durée totale du dernier run",
+              ["job"], registry=registry).labels(self.job).set(duration)
+        Gauge("etl_last_run_success", "1 si le dernier run a réussi",
+              ["job"], registry=registry).labels(self.job).set(int(success))
+        Gauge("etl_last_run_timestamp_seconds", "Fin du dernier run (epoch)",
+              ["job"], registry=registry).labels(self.job).set(time.time())
+
+        if METRICS_FORMAT in ("textfile", "both"):
+            os.makedirs(METRICS_TEXTFILE_DIR, exist_ok=True)
+            write_to_textfile(os.path.join(METRICS_TEXTFILE_DIR, f"{self.job}.prom"), registry)
+        if PUSHGATEWAY_URL:
+            push_to_gateway(PUSHGATEWAY_URL, job=self.job, registry=registry)
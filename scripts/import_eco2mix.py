@@ -0,0 +1,302 @@
+"""
+Import des archives eCO2mix de RTE (consommation réalisée) dans rte_series,
+série REALISED (la vue historical_data la reprend).
+
+Formats lus :
+  - archives annuelles « eCO2mix_RTE_Annuel-Definitif_AAAA.zip » : un fichier
+    .xls qui est en réalité du texte tabulé latin-1 (colonnes Date, Heures,
+    Consommation en heure locale, ligne d'avertissement en fin de fichier) ;
+  - exports CSV open data (« ; », UTF-8, colonnes Date - Heure avec offset et
+    Consommation (MW)), zippés ou non.
+
+Chaque fichier est lu par morceaux de --chunk-rows lignes : heure locale →
+UTC (l'heure répétée d'octobre est attribuée à +02:00 puis à +01:00 dans
+l'ordre du fichier), moyenne horaire des quarts d'heure avec les règles de
+l'ETL RTE (rte_cleaning.aggregate_hourly_utc), puis COPY vers PostgreSQL
+(rte_series.upsert_hours) et COMMIT par morceau. La mémoire ne dépend pas de la
+taille du fichier.
+
+--dry-run lit et agrège sans toucher à la base, et affiche les heures
+produites, les trous et la mémoire maximale. Des fichiers d'exemple
+(changements d'heure inclus) sont dans backend/samples/eco2mix/.
+
+Usage (depuis la racine du dépôt) :
+    python scripts/import_eco2mix.py eCO2mix_RTE_Annuel-Definitif_2019.zip eCO2mix_RTE_Annuel-Definitif_2020.zip
+    python scripts/import_eco2mix.py --update eCO2mix_RTE_Annuel-Definitif_2023.zip
+    python scripts/import_eco2mix.py --dry-run backend/samples/eco2mix/*
+"""
+import argparse
+import io
+import logging
+import os
+import resource
+import unicodedata
+import zipfile
+
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+from etl_metrics import StageTimer
+from rte_cleaning import PARIS_TZ, aggregate_hourly_utc, parse_rte_timestamps
+from rte_series import upsert_hours
+
+# ─── Configuration du logging ────────────────────────────────────────────────
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("./logs/import_eco2mix.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# ─── Chargement des variables d'environnement ────────────────────────────────
+load_dotenv()
+
+DB_HOST     = os.getenv("DB_HOST")
+DB_PORT     = os.getenv("DB_PORT")
+DB_NAME     = os.getenv("DB_NAME")
+DB_USER     = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+CHUNK_ROWS = int(os.getenv("ECO2MIX_CHUNK_ROWS", "20000"))
+SOURCE     = "RTE eCO2mix"
+
+# En-têtes reconnus, sans accents ni casse
+COLUMNS = {
+    "perimetre":         "perimeter",
+    "date":              "date",
+    "heures":            "time",
+    "heure":             "time",
+    "date - heure":      "datetime",
+    "consommation":      "value",
+    "consommation (mw)": "value",
+}
+
+metrics = StageTimer("import_eco2mix")
+
+
+# ─── 1. Fichiers et format ───────────────────────────────────────────────────
+def _normalize(header):
+    text = unicodedata.normalize("NFKD", str(header)).encode("ascii", "ignore").decode()
+    return " ".join(text.lower().split())
+
+
+def iter_sources(path):
+    """(nom, ouvreur binaire) pour un fichier texte ou chaque fichier d'une archive .zip."""
+    if not zipfile.is_zipfile(path):
+        yield os.path.basename(path), lambda: open(path, "rb")
+        return
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.infolist():
+            if not member.is_dir():
+                yield f"{os.path.basename(path)}:{member.filename}", lambda m=member: archive.open(m)
+
+
+def sniff(open_source):
+    """Encodage et séparateur d'après la ligne d'en-tête."""
+    with open_source() as stream:
+        head = stream.read(64 * 1024)
+    if head.startswith((b"\xd0\xcf\x11\xe0", b"PK\x03\x04")):
+        raise ValueError("classeur Excel binaire : l'exporter en CSV (les archives eCO2mix .xls sont du texte)")
+
+    header = head.split(b"\n", 1)[0]
+    try:
+        encoding = "utf-8-sig"
+        header   = header.decode(encoding)
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+        header   = header.decode(encoding)
+    separator = max(("\t", ";", ","), key=header.count)
+    return encoding, separator
+
+
+# ─── 2. Lecture par morceaux : quarts d'heure en UTC ─────────────────────────
+def read_chunks(open_source, chunk_rows=CHUNK_ROWS):
+    """Morceaux de --chunk-rows lignes, colonnes renommées selon COLUMNS."""
+    encoding, separator = sniff(open_source)
+    with open_source() as stream:
+        reader = pd.read_csv(
+            io.TextIOWrapper(stream, encoding=encoding, newline=""),
+            sep=separator,
+            dtype=str,
+            index_col=False,
+            usecols=lambda header: _normalize(header) in COLUMNS,
+            chunksize=chunk_rows
+        )
+        for chunk in reader:
+            yield chunk.rename(columns=lambda header: COLUMNS[_normalize(header)])
+
+
+class LocalClock:
+    """
+    Heure locale (Date + Heures) → UTC d'un morceau à l'autre. Heure répétée
+    d'octobre : première occurrence à +02:00, seconde à +01:00 ; heures
+    inexistantes de mars : ignorées.
+    """
+
+    def __init__(self):
+        self.seen_ambiguous = set()
+
+    def to_utc(self, local):
+        local   = pd.DatetimeIndex(local)
+        first   = ~local.duplicated(keep="first") & ~local.isin(list(self.seen_ambiguous))
+        aware   = local.tz_localize(PARIS_TZ, ambiguous=first, nonexistent="NaT")
+        repeats = local.tz_localize(PARIS_TZ, ambiguous="NaT", nonexistent="NaT").isna() & aware.notna()
+        self.seen_ambiguous.update(local[repeats])
+        return aware.tz_convert("UTC")
+
+
+def quarter_hours(chunks):
+    """(DatetimeIndex UTC, valeurs) par morceau ; lignes sans date ni valeur (avertissement final) écartées."""
+    clock = LocalClock()
+    for chunk in chunks:
+        if "perimeter" in chunk:
+            chunk = chunk[chunk["perimeter"].isna() | (chunk["perimeter"].str.strip() == "France")]
+        values = pd.to_numeric(chunk["value"], errors="coerce")
+
+        if "datetime" in chunk:
+            keep  = chunk["datetime"].notna() & values.notna()
+            index = parse_rte_timestamps(chunk.loc[keep, "datetime"].str.strip())
+        else:
+            local = pd.to_datetime(chunk["date"].str.strip() + " " + chunk["time"].str.strip(),
+                                   format="%Y-%m-%d %H:%M", errors="coerce")
+            keep  = local.notna() & values.notna()
+            index = clock.to_utc(local[keep])
+            keep  = keep.to_numpy().copy()
+            keep[keep] = index.notna()
+            index = index[index.notna()]
+        yield index, values[keep].to_numpy()
+
+
+# ─── 3. Agrégation horaire en flux ───────────────────────────────────────────
+def hourly_chunks(chunks):
+    """
+    Moyennes horaires (rte_cleaning.HOURLY_COLUMNS) morceau par morceau. Les
+    quarts d'heure de la dernière heure d'un morceau sont reportés au suivant :
+    une heure n'est agrégée qu'une fois complète. Suppose un fichier trié.
+    """
+    carry = pd.Series(dtype="float64")
+    for index, values in chunks:
+        series = pd.Series(values, index=index, dtype="float64")
+        series = series if carry.empty else pd.concat([carry, series])
+        if series.empty:
+            continue
+        last_hour = series.index.max().floor("h")
+        carry     = series[series.index >= last_hour]
+        done      = series[series.index < last_hour]
+        if not done.empty:
+            yield aggregate_hourly_utc(done.index, done.to_numpy())
+    if not carry.empty:
+        yield aggregate_hourly_utc(carry.index, carry.to_numpy())
+
+
+class ImportStats:
+    """Compteurs en flux : heures produites, bornes et trous entre heures consécutives."""
+
+    def __init__(self):
+        self.hours = 0
+        self.first = None
+        self.last  = None
+        self.gaps  = []
+
+    def add(self, df_hourly):
+        index = parse_rte_timestamps(df_hourly["start_date"])
+        if self.last is not None:
+            index = index.insert(0, self.last)
+        steps = index.to_series().diff().dropna()
+        for ts, step in steps[steps > pd.Timedelta(hours=1)].items():
+            self.gaps.append((ts - step + pd.Timedelta(hours=1), int(step / pd.Timedelta(hours=1)) - 1))
+        self.first  = self.first if self.first is not None else index[0]
+        self.last   = index[-1]
+        self.hours += len(df_hourly)
+
+    def report(self, name):
+        if self.first is None:
+            logger.warning(f"⚠ {name} : aucune heure lue")
+            return
+        logger.info(
+            f"✓ {name} : {self.hours} heure(s) du {self.first.tz_convert(PARIS_TZ):%Y-%m-%d %H:%M} "
+            f"au {self.last.tz_convert(PARIS_TZ):%Y-%m-%d %H:%M}"
+        )
+        for start, hours in self.gaps[:10]:
+            logger.warning(f"⚠ {hours} heure(s) manquante(s) à partir du {start.tz_convert(PARIS_TZ):%Y-%m-%d %H:%M%z}")
+
+
+# ─── 4. Insertion dans PostgreSQL ────────────────────────────────────────────
+def connect_db():
+    return psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD
+    )
+
+
+def insert_hours(conn, df, update=False):
+    """COPY + upsert d'un morceau horaire ; `update` remplace les valeurs déjà en base."""
+    counts = upsert_hours(conn, "REALISED", df["start_date"], df["mean_value_hourly"], SOURCE, update)
+    conn.commit()
+    return counts
+
+
+def import_file(path, conn=None, update=False, chunk_rows=CHUNK_ROWS):
+    """Importe chaque fichier de `path` ; sans `conn`, lecture et agrégation seules (--dry-run)."""
+    totals = {"inserted": 0, "updated": 0, "skipped": 0}
+    for name, open_source in iter_sources(path):
+        stats  = ImportStats()
+        chunks = hourly_chunks(quarter_hours(read_chunks(open_source, chunk_rows)))
+        while True:
+            with metrics.stage("read_clean"):
+                df = next(chunks, None)
+            if df is None:
+                break
+            stats.add(df)
+            if conn is not None:
+                with metrics.stage("db_write", rows=len(df)):
+                    counts = insert_hours(conn, df, update)
+                for key in totals:
+                    totals[key] += counts[key]
+        stats.report(name)
+    return totals
+
+
+# ─── 5. Fonction principale ───────────────────────────────────────────────────
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Archives .zip, fichiers .xls (texte) ou .csv")
+    parser.add_argument("--dry-run", action="store_true", help="Lire et agréger sans écrire en base")
+    parser.add_argument("--update", action="store_true", help="Remplacer les heures déjà en base")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logger.info(f"═══ Import eCO2mix : {len(args.paths)} fichier(s){' (dry-run)' if args.dry_run else ''} ═══")
+    success = False
+    conn    = None if args.dry_run else connect_db()
+    try:
+        totals = {"inserted": 0, "updated": 0, "skipped": 0}
+        for path in args.paths:
+            for key, count in import_file(path, conn, args.update, args.chunk_rows).items():
+                totals[key] += count
+        if conn is not None:
+            logger.info(
+                f"✓ rte_series (REALISED) : {totals['inserted']} ligne(s) insérée(s), "
+                f"{totals['updated']} mise(s) à jour, {totals['skipped']} ignorée(s)"
+            )
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        logger.info(f"Mémoire max : {peak_mb:.0f} Mo")
+        success = True
+    finally:
+        if conn is not None:
+            conn.close()
+        metrics.finish(success)
+
+
+if __name__ == "__main__":
+    main()
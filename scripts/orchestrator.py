@@ -0,0 +1,322 @@
+"""
+Orchestrateur résident des pipelines ETL (remplace les entrées cron).
+
+Un seul processus asyncio exécute les trois pipelines comme des tâches :
+  - realised : consommation réalisée J-1 (fetch_rte_data), chaque jour à
+    ORCH_REALISED_AT ;
+  - forecast : prévisions RTE D-1 pour demain (fetch_rte_forecast), chaque
+    jour à ORCH_FORECAST_AT ;
+  - predict  : prédictions J+1 (our_predictions_day_ahead), déclenchée par
+    l'événement « forecast_loaded » et non par une heure fixe ;
+  - partitions : partitions mensuelles des mois à venir (partition_tables),
+    chaque jour à ORCH_PARTITIONS_AT.
+
+Ressources partagées entre les runs : une requests.Session par job
+(connexions HTTP/TLS gardées ouvertes ; une Session n'est jamais utilisée
+par deux threads à la fois), un pool de connexions PostgreSQL et le token
+OAuth RTE en cache (renouvelé à l'expiration). Les étapes bloquantes
+(HTTP, pandas, PostgreSQL) tournent dans des threads : une tâche qui attend
+ne bloque jamais les autres.
+
+Échec d'un run : nouvel essai après un délai exponentiel avec jitter
+(ORCH_RETRY_BASE_SECONDS × 2^(n-1), plafonné à ORCH_RETRY_MAX_SECONDS, tiré
+uniformément entre 0 et ce plafond), au plus ORCH_RETRY_ATTEMPTS essais.
+Un job déjà en cours n'est pas relancé en parallèle.
+
+Usage (depuis la racine du dépôt) :
+    python scripts/orchestrator.py                  # résident
+    python scripts/orchestrator.py --run forecast   # forecast puis predict, puis sortie
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import signal
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import psycopg2
+import requests
+from psycopg2.pool import ThreadedConnectionPool
+
+import fetch_rte_data as realised
+import fetch_rte_forecast as forecast
+import our_predictions_day_ahead as day_ahead
+import partition_tables
+from etl_metrics import StageTimer
+import rte_ingest
+from rte_ingest import PARIS_TZ, RateLimiter, TokenCache
+
+# ─── Configuration du logging ────────────────────────────────────────────────
+# force=True : remplace la configuration posée à l'import des scripts
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+    handlers=[
+        logging.FileHandler("./logs/orchestrator.log"),
+        logging.StreamHandler()
+    ],
+    force=True
+)
+logger = logging.getLogger("orchestrator")
+
+# ─── Paramètres ──────────────────────────────────────────────────────────────
+REALISED_AT        = os.getenv("ORCH_REALISED_AT", "02:00")   # heure de Paris
+FORECAST_AT        = os.getenv("ORCH_FORECAST_AT", "20:00")
+PARTITIONS_AT      = os.getenv("ORCH_PARTITIONS_AT", "01:00")
+RETRY_ATTEMPTS     = int(os.getenv("ORCH_RETRY_ATTEMPTS", "6"))
+RETRY_BASE_SECONDS = float(os.getenv("ORCH_RETRY_BASE_SECONDS", "60"))
+RETRY_MAX_SECONDS  = float(os.getenv("ORCH_RETRY_MAX_SECONDS", "1800"))
+DB_POOL_SIZE       = int(os.getenv("ORCH_DB_POOL_SIZE", "4"))
+
+
+class NotReady(Exception):
+    """Données pas encore publiées par RTE : le run sera retenté."""
+
+
+# ─── 1. Ressources partagées ─────────────────────────────────────────────────
+class Resources:
+    def __init__(self, pool_size=DB_POOL_SIZE):
+        self.http    = {}   # job → requests.Session, voir session()
+        self.tokens  = TokenCache(session=requests.Session())   # utilisée sous le verrou du cache
+        self.limiter = RateLimiter(realised.BACKFILL_RATE_LIMIT)
+        self.pool    = ThreadedConnectionPool(
+            0, pool_size,
+            host=rte_ingest.DB_HOST,
+            port=rte_ingest.DB_PORT,
+            dbname=rte_ingest.DB_NAME,
+            user=rte_ingest.DB_USER,
+            password=rte_ingest.DB_PASSWORD
+        )
+
+    @contextmanager
+    def connection(self):
+        """Connexion empruntée au pool ; fermée plutôt que rendue si elle est cassée."""
+        conn = self.pool.getconn()
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            self.pool.putconn(conn, close=True)
+            raise
+        except BaseException:
+            conn.rollback()
+            self.pool.putconn(conn)
+            raise
+        else:
+            # Termine la transaction ouverte par une simple lecture
+            conn.rollback()
+            self.pool.putconn(conn)
+
+    def session(self, job):
+        """Session HTTP propre au job : un job ne tourne jamais deux fois en parallèle."""
+        if job not in self.http:
+            self.http[job] = requests.Session()
+        return self.http[job]
+
+    def close(self):
+        self.pool.closeall()
+        self.tokens.session.close()
+        for session in self.http.values():
+            session.close()
+
+
+# ─── 2. Pipelines (exécutés dans un thread) ──────────────────────────────────
+def run_realised(res):
+    timer = StageTimer("fetch_rte_data")
+    try:
+        with res.connection() as conn:
+            summary = realised.catch_up_realised(
+                res.tokens, res.limiter, conn, session=res.session("realised"), timer=timer
+            )
+        if not summary["complete"]:
+            raise NotReady("Données J-1 pas encore disponibles chez RTE.")
+    except BaseException:
+        timer.finish(success=False)
+        raise
+    timer.finish(success=True)
+
+
+def run_forecast(res):
+    timer = StageTimer("fetch_rte_forecast")
+    try:
+        with res.connection() as conn:
+            summary = forecast.catch_up_forecasts(
+                res.tokens, res.limiter, conn, timer, session=res.session("forecast")
+            )
+        if not summary["complete"]:
+            raise NotReady("Prévisions de demain pas encore publiées par RTE.")
+    except BaseException:
+        timer.finish(success=False)
+        raise
+    timer.finish(success=True)
+
+
+def run_predict(res):
+    timer = StageTimer("our_predictions_day_ahead")
+    try:
+        with timer.stage("fetch_context"), res.connection() as conn:
+            df_context = day_ahead.fetch_hybrid_context(conn=conn)
+        future_timestamps = day_ahead.generate_j1_timestamps(df_context["timestamp"].iloc[-1])
+
+        predictions = []
+        for model_id in day_ahead.PREDICTION_MODELS:
+            with timer.stage("predict"):
+                values, bands = day_ahead.predict_context(df_context, model_id, session=res.session("predict"))
+            predictions.extend(day_ahead.prepare_predictions(future_timestamps, values, model_id, bands))
+
+        with timer.stage("db_write", rows=len(predictions)), res.connection() as conn:
+            day_ahead.insert_predictions(predictions, conn=conn)
+    except BaseException:
+        timer.finish(success=False)
+        raise
+    timer.finish(success=True)
+
+
+def run_partitions(res):
+    with res.connection() as conn:
+        created = partition_tables.premake_partitions(conn)
+    logger.info(f"{len(created)} partition(s) créée(s) à l'avance")
+
+
+# ─── 3. Jobs, événements et nouvelles tentatives ─────────────────────────────
+class Job:
+    def __init__(self, name, fn, at=None, triggered_by=(), emits=None):
+        self.name         = name
+        self.fn           = fn
+        self.at           = datetime.strptime(at, "%H:%M").time() if at else None
+        self.triggered_by = set(triggered_by)
+        self.emits        = emits
+        self.running      = False
+
+
+def backoff_delay(attempt, base=RETRY_BASE_SECONDS, cap=RETRY_MAX_SECONDS):
+    """Délai avant l'essai `attempt + 1` : exponentiel plafonné, « full jitter »."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def next_occurrence(at, now=None):
+    """Prochaine occurrence de l'heure `at` (heure de Paris, changements d'heure inclus)."""
+    now       = now or datetime.now(PARIS_TZ)
+    candidate = PARIS_TZ.localize(datetime.combine(now.date(), at))
+    if candidate <= now:
+        candidate = PARIS_TZ.localize(datetime.combine(now.date() + timedelta(days=1), at))
+    return candidate
+
+
+class Orchestrator:
+    def __init__(self, jobs, resources):
+        self.jobs      = {job.name: job for job in jobs}
+        self.resources = resources
+        self.tasks     = set()
+
+    def spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def emit(self, event):
+        for job in self.jobs.values():
+            if event in job.triggered_by:
+                logger.info(f"Événement {event} → {job.name}")
+                self.spawn(self.run(job))
+
+    async def run(self, job):
+        if job.running:
+            logger.warning(f"⚠ {job.name} déjà en cours, déclenchement ignoré")
+            return False
+        job.running = True
+        try:
+            for attempt in range(1, RETRY_ATTEMPTS + 1):
+                started = time.perf_counter()
+                try:
+                    await asyncio.to_thread(job.fn, self.resources)
+                except Exception as e:
+                    if attempt == RETRY_ATTEMPTS:
+                        logger.error(f"✗ {job.name} : échec définitif après {attempt} essai(s) : {e}")
+                        return False
+                    delay = backoff_delay(attempt)
+                    logger.warning(f"⚠ {job.name} essai {attempt}/{RETRY_ATTEMPTS} : {e} "
+                                   f"— nouvel essai dans {delay:.0f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                logger.info(f"✓ {job.name} terminé en {time.perf_counter() - started:.1f}s")
+                if job.emits:
+                    self.emit(job.emits)
+                return True
+        finally:
+            job.running = False
+
+    async def schedule(self, job):
+        while True:
+            target = next_occurrence(job.at)
+            logger.info(f"{job.name} : prochain run {target:%Y-%m-%d %H:%M %Z}")
+            # Attente par tranches : robuste aux mises en veille et ajustements d'horloge
+            while (remaining := (target - datetime.now(PARIS_TZ)).total_seconds()) > 0:
+                await asyncio.sleep(min(remaining, 300))
+            self.spawn(self.run(job))
+
+    async def serve(self):
+        for job in self.jobs.values():
+            if job.at:
+                self.spawn(self.schedule(job))
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        await stop.wait()
+
+        logger.info("Arrêt de l'orchestrateur...")
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def run_once(self, name):
+        """Lance `name` puis attend les jobs déclenchés par ses événements."""
+        ok = await self.run(self.jobs[name])
+        while self.tasks:
+            results = await asyncio.gather(*list(self.tasks))
+            ok      = ok and all(results)
+        return ok
+
+
+JOBS = [
+    Job("realised", run_realised, at=REALISED_AT, emits="realised_loaded"),
+    Job("forecast", run_forecast, at=FORECAST_AT, emits="forecast_loaded"),
+    Job("predict",  run_predict,  triggered_by=["forecast_loaded"]),
+    Job("partitions", run_partitions, at=PARTITIONS_AT),
+]
+
+
+# ─── 4. Point d'entrée ───────────────────────────────────────────────────────
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--run", choices=[job.name for job in JOBS],
+                        help="Exécuter un job (et ceux qu'il déclenche) puis quitter")
+    return parser.parse_args()
+
+
+async def main_async(args):
+    resources    = Resources()
+    orchestrator = Orchestrator(JOBS, resources)
+    try:
+        if args.run:
+            return await orchestrator.run_once(args.run)
+        logger.info("═══ Orchestrateur démarré ═══")
+        await orchestrator.serve()
+        return True
+    finally:
+        resources.close()
+
+
+def main():
+    ok = asyncio.run(main_async(parse_args()))
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
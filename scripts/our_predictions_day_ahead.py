@@ -5,9 +5,17 @@ import numpy as np
 import psycopg2
 from dotenv import load_dotenv
 import logging
+import time
 from datetime import datetime, timedelta
 import pytz
 
+from chronos_wire import CONTENT_TYPE as WIRE_CONTENT_TYPE, decode_response, encode_request
+from dashboard_series import refresh_dashboard
+from db_bulk import bulk_upsert
+from db_partitions import ensure_partitions_for
+from etl_metrics import StageTimer
+from predict_profile import load_profile
+
 # ─── Configuration du logging ────────────────────────────────────────────────
 logging.basicConfig(
     level=logging.INFO,
@@ -30,12 +38,37 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD')
 }
 
-FASTAPI_URL = "http://localhost:8000"
+FASTAPI_URL = os.getenv("FASTAPI_URL", "http://localhost:8000")
+
+# Bandes renvoyées avec la médiane et stockées dans predictions.quantiles
+PREDICTION_QUANTILES = [
+    float(q) for q in os.getenv("PREDICTION_QUANTILES", "0.1,0.9").split(",") if q.strip()
+]
+
+# Modèles du registre de predict_api à interroger (une série de prédictions par
+# modèle, stockée sous son identifiant dans predictions.model_name)
+PREDICTION_MODELS = [
+    m.strip() for m in os.getenv("PREDICTION_MODELS", "chronos-fine-tuned-j1").split(",") if m.strip()
+]
+
+# Session de série de predict_api (/series/{id}) : seuls les points nouveaux
+# sont envoyés à chaque exécution. Vide = contexte complet à chaque appel.
+PREDICT_SERIES_ID = os.getenv("PREDICT_SERIES_ID", "")
+
+# Profil d'inférence (scripts/autotune_day_ahead.py) : num_samples envoyé et
+# longueur du contexte (dernières heures, RTE comprises). Sans profil : 50 / 528.
+PREDICT_PROFILE = os.getenv("PREDICT_PROFILE", "models/predict_profile.json")
+profile         = load_profile(PREDICT_PROFILE)
+NUM_SAMPLES     = int(profile.get("num_samples", 50))
+CONTEXT_LENGTH  = int(profile.get("context_length", 528))
 
 # ─── 1. Récupération du contexte hybride (504h réelles + 24h RTE) ────────────
-def fetch_hybrid_context():
+def fetch_hybrid_context(conn=None):
+    """Si `conn` est fourni (orchestrateur), la connexion est réutilisée et laissée ouverte."""
     logger.info("Récupération du contexte hybride (504h réelles + 24h RTE)...")
-    conn = psycopg2.connect(**DB_CONFIG)
+    own_conn = conn is None
+    if own_conn:
+        conn = psycopg2.connect(**DB_CONFIG)
     
     # 1. Récupérer les 504 dernières heures de données RÉELLES
     query_real = """
@@ -46,6 +79,7 @@ def fetch_hybrid_context():
     """
     df_real = pd.read_sql(query_real, conn)
     df_real = df_real.sort_values('timestamp').reset_index(drop=True)
+    df_real['layer'] = 'real'
     logger.info(f" {len(df_real)} heures de données RÉELLES récupérées.")
     if len(df_real) > 0:
         logger.info(f"  [REAL] Première date : {df_real['timestamp'].iloc[0]}")
@@ -59,8 +93,10 @@ def fetch_hybrid_context():
         LIMIT 24
     """
     df_rte = pd.read_sql(query_rte, conn)
-    conn.close()
+    if own_conn:
+        conn.close()
     df_rte = df_rte.sort_values('timestamp').reset_index(drop=True)
+    df_rte['layer'] = 'rte'
     logger.info(f"{len(df_rte)} heures de prévisions RTE récupérées.")
     if len(df_rte) > 0:
         logger.info(f"  [RTE]  Première date : {df_rte['timestamp'].iloc[0]}")
@@ -124,93 +160,222 @@ def generate_j1_timestamps(last_timestamp):
 
 
 # ─── 3. Appel à l'API FastAPI pour la prédiction ─────────────────────────────
-def call_fastapi(context_values):
+def call_fastapi(context_values, model_id, session=None):
     
-    logger.info(f"Appel à l'API FastAPI ({FASTAPI_URL}/predict)...")
+    logger.info(f"Appel à l'API FastAPI ({FASTAPI_URL}/predict/{model_id})...")
     
     # Vérifier que l'API est disponible
     try:
-        health = requests.get(f"{FASTAPI_URL}/health", timeout=5)
+        health = (session or requests).get(f"{FASTAPI_URL}/health", timeout=5)
         health_data = health.json()
-        if not health_data.get("model_loaded"):
-            raise Exception("Le modèle n'est pas chargé dans FastAPI !")
-        logger.info("FastAPI est disponible et le modèle est chargé.")
+        if health_data.get("status") != "ready":
+            raise Exception(f"Le modèle n'est pas prêt dans FastAPI ({health_data.get('status')}) !")
+        logger.info("FastAPI est disponible, modèle chargé et préchauffé.")
     except requests.exceptions.ConnectionError:
         raise Exception(f"Impossible de contacter FastAPI sur {FASTAPI_URL}. Est-ce que start_api.sh est lancé ?")
     
-    # Envoyer la requête de prédiction
-    payload = {
-        "context": context_values.tolist(),
-        "prediction_length": 24,
-        "num_samples": 50
-    }
-    
-    response = requests.post(
-        f"{FASTAPI_URL}/predict",
-        json=payload,
-        timeout=120  # 2 minutes max pour la prédiction
+    # Envoyer la requête de prédiction (format binaire float32, voir chronos_wire.py)
+    payload = encode_request(
+        context_values,
+        prediction_length=24,
+        num_samples=NUM_SAMPLES,
+        quantiles=PREDICTION_QUANTILES
     )
+    headers = {"Content-Type": WIRE_CONTENT_TYPE, "Accept": WIRE_CONTENT_TYPE}
+    
+    # 429/503 : l'API est saturée, on respecte le Retry-After renvoyé
+    for attempt in range(1, 4):
+        response = (session or requests).post(
+            f"{FASTAPI_URL}/predict/{model_id}",
+            data=payload,
+            headers=headers,
+            timeout=120  # 2 minutes max pour la prédiction
+        )
+        if response.status_code not in (429, 503) or attempt == 3:
+            break
+        retry_after = int(response.headers.get("Retry-After", "5"))
+        logger.warning(f"⚠ FastAPI saturée ({response.status_code}), nouvel essai dans {retry_after}s...")
+        time.sleep(retry_after)
     
     if response.status_code != 200:
         raise Exception(f"Erreur FastAPI : {response.status_code} - {response.text}")
     
-    result = response.json()
+    result = decode_response(response.content)
     predictions = result["predictions"]
     
     logger.info(f"  Prédiction reçue : {len(predictions)} valeurs")
     logger.info(f"  Moyenne : {result['mean']:.2f} MW")
     logger.info(f"  Min : {result['min']:.2f} MW | Max : {result['max']:.2f} MW")
     
-    return np.array(predictions)
+    bands = {q: np.array(values) for q, values in result.get("quantiles", {}).items()}
+    if bands:
+        logger.info(f"  Bandes reçues : {', '.join('P' + str(round(float(q) * 100)) for q in bands)}")
+    
+    return np.array(predictions), bands
+
+
+def series_points(df):
+    return [{"timestamp": pd.Timestamp(ts).isoformat(), "value": float(v)} for ts, v in zip(df["timestamp"], df["value"])]
+
+
+def layer_state(df):
+    """État attendu d'une couche de la session (voir GET /series/{id})."""
+    return {
+        "length":          len(df),
+        "first_timestamp": pd.Timestamp(df["timestamp"].iloc[0]).isoformat() if len(df) else None,
+        "last_timestamp":  pd.Timestamp(df["timestamp"].iloc[-1]).isoformat() if len(df) else None,
+    }
+
+
+def same_layer(state, expected):
+    return state["length"] == expected["length"] and all(
+        (state[k] is None) == (expected[k] is None)
+        and (state[k] is None or pd.Timestamp(state[k]) == pd.Timestamp(expected[k]))
+        for k in ("first_timestamp", "last_timestamp")
+    )
+
+
+def sync_series(df_context, session=None):
+    """
+    Met la session PREDICT_SERIES_ID de l'API au niveau du contexte : seuls
+    les points postérieurs au dernier point connu de chaque couche sont
+    envoyés. Session inconnue (redémarrage, autre processus), en retard ou
+    différente du contexte (rattrapage au milieu de la fenêtre) : le contexte
+    complet est renvoyé.
+    """
+    http     = session or requests
+    url      = f"{FASTAPI_URL}/series/{PREDICT_SERIES_ID}"
+    layers   = {name: df_context[df_context["layer"] == name] for name in ("real", "rte")}
+    expected = {name: layer_state(df) for name, df in layers.items()}
+
+    response = http.get(url, timeout=10)
+    if response.status_code == 200:
+        known = response.json()["layers"]
+        body  = {"expected_last": {name: known[name]["last_timestamp"] for name in layers}}
+        for name, df in layers.items():
+            last = known[name]["last_timestamp"]
+            body[name] = series_points(df if last is None else df[pd.to_datetime(df["timestamp"], utc=True) > pd.Timestamp(last)])
+        response = http.post(f"{url}/append", json=body, timeout=30)
+        if response.status_code == 200 and all(same_layer(response.json()["layers"][n], expected[n]) for n in layers):
+            appended = response.json()["appended"]
+            logger.info(f"Série {PREDICT_SERIES_ID} à jour : {appended['real']} points réels et {appended['rte']} RTE envoyés")
+            return expected
+
+    response = http.put(
+        url,
+        json={
+            **{name: series_points(df) for name, df in layers.items()},
+            # Tampons à la taille des couches (contexte raccourci par le profil)
+            **{f"{name}_length": max(1, len(df)) for name, df in layers.items()},
+        },
+        timeout=30
+    )
+    if response.status_code != 200:
+        raise Exception(f"Erreur FastAPI (série) : {response.status_code} - {response.text}")
+    logger.info(f"Série {PREDICT_SERIES_ID} recréée : {len(df_context)} points envoyés")
+    return expected
+
+
+def call_fastapi_series(df_context, model_id, session=None):
+    """Comme call_fastapi, mais sur la session de série : seuls les paramètres sont envoyés."""
+    http = session or requests
+    url  = f"{FASTAPI_URL}/series/{PREDICT_SERIES_ID}/predict/{model_id}"
+    logger.info(f"Appel à l'API FastAPI ({url})...")
+
+    expected = sync_series(df_context, session)
+    body = {
+        "prediction_length": 24,
+        "num_samples":       NUM_SAMPLES,
+        "quantiles":         PREDICTION_QUANTILES,
+        "expected_last":     {name: state["last_timestamp"] for name, state in expected.items()},
+    }
+    for attempt in range(1, 4):
+        response = http.post(url, json=body, headers={"Accept": WIRE_CONTENT_TYPE}, timeout=120)
+        if response.status_code in (404, 409) and attempt < 3:
+            # Session perdue ou modifiée entre-temps (autre processus servi)
+            logger.warning(f"⚠ Session {PREDICT_SERIES_ID} périmée ({response.status_code}), contexte renvoyé")
+            sync_series(df_context, session)
+            continue
+        if response.status_code not in (429, 503) or attempt == 3:
+            break
+        retry_after = int(response.headers.get("Retry-After", "5"))
+        logger.warning(f"⚠ FastAPI saturée ({response.status_code}), nouvel essai dans {retry_after}s...")
+        time.sleep(retry_after)
+
+    if response.status_code != 200:
+        raise Exception(f"Erreur FastAPI : {response.status_code} - {response.text}")
+
+    result = decode_response(response.content)
+    logger.info(f"  Prédiction reçue : {len(result['predictions'])} valeurs (série version {response.headers.get('X-Series-Version')})")
+    logger.info(f"  Moyenne : {result['mean']:.2f} MW")
+    bands = {q: np.array(values) for q, values in result.get("quantiles", {}).items()}
+    return np.array(result["predictions"]), bands
+
+
+def predict_context(df_context, model_id, session=None):
+    """
+    Prévision du contexte hybride par `model_id` : par la session de série si
+    PREDICT_SERIES_ID est défini (et que les couches ne se chevauchent pas,
+    la session les concaténant réel puis RTE), sinon par /predict. Seules les
+    CONTEXT_LENGTH dernières heures sont envoyées.
+    """
+    df_context = df_context.iloc[-CONTEXT_LENGTH:]
+    if PREDICT_SERIES_ID and (df_context["layer"] == "rte").is_monotonic_increasing:
+        return call_fastapi_series(df_context, model_id, session)
+    return call_fastapi(df_context["value"].values, model_id, session)
 
 
 # ─── 4. Préparation des données pour insertion ───────────────────────────────
-def prepare_predictions(timestamps, values):
+def prepare_predictions(timestamps, values, model_name, bands=None):
     logger.info("Préparation des prédictions pour insertion...")
+    bands = bands or {}
     predictions = []
     for i, (ts, pred_val) in enumerate(zip(timestamps, values)):
         predictions.append({
             "timestamp": ts.isoformat(),
             "predicted_value": round(float(pred_val), 2),
             "horizon": f"H+{i+1}",
-            "model_name": "chronos-fine-tuned-j1"
+            "model_name": model_name,
+            "quantiles": {q: round(float(band[i]), 2) for q, band in bands.items()} or None
         })
     logger.info(f"{len(predictions)} prédictions J+1 préparées.")
     return predictions
 
 
 # ─── 5. Insertion dans PostgreSQL ────────────────────────────────────────────
-def insert_predictions(predictions):
+def insert_predictions(predictions, conn=None):
+    """Si `conn` est fourni (orchestrateur), la connexion est réutilisée et laissée ouverte."""
     logger.info("Insertion des prédictions dans PostgreSQL...")
-    conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    inserted = 0
-    
     logger.info("  Vérification des 3 premiers timestamps à insérer :")
     for i in range(min(3, len(predictions))):
         logger.info(f"    {predictions[i]['timestamp']} → {predictions[i]['predicted_value']:.2f} MW")
     
-    for pred in predictions:
-        try:
-            ts = pd.to_datetime(pred["timestamp"])
-            cursor.execute("""
-                INSERT INTO predictions (timestamp, predicted_value, model_name, horizon)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (timestamp, model_name) 
-                DO UPDATE SET 
-                    predicted_value = EXCLUDED.predicted_value,
-                    horizon = EXCLUDED.horizon
-            """, (ts, pred["predicted_value"], pred["model_name"], pred["horizon"]))
-            if cursor.rowcount > 0:
-                inserted += 1
-        except Exception as e:
-            logger.error(f"Erreur insertion de {pred['timestamp']}: {e}")
-            conn.rollback()
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
-    logger.info(f"{inserted} lignes insérées/mises à jour.")
+    own_conn = conn is None
+    if own_conn:
+        conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        ensure_partitions_for(conn, "predictions", [pred["timestamp"] for pred in predictions])
+        counts = bulk_upsert(
+            conn,
+            "predictions",
+            ["timestamp", "predicted_value", "model_name", "horizon", "quantiles"],
+            (
+                (pred["timestamp"], pred["predicted_value"], pred["model_name"], pred["horizon"], pred["quantiles"])
+                for pred in predictions
+            ),
+            conflict_columns=["timestamp", "model_name"],
+            update_columns=["predicted_value", "horizon", "quantiles"]
+        )
+        if counts["inserted"] or counts["updated"]:
+            refresh_dashboard(conn, [pred["timestamp"] for pred in predictions])
+        conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+    logger.info(
+        f"{counts['inserted']} lignes insérées, {counts['updated']} mises à jour, "
+        f"{counts['skipped']} inchangées."
+    )
 
 
 # ─── 6. Fonction principale ───────────────────────────────────────────────────
@@ -220,38 +385,47 @@ def main():
     logger.info("  Prédiction J+1 via FastAPI (504h réelles + 24h RTE)")
     logger.info("═══════════════════════════════════════════════════════════")
     
+    metrics = StageTimer("our_predictions_day_ahead")
     try:
         # Étape 1 : Récupérer le contexte hybride
-        df_context = fetch_hybrid_context()
-        
-        # Étape 2 : Appeler FastAPI pour la prédiction
-        predicted_values = call_fastapi(df_context["value"].values)
+        with metrics.stage("fetch_context"):
+            df_context = fetch_hybrid_context()
         
-        # Étape 3 : Générer les timestamps J+1
+        # Étape 2 : Générer les timestamps J+1
         future_timestamps = generate_j1_timestamps(df_context['timestamp'].iloc[-1])
         
-        # Étape 4 : Préparer les données
-        predictions = prepare_predictions(future_timestamps, predicted_values)
-        
-        # Aperçu
-        logger.info("═══════════════════════════════════════════════════════════")
-        logger.info("  APERÇU DES PRÉDICTIONS J+1")
-        logger.info("═══════════════════════════════════════════════════════════")
-        for pred in predictions[:5]:
-            logger.info(f"  {pred['timestamp']} → {pred['predicted_value']:,.2f} MW")
-        logger.info("  ...")
-        for pred in predictions[-2:]:
-            logger.info(f"  {pred['timestamp']} → {pred['predicted_value']:,.2f} MW")
+        predictions = []
+        for model_id in PREDICTION_MODELS:
+            # Étape 3 : Appeler FastAPI pour la prédiction de ce modèle
+            with metrics.stage("predict"):
+                predicted_values, bands = predict_context(df_context, model_id)
+            
+            # Étape 4 : Préparer les données
+            model_predictions = prepare_predictions(future_timestamps, predicted_values, model_id, bands)
+            
+            # Aperçu
+            logger.info("═══════════════════════════════════════════════════════════")
+            logger.info(f"  APERÇU DES PRÉDICTIONS J+1 ({model_id})")
+            logger.info("═══════════════════════════════════════════════════════════")
+            for pred in model_predictions[:5]:
+                logger.info(f"  {pred['timestamp']} → {pred['predicted_value']:,.2f} MW")
+            logger.info("  ...")
+            for pred in model_predictions[-2:]:
+                logger.info(f"  {pred['timestamp']} → {pred['predicted_value']:,.2f} MW")
+            predictions.extend(model_predictions)
         
-        # Étape 5 : Insérer dans la base
-        insert_predictions(predictions)
+        # Étape 5 : Insérer dans la base (tous les modèles en une transaction)
+        with metrics.stage("db_write", rows=len(predictions)):
+            insert_predictions(predictions)
         
         logger.info("═══════════════════════════════════════════════════════════")
         logger.info(" Prédictions J+1 terminées avec succès via FastAPI")
         logger.info("═══════════════════════════════════════════════════════════")
+        metrics.finish(success=True)
         
     except Exception as e:
         logger.error(f"Erreur critique : {e}", exc_info=True)
+        metrics.finish(success=False)
         raise
 
 if __name__ == "__main__":
@@ -0,0 +1,349 @@
+"""
+Partitionnement mensuel de predictions (historical_data et rte_forecasts
+sont des vues sur rte_series depuis la migration 003, déjà partitionnée).
+
+Chaque table est convertie en table partitionnée par mois (RANGE sur
+timestamp, bornes UTC) sans interrompre les scripts qui y écrivent :
+
+  1. une table fantôme `<table>_partitioned` est créée avec les mêmes
+     colonnes, un index BRIN sur timestamp et les contraintes d'unicité
+     (B-tree ; la clé de partition est ajoutée à la clé primaire id), ainsi
+     que les partitions des mois existants et des DB_PARTITION_MONTHS_AHEAD
+     mois à venir ;
+  2. un trigger recopie dans la table fantôme chaque écriture faite sur
+     l'ancienne table ;
+  3. les lignes existantes sont copiées par lots de --batch-size ids, chaque
+     lot sous un verrou SHARE (lectures libres, écritures en attente le temps
+     du lot) ;
+  4. bascule en une transaction : vérification des comptes, l'ancienne table
+     devient `<table>_unpartitioned`, la table fantôme prend son nom, ses
+     contraintes et la séquence des ids.
+
+Une conversion interrompue reprend là où elle s'est arrêtée. Pendant la
+conversion, les écritures antérieures au premier mois existant sont refusées
+(pas de partition). Ensuite, les scripts créent à la demande les partitions
+manquantes (db_partitions.ensure_partitions_for) ; `premake`, lancé chaque
+jour par l'orchestrateur, les crée à l'avance.
+
+Usage (depuis la racine du dépôt) :
+    python scripts/partition_tables.py status
+    python scripts/partition_tables.py convert [--tables predictions] [--batch-size 5000] [--pause 0.1]
+    python scripts/partition_tables.py premake [--months-ahead 3]
+    python scripts/partition_tables.py drop-old
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2 import sql
+
+from db_partitions import ensure_monthly_partitions, is_partitioned, month_start, next_month
+
+# ─── Configuration du logging ────────────────────────────────────────────────
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("./logs/partition_tables.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# ─── Chargement des variables d'environnement ────────────────────────────────
+load_dotenv()
+
+DB_HOST     = os.getenv("DB_HOST")
+DB_PORT     = os.getenv("DB_PORT")
+DB_NAME     = os.getenv("DB_NAME")
+DB_USER     = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+MONTHS_AHEAD    = int(os.getenv("DB_PARTITION_MONTHS_AHEAD", "3"))
+COPY_BATCH_SIZE = int(os.getenv("DB_PARTITION_BATCH_SIZE", "5000"))
+
+TABLES             = ("predictions",)
+PARTITIONED_TABLES = TABLES + ("rte_series", "rte_quarter_hours")
+NEW_SUFFIX         = "_partitioned"
+OLD_SUFFIX         = "_unpartitioned"
+
+
+def connect_db():
+    return psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD
+    )
+
+
+def table_exists(conn, table):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.{table}",))
+        return cur.fetchone()[0]
+
+
+# ─── 1. Partitions à l'avance ────────────────────────────────────────────────
+def premake_partitions(conn, tables=PARTITIONED_TABLES, months_ahead=MONTHS_AHEAD):
+    """Partitions du mois courant et des `months_ahead` suivants, tables partitionnées seulement."""
+    start = month_start(datetime.now(timezone.utc))
+    end   = start
+    for _ in range(months_ahead):
+        end = next_month(end)
+
+    created = []
+    for table in tables:
+        if table_exists(conn, table) and is_partitioned(conn, table):
+            created += ensure_monthly_partitions(conn, table, start, end)
+    conn.commit()
+    return created
+
+
+# ─── 2. Table fantôme partitionnée ───────────────────────────────────────────
+_KEYS_QUERY = """
+    SELECT c.conname, c.contype, array_agg(a.attname::text ORDER BY k.ord)
+    FROM pg_constraint c
+    CROSS JOIN unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+    WHERE c.conrelid = %s::regclass AND c.contype IN ('p', 'u')
+    GROUP BY c.conname, c.contype
+    ORDER BY c.contype
+"""
+
+# Recopie chaque écriture de l'ancienne table ; une mise à jour est rejouée
+# en suppression + insertion (le timestamp, clé de partition, peut changer).
+_MIRROR_FUNCTION = """
+    CREATE OR REPLACE FUNCTION public.{function}() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM public.{new} WHERE id = OLD.id AND "timestamp" = OLD."timestamp";
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO public.{new} SELECT (NEW).* ON CONFLICT DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END $$
+"""
+
+
+def timestamp_bounds(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL('SELECT min("timestamp"), max("timestamp") FROM {}').format(sql.Identifier(table)))
+        return cur.fetchone()
+
+
+def create_shadow(conn, table, months_ahead=MONTHS_AHEAD):
+    """Table `<table>_partitioned`, partitions, index et trigger de recopie (COMMIT inclus)."""
+    new = table + NEW_SUFFIX
+    if table_exists(conn, new):
+        logger.info(f"{new} existe déjà : reprise de la conversion")
+        return new
+
+    ident, new_ident = sql.Identifier(table), sql.Identifier(new)
+    with conn.cursor() as cur:
+        cur.execute(
+            sql.SQL('CREATE TABLE public.{new} (LIKE public.{table} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+            .format(new=new_ident, table=ident)
+        )
+
+        cur.execute(_KEYS_QUERY, (f"public.{table}",))
+        for name, kind, columns in cur.fetchall():
+            if "timestamp" not in columns:
+                columns.append("timestamp")
+            cur.execute(
+                sql.SQL("ALTER TABLE public.{new} ADD CONSTRAINT {name} {kind} ({columns})").format(
+                    new=new_ident,
+                    name=sql.Identifier(name + NEW_SUFFIX),
+                    kind=sql.SQL("PRIMARY KEY" if kind == "p" else "UNIQUE"),
+                    columns=sql.SQL(", ").join(map(sql.Identifier, columns))
+                )
+            )
+
+        # BRIN : quelques pages par partition, suffisant pour les filtres par période
+        cur.execute(
+            sql.SQL('CREATE INDEX {name} ON public.{new} USING brin ("timestamp")').format(
+                name=sql.Identifier(f"{table}_timestamp_brin"), new=new_ident
+            )
+        )
+
+    first, _ = timestamp_bounds(conn, table)
+    start    = month_start(first or datetime.now(timezone.utc))
+    end      = month_start(datetime.now(timezone.utc))
+    for _ in range(months_ahead):
+        end = next_month(end)
+    ensure_monthly_partitions(conn, new, start, end, prefix=table)
+
+    with conn.cursor() as cur:
+        function = sql.Identifier(f"{table}_mirror")
+        cur.execute(sql.SQL(_MIRROR_FUNCTION).format(function=function, new=new_ident))
+        cur.execute(
+            sql.SQL("CREATE TRIGGER {trigger} AFTER INSERT OR UPDATE OR DELETE ON public.{table} "
+                    "FOR EACH ROW EXECUTE FUNCTION public.{function}()").format(
+                trigger=sql.Identifier(f"{table}_mirror"), table=ident, function=function
+            )
+        )
+    conn.commit()
+    logger.info(f"✓ {new} créée, écritures sur {table} recopiées")
+    return new
+
+
+# ─── 3. Copie en ligne par lots ──────────────────────────────────────────────
+def copy_batches(conn, table, batch_size=COPY_BATCH_SIZE, pause=0.0):
+    """
+    Copie les lignes existantes par tranches d'ids. Le verrou SHARE de chaque
+    lot empêche qu'une écriture concurrente (recopiée par le trigger) croise
+    la copie de la même ligne. Retourne le nombre de lignes copiées.
+    """
+    new = table + NEW_SUFFIX
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("SELECT min(id), max(id) FROM public.{}").format(sql.Identifier(table)))
+        low, high = cur.fetchone()
+    conn.commit()
+    if low is None:
+        return 0
+
+    copy = sql.SQL(
+        "INSERT INTO public.{new} SELECT * FROM public.{table} WHERE id >= %s AND id < %s ON CONFLICT DO NOTHING"
+    ).format(new=sql.Identifier(new), table=sql.Identifier(table))
+    lock = sql.SQL("LOCK TABLE public.{} IN SHARE MODE").format(sql.Identifier(table))
+
+    copied, started = 0, time.perf_counter()
+    for batch_start in range(low, high + 1, batch_size):
+        with conn.cursor() as cur:
+            cur.execute(lock)
+            cur.execute(copy, (batch_start, batch_start + batch_size))
+            copied += cur.rowcount
+        conn.commit()
+        if pause:
+            time.sleep(pause)
+
+    logger.info(f"✓ {table} : {copied} ligne(s) copiée(s) en {time.perf_counter() - started:.1f}s")
+    return copied
+
+
+# ─── 4. Bascule ──────────────────────────────────────────────────────────────
+def switch_tables(conn, table):
+    """Remplace `table` par sa version partitionnée, en une transaction."""
+    new, old = table + NEW_SUFFIX, table + OLD_SUFFIX
+    ident, new_ident, old_ident = sql.Identifier(table), sql.Identifier(new), sql.Identifier(old)
+
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("LOCK TABLE public.{} IN ACCESS EXCLUSIVE MODE").format(ident))
+
+        # Dernier rattrapage sous verrou exclusif, puis contrôle des comptes
+        cur.execute(
+            sql.SQL("INSERT INTO public.{new} SELECT o.* FROM public.{table} o "
+                    "WHERE NOT EXISTS (SELECT 1 FROM public.{new} n WHERE n.id = o.id AND n.\"timestamp\" = o.\"timestamp\") "
+                    "ON CONFLICT DO NOTHING").format(new=new_ident, table=ident)
+        )
+        cur.execute(sql.SQL("SELECT (SELECT count(*) FROM public.{table}), (SELECT count(*) FROM public.{new})")
+                    .format(table=ident, new=new_ident))
+        source_rows, target_rows = cur.fetchone()
+        if source_rows != target_rows:
+            conn.rollback()
+            raise RuntimeError(f"{table} : {source_rows} ligne(s) dans l'ancienne table, {target_rows} dans la nouvelle")
+
+        cur.execute(sql.SQL("DROP TRIGGER {trigger} ON public.{table}").format(
+            trigger=sql.Identifier(f"{table}_mirror"), table=ident))
+        cur.execute(sql.SQL("DROP FUNCTION public.{}()").format(sql.Identifier(f"{table}_mirror")))
+
+        # Noms d'origine (table et contraintes) pour la version partitionnée
+        cur.execute(_KEYS_QUERY, (f"public.{table}",))
+        names = [name for name, _, _ in cur.fetchall()]
+        for name in names:
+            cur.execute(sql.SQL("ALTER TABLE public.{table} RENAME CONSTRAINT {name} TO {renamed}").format(
+                table=ident, name=sql.Identifier(name), renamed=sql.Identifier(name + OLD_SUFFIX)))
+            cur.execute(sql.SQL("ALTER TABLE public.{new} RENAME CONSTRAINT {name} TO {renamed}").format(
+                new=new_ident, name=sql.Identifier(name + NEW_SUFFIX), renamed=sql.Identifier(name)))
+        cur.execute(sql.SQL("ALTER TABLE public.{table} RENAME TO {old}").format(table=ident, old=old_ident))
+        cur.execute(sql.SQL("ALTER TABLE public.{new} RENAME TO {table}").format(new=new_ident, table=ident))
+
+        # La séquence des ids suit la nouvelle table (sinon supprimée avec l'ancienne)
+        cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (f"public.{old}",))
+        sequence = cur.fetchone()[0]
+        if sequence:
+            cur.execute(sql.SQL("ALTER SEQUENCE {sequence} OWNED BY public.{table}.id").format(
+                sequence=sql.SQL(sequence), table=ident))
+    conn.commit()
+    logger.info(f"✓ {table} partitionnée ({target_rows} lignes), ancienne table conservée sous {old}")
+
+
+def convert_table(conn, table, batch_size=COPY_BATCH_SIZE, pause=0.0, months_ahead=MONTHS_AHEAD):
+    if is_partitioned(conn, table):
+        logger.info(f"✓ {table} déjà partitionnée")
+        return False
+    create_shadow(conn, table, months_ahead)
+    copy_batches(conn, table, batch_size, pause)
+    switch_tables(conn, table)
+    return True
+
+
+# ─── 5. État et nettoyage ────────────────────────────────────────────────────
+_STATUS_QUERY = """
+    SELECT count(*), min(pg_get_expr(c.relpartbound, c.oid)), max(pg_get_expr(c.relpartbound, c.oid))
+    FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = %s::regclass
+"""
+
+
+def show_status(conn):
+    for table in PARTITIONED_TABLES:
+        if not table_exists(conn, table):
+            logger.info(f"{table:<20} absente")
+        elif not is_partitioned(conn, table):
+            state = " (conversion en cours)" if table_exists(conn, table + NEW_SUFFIX) else ""
+            logger.info(f"{table:<20} non partitionnée{state}")
+        else:
+            with conn.cursor() as cur:
+                cur.execute(_STATUS_QUERY, (f"public.{table}",))
+                count, first, last = cur.fetchone()
+            logger.info(f"{table:<20} {count} partition(s) : {first} … {last}")
+    conn.rollback()
+
+
+def drop_old_tables(conn, tables=TABLES):
+    for table in tables:
+        old = table + OLD_SUFFIX
+        if table_exists(conn, old):
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("DROP TABLE public.{}").format(sql.Identifier(old)))
+            logger.info(f"✓ {old} supprimée")
+    conn.commit()
+
+
+# ─── 6. Point d'entrée ───────────────────────────────────────────────────────
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "convert", "premake", "drop-old"])
+    parser.add_argument("--tables", nargs="+", choices=TABLES, default=list(TABLES))
+    parser.add_argument("--batch-size", type=int, default=COPY_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="Pause entre deux lots (secondes)")
+    parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    conn = connect_db()
+    try:
+        if args.command == "status":
+            show_status(conn)
+        elif args.command == "convert":
+            for table in args.tables:
+                convert_table(conn, table, args.batch_size, args.pause, args.months_ahead)
+        elif args.command == "premake":
+            created = premake_partitions(conn, months_ahead=args.months_ahead)
+            logger.info(f"✓ {len(created)} partition(s) créée(s)")
+        else:
+            drop_old_tables(conn, args.tables)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
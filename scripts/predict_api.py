@@ -1,9 +1,39 @@
+import time
+_IMPORTS_STARTED = time.perf_counter()   # Début du démarrage à froid (étape « imports »)
+
+import os
+import math
+import base64
+import asyncio
+import warnings
+from typing import Annotated
 import torch
 import numpy as np
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from chronos import ChronosPipeline
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import datetime
+
+from scripts.chronos_wire import CONTENT_TYPE as WIRE_CONTENT_TYPE, WireFormatError, decode_request, encode_response
+from scripts.predict_batching import MicroBatcher
+from scripts.predict_cache import ForecastCache, forecast_cache_key
+from scripts.predict_loading import StartupTimings, load_pipeline, model_nbytes, warm_up
+from scripts.predict_metrics import (
+    CACHE_RESULTS, REQUEST_LATENCY, REQUESTS, STREAM_FIRST_VALUE, STREAM_LATENCY,
+    bind_gauges, observe_batch, render as render_metrics
+)
+from scripts.predict_models import ModelCache, load_registry
+from scripts.predict_profile import load_profile
+from scripts.predict_sessions import DEFAULT_LAYERS, SeriesConflictError, SeriesSession, SeriesStore
+from scripts.predict_streaming import (
+    STREAMING_BACKENDS, encode_event, step_summary, stream_media_type, stream_samples
+)
+
+IMPORTS_SECONDS = time.perf_counter() - _IMPORTS_STARTED
 
 # ─── Configuration du logging ─────────────────────────────────────────────────
 logging.basicConfig(
@@ -12,85 +42,712 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# ─── Chemin du modèle ─────────────────────────────────────────────────────────
-MODEL_PATH = "/home/ubuntu/electricity_consumption_dashbord/models/run-0/checkpoint-final"
+# ─── Modèle par défaut et registre des modèles servis ─────────────────────────
+MODEL_PATH       = os.getenv("MODEL_PATH", "/home/ubuntu/electricity_consumption_dashbord/models/run-0/checkpoint-final")
+DEFAULT_MODEL_ID = os.getenv("PREDICT_DEFAULT_MODEL", "chronos-fine-tuned-j1")
+MODEL_REGISTRY   = os.getenv("PREDICT_MODEL_REGISTRY", "models/registry.json")
+
+# ─── Profil d'inférence (scripts/autotune_day_ahead.py) ───────────────────────
+# Valeurs par défaut de num_samples, du backend, des threads torch et du
+# warm-up ; une variable d'environnement explicite reste prioritaire.
+PREDICT_PROFILE = os.getenv("PREDICT_PROFILE", "models/predict_profile.json")
+profile         = load_profile(PREDICT_PROFILE)
+DEFAULT_NUM_SAMPLES = int(profile.get("num_samples", 50))
+
+# Modèles chargés à la demande, évincés (LRU) au-delà du budget ou après inactivité
+MODEL_MEMORY_MB    = float(os.getenv("PREDICT_MODEL_MEMORY_MB", "4096"))
+MODEL_IDLE_SECONDS = float(os.getenv("PREDICT_MODEL_IDLE_SECONDS", "3600"))
+
+# ─── Backend d'inférence (float32, bfloat16, int8, onnx) ──────────────────────
+# Backend par défaut des modèles du registre, choisi avec benchmarks/bench_backends.py.
+# PREDICT_ONNX_DIR (modèle par défaut uniquement) vide = <MODEL_PATH>/onnx
+INFERENCE_BACKEND = os.getenv("PREDICT_BACKEND", profile.get("backend", "bfloat16"))
+ONNX_DIR          = os.getenv("PREDICT_ONNX_DIR", "")
+
+# ─── Paramètres du micro-batching ─────────────────────────────────────────────
+MAX_BATCH_SIZE    = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "16"))
+MAX_BATCH_WAIT_MS = float(os.getenv("PREDICT_MAX_BATCH_WAIT_MS", "5"))
+
+# ─── Bornes des paramètres d'une requête (au-delà : 422) ──────────────────────
+MAX_PREDICTION_LENGTH = int(os.getenv("PREDICT_MAX_PREDICTION_LENGTH", "64"))
+MAX_NUM_SAMPLES       = int(os.getenv("PREDICT_MAX_NUM_SAMPLES", "1000"))
+
+# ─── Pool d'inférence et contrôle d'admission ────────────────────────────────
+# PREDICT_PROCESSES : nombre de processus servis par scripts/serve_prefork.py,
+# qui se partagent les cœurs (processus × workers × threads ≈ nombre de cœurs)
+SERVING_PROCESSES = int(os.getenv("PREDICT_PROCESSES", "1"))
+INFERENCE_WORKERS = int(os.getenv("PREDICT_INFERENCE_WORKERS", "1"))
+# Sans variable : threads du profil (ceux des latences mesurées par l'autotune),
+# sinon cœurs / (processus × workers)
+TORCH_NUM_THREADS = int(os.getenv(
+    "PREDICT_TORCH_THREADS",
+    profile.get("threads", max(1, (os.cpu_count() or 1) // (INFERENCE_WORKERS * SERVING_PROCESSES)))
+))
+TORCH_INTEROP_THREADS = int(os.getenv("PREDICT_INTEROP_THREADS", "0"))   # 0 = défaut torch
+MAX_QUEUE_DEPTH   = int(os.getenv("PREDICT_MAX_QUEUE_DEPTH", "64"))
+
+# ─── Cache des prévisions (PREDICT_CACHE_DIR vide = pas de niveau disque) ─────
+CACHE_MAX_ENTRIES      = int(os.getenv("PREDICT_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS      = float(os.getenv("PREDICT_CACHE_TTL_SECONDS", str(6 * 3600)))
+CACHE_DIR              = os.getenv("PREDICT_CACHE_DIR", "")
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("PREDICT_CACHE_DISK_MAX_ENTRIES", "10000"))
+
+# ─── Sessions de séries (/series/{series_id}) ─────────────────────────────────
+MAX_SERIES           = int(os.getenv("PREDICT_MAX_SERIES", "256"))
+MAX_SERIES_LENGTH    = int(os.getenv("PREDICT_MAX_SERIES_LENGTH", "4096"))   # points par couche
+SERIES_IDLE_SECONDS  = float(os.getenv("PREDICT_SERIES_IDLE_SECONDS", str(24 * 3600)))
+
+# ─── Warm-up au démarrage (0 = désactivé) ─────────────────────────────────────
+WARMUP_RUNS           = int(os.getenv("PREDICT_WARMUP_RUNS", "2"))
+WARMUP_CONTEXT_LENGTH = int(os.getenv("PREDICT_WARMUP_CONTEXT_LENGTH", str(profile.get("context_length", 528))))
+WARMUP_NUM_SAMPLES    = int(os.getenv("PREDICT_WARMUP_NUM_SAMPLES", str(DEFAULT_NUM_SAMPLES)))
 
 # ─── Initialisation de l'app FastAPI ──────────────────────────────────────────
 app = FastAPI(title="Chronos Prediction API", version="1.0.0")
 
 # ─── Chargement du modèle au démarrage ────────────────────────────────────────
-pipeline = None
+registry = load_registry(MODEL_REGISTRY, DEFAULT_MODEL_ID, MODEL_PATH, INFERENCE_BACKEND)
+models   = None
+batcher  = None
+executor = None
+cache    = None
+series   = SeriesStore(MAX_SERIES, SERIES_IDLE_SECONDS)
+admitted = 0    # Requêtes acceptées et pas encore terminées
+stream_tasks = set()   # Calculs des prévisions en flux (gardés jusqu'à leur fin)
+
+model_status    = "loading"   # Modèle par défaut : loading → warming_up → ready (ou failed)
+startup_timings = StartupTimings()
+startup_timings.record("imports", IMPORTS_SECONDS)
+startup_task    = None
+eviction_task   = None
+
+# Pipelines déjà en mémoire (poids chargés par le parent de serve_prefork.py,
+# partagés entre les workers) : utilisés tels quels au lieu d'être rechargés
+PRELOADED_PIPELINES = {}
+
+def run_batch(contexts, model_id, prediction_length, num_samples, seed):
+    """
+    Exécuté dans le pool d'inférence : un seul appel au modèle `model_id` pour
+    une liste de contextes (padding par Chronos). Les requêtes de modèles
+    différents ne sont jamais regroupées (model_id fait partie de la clé de
+    regroupement du MicroBatcher).
+    """
+    return forecast_samples(models.pipeline(model_id), contexts, prediction_length, num_samples, seed)
+
+def forecast_samples(pipeline, contexts, prediction_length, num_samples, seed):
+    """
+    Trajectoires brutes [batch, num_samples, prediction_length] en float32 :
+    les statistiques sont calculées ensuite par requête, et le cache conserve
+    les échantillons. Une graine fixe rend le tirage reproductible (avec un
+    seul worker).
+    """
+    if seed is not None:
+        torch.manual_seed(seed)
+    forecast = pipeline.predict(
+        contexts,
+        prediction_length,
+        num_samples=num_samples
+    )
+    return forecast.numpy().astype(np.float32, copy=False)
+
+def summarize_samples(samples, quantiles, return_samples, binary=False):
+    """
+    Médiane + bandes demandées en une seule passe vectorisée sur les
+    échantillons [num_samples, prediction_length]. Renvoie le corps binaire
+    (chronos_wire) si `binary`, sinon le dictionnaire de PredictResponse.
+    """
+    levels = [0.5] + [q for q in quantiles if q != 0.5]
+    values = np.quantile(samples, levels, axis=0)
+
+    if binary:
+        median = values[0]
+        bands  = np.stack([values[levels.index(q)] for q in quantiles]) if quantiles else None
+        return encode_response(
+            median, np.mean(median), np.min(median), np.max(median),
+            quantiles, bands, samples if return_samples else None
+        )
+
+    values = np.round(values, 2)
+    median = values[0]
+
+    summary = {
+        "predictions": median.tolist(),
+        "mean": round(float(np.mean(median)), 2),
+        "min": round(float(np.min(median)), 2),
+        "max": round(float(np.max(median)), 2),
+        "quantiles": {
+            f"{q:g}": values[levels.index(q)].tolist() for q in quantiles
+        },
+    }
+    if return_samples:
+        raw = np.ascontiguousarray(samples, dtype="<f4")
+        summary["samples"] = base64.b64encode(raw.tobytes()).decode("ascii")
+        summary["samples_shape"] = list(raw.shape)
+    return summary
+
+def retry_after_seconds():
+    """Estimation du délai avant qu'une place se libère dans la file."""
+    service = batcher.mean_service_time if batcher else None
+    if service is None:
+        return 1
+    pending_batches = math.ceil(admitted / MAX_BATCH_SIZE)
+    return max(1, math.ceil(service * pending_batches / INFERENCE_WORKERS))
 
 @app.on_event("startup")
 async def load_model():
-    global pipeline
-    logger.info(f"Chargement du modèle depuis {MODEL_PATH}...")
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    logger.info(f"Device utilisé : {device}")
-    pipeline = ChronosPipeline.from_pretrained(
-        MODEL_PATH,
-        device_map=device,
-        torch_dtype=torch.bfloat16,
+    """
+    Démarre le pool d'inférence puis charge le modèle en tâche de fond :
+    l'API répond tout de suite et /health passe à « ready » après le warm-up.
+    """
+    global models, batcher, executor, cache, startup_task, eviction_task
+    torch.set_num_threads(TORCH_NUM_THREADS)
+    if TORCH_INTEROP_THREADS:
+        try:
+            torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+        except RuntimeError:
+            logger.warning("⚠ Pool inter-op déjà démarré, PREDICT_INTEROP_THREADS ignoré")
+
+    executor = ThreadPoolExecutor(
+        max_workers=INFERENCE_WORKERS,
+        thread_name_prefix="chronos-inference"
+    )
+    logger.info(
+        f"Pool d'inférence (pid {os.getpid()}) : {INFERENCE_WORKERS} worker(s), "
+        f"{TORCH_NUM_THREADS} thread(s) torch, file max {MAX_QUEUE_DEPTH}"
     )
-    logger.info("✓ Modèle Chronos chargé en mémoire.")
+
+    batcher = MicroBatcher(
+        run_batch,
+        MAX_BATCH_SIZE,
+        MAX_BATCH_WAIT_MS,
+        executor=executor,
+        max_concurrent_batches=INFERENCE_WORKERS,
+        observer=observe_batch
+    )
+    batcher.start()
+
+    cache = ForecastCache(
+        max_entries=CACHE_MAX_ENTRIES,
+        ttl_seconds=CACHE_TTL_SECONDS,
+        disk_dir=CACHE_DIR,
+        disk_max_entries=CACHE_DISK_MAX_ENTRIES
+    )
+
+    # Le modèle par défaut reste chargé ; les autres vont et viennent
+    models = ModelCache(
+        registry,
+        load_registered_model,
+        memory_budget=MODEL_MEMORY_MB * 2**20,
+        idle_seconds=MODEL_IDLE_SECONDS,
+        pinned=[DEFAULT_MODEL_ID]
+    )
+    logger.info(f"Modèles servis : {', '.join(registry)} (défaut : {DEFAULT_MODEL_ID})")
+
+    bind_gauges(
+        queue_depth=lambda: batcher.queue_depth,
+        admitted=lambda: admitted,
+        models_memory=lambda: models.used_bytes
+    )
+
+    startup_task  = asyncio.create_task(prepare_model())
+    eviction_task = asyncio.create_task(evict_idle_models())
+
+async def load_registered_model(model_id, spec):
+    """
+    Chargement des poids puis warm-up, dans le pool d'inférence lui-même :
+    les threads qui serviront les requêtes sont ceux qui ont été initialisés.
+    Renvoie (pipeline, taille des poids en octets) au cache des modèles.
+    """
+    global model_status
+    loop    = asyncio.get_running_loop()
+    device  = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    default = model_id == DEFAULT_MODEL_ID
+    timings = startup_timings if default else StartupTimings()
+    pipeline = PRELOADED_PIPELINES.get(model_id)
+    if pipeline is not None:
+        logger.info(f"Modèle {model_id} déjà chargé par le processus parent (poids partagés)")
+    else:
+        logger.info(f"Chargement du modèle {model_id} depuis {spec['path']} (backend {spec['backend']})...")
+        logger.info(f"Device utilisé : {device}")
+        pipeline = await loop.run_in_executor(
+            executor, load_pipeline, spec["path"], device, spec["backend"],
+            timings, (ONNX_DIR or None) if default else None, TORCH_NUM_THREADS
+        )
+
+    if default:
+        model_status = "warming_up"
+    await loop.run_in_executor(
+        executor, warm_up, partial(forecast_samples, pipeline), WARMUP_RUNS,
+        WARMUP_CONTEXT_LENGTH, 24, WARMUP_NUM_SAMPLES, timings
+    )
+    logger.info(f"✓ Modèle {model_id} prêt ({timings.summary()})")
+    return pipeline, model_nbytes(pipeline)
+
+async def prepare_model():
+    """Charge et préchauffe le modèle par défaut ; /health passe ensuite à « ready »."""
+    global model_status
+    try:
+        async with models.lease(DEFAULT_MODEL_ID):
+            pass
+    except Exception as e:
+        model_status = "failed"
+        logger.error(f"✗ Échec du chargement du modèle : {e}")
+        return
+
+    model_status = "ready"
+    logger.info(f"✓ API prête ({startup_timings.summary()})")
+
+async def evict_idle_models():
+    """Libère régulièrement les modèles restés inactifs trop longtemps."""
+    while True:
+        await asyncio.sleep(60)
+        models.evict()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    for task in (startup_task, eviction_task):
+        if task is not None:
+            task.cancel()
+    if batcher is not None:
+        await batcher.stop()
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 # ─── Schéma de la requête ─────────────────────────────────────────────────────
-class PredictRequest(BaseModel):
+class ForecastParams(BaseModel):
+    prediction_length: int = Field(24, ge=1, le=MAX_PREDICTION_LENGTH)   # Nombre d'heures à prédire
+    num_samples: int = Field(DEFAULT_NUM_SAMPLES, ge=1, le=MAX_NUM_SAMPLES)  # Échantillons Monte Carlo (profil, sinon 50)
+    seed: int | None = None     # Graine du tirage (fait partie de la clé de cache)
+    quantiles: list[Annotated[float, Field(gt=0, lt=1)]] = []  # Bandes supplémentaires, ex. [0.1, 0.9]
+    return_samples: bool = False  # Renvoyer la matrice brute des échantillons
+
+    @field_validator("quantiles")
+    @classmethod
+    def check_quantiles(cls, quantiles):
+        # Bornes ]0, 1[ vérifiées par le type ; tri et dédoublonnage
+        return sorted(set(quantiles))
+
+class PredictRequest(ForecastParams):
     context: list[float]        # Les 528 valeurs de contexte
-    prediction_length: int = 24 # Nombre d'heures à prédire
-    num_samples: int = 50       # Nombre d'échantillons Monte Carlo
 
 # ─── Schéma de la réponse ─────────────────────────────────────────────────────
 class PredictResponse(BaseModel):
+    model: str                  # Identifiant du modèle qui a produit la prévision
     predictions: list[float]    # Les 24 valeurs prédites (médiane)
     mean: float
     min: float
     max: float
+    quantiles: dict[str, list[float]] = {}  # Bandes demandées, clé « 0.1 », « 0.9 »...
+    samples: str | None = None              # float32 little-endian encodé en base64
+    samples_shape: list[int] | None = None  # [num_samples, prediction_length]
 
 # ─── Route de santé ───────────────────────────────────────────────────────────
 @app.get("/health")
 async def health():
+    # 503 tant que le warm-up n'est pas terminé : sonde de disponibilité
+    return JSONResponse(
+        status_code=200 if model_status == "ready" else 503,
+        content={
+            "status": model_status,
+            "pid": os.getpid(),
+            "model_loaded": models is not None and DEFAULT_MODEL_ID in models,
+            "startup": startup_timings.as_dict()
+        }
+    )
+
+# ─── Métriques Prometheus ──────────────────────────────────────────────────────
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.middleware("http")
+async def record_predict_metrics(http_request: Request, call_next):
+    """Latence et code de statut de /predict et /series/.../predict, par modèle et paramètres."""
+    if "/predict" not in http_request.url.path:
+        return await call_next(http_request)
+
+    started  = time.perf_counter()
+    response = await call_next(http_request)
+    labels   = getattr(http_request.state, "metric_labels", None)   # posé par predict()
+
+    REQUESTS.labels(labels[0] if labels else "", str(response.status_code)).inc()
+    # Flux : call_next rend la main dès les en-têtes, latences mesurées par stream_response()
+    streamed = stream_media_type(response.headers.get("content-type", "")) is not None
+    if labels and response.status_code == 200 and not streamed:
+        REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - started)
+    return response
+
+# ─── Route des modèles (registre et cache) ─────────────────────────────────────
+@app.get("/models")
+async def list_models():
     return {
-        "status": "ok",
-        "model_loaded": pipeline is not None
+        "default": DEFAULT_MODEL_ID,
+        **(models.stats() if models else {})
+    }
+
+# ─── Route de charge (dimensionnement de la file) ─────────────────────────────
+@app.get("/stats")
+async def stats():
+    return {
+        "admitted": admitted,
+        "max_queue_depth": MAX_QUEUE_DEPTH,
+        "inference_workers": INFERENCE_WORKERS,
+        "torch_threads": TORCH_NUM_THREADS,
+        "interop_threads": torch.get_num_interop_threads(),
+        "models_loaded": [m for m in registry if models is not None and m in models],
+        **(batcher.stats() if batcher else {}),
+        "cache": cache.stats() if cache else {},
+        "series": series.stats(),
+        "profile": profile
     }
 
 # ─── Route de prédiction ──────────────────────────────────────────────────────
-@app.post("/predict", response_model=PredictResponse)
-async def predict(request: PredictRequest):
-    if pipeline is None:
-        raise HTTPException(status_code=503, detail="Modèle non chargé")
+def parse_predict_body(body, binary):
+    """
+    Corps JSON (PredictRequest) ou binaire (chronos_wire) → paramètres communs.
+    Le contexte binaire reste une vue sur le corps reçu (aucune copie).
+    """
+    try:
+        if binary:
+            params  = decode_request(body)
+            context = params.pop("context")
+            request = PredictRequest.model_validate({**params, "context": []})
+        else:
+            request = PredictRequest.model_validate_json(body)
+            context = np.asarray(request.context, dtype=np.float32)
+    except WireFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return request, context
+
+PREDICT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": PredictRequest.model_json_schema()},
+            WIRE_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+def check_model_ready(model_id):
+    if model_status != "ready":
+        raise HTTPException(
+            status_code=503,
+            detail=f"Modèle non prêt ({model_status})",
+            headers={"Retry-After": "10"}
+        )
+
+    if model_id not in registry:
+        raise HTTPException(status_code=404, detail=f"Modèle inconnu : {model_id}")
+
+@app.post("/predict", response_model=PredictResponse, openapi_extra=PREDICT_REQUEST_BODY)
+@app.post("/predict/{model_id}", response_model=PredictResponse, openapi_extra=PREDICT_REQUEST_BODY)
+async def predict(http_request: Request, model_id: str | None = None):
+    """Prévision par le modèle `model_id` du registre (par défaut : DEFAULT_MODEL_ID)."""
+    model_id = model_id or DEFAULT_MODEL_ID
+    check_model_ready(model_id)
+
+    # Négociation : Content-Type pour la requête, Accept pour la réponse
+    binary_in  = http_request.headers.get("content-type", "").startswith(WIRE_CONTENT_TYPE)
+    binary_out = WIRE_CONTENT_TYPE in http_request.headers.get("accept", "")
+    stream     = stream_media_type(http_request.headers.get("accept", ""))
+    request, context = parse_predict_body(await http_request.body(), binary_in)
+    http_request.state.metric_labels = (model_id, str(request.prediction_length), str(request.num_samples))
     
-    if len(request.context) == 0:
+    if context.size == 0:
         raise HTTPException(status_code=400, detail="Le contexte est vide")
-    
-    logger.info(f"Prédiction reçue : {len(request.context)} valeurs de contexte")
-    
+
+    logger.info(
+        f"Prédiction reçue : {context.size} valeurs de contexte, modèle {model_id} "
+        f"({'binaire' if binary_in else 'JSON'}{', en flux' if stream else ''})"
+    )
+    if stream:
+        return stream_response(model_id, request, context, stream)
+    return await forecast_response(model_id, request, context, binary_out)
+
+def check_admission():
+    # File pleine : refuser tout de suite plutôt que de laisser la latence exploser
+    if admitted >= MAX_QUEUE_DEPTH:
+        logger.warning(f"⚠ File d'inférence pleine ({admitted}/{MAX_QUEUE_DEPTH}), requête refusée")
+        raise HTTPException(
+            status_code=429,
+            detail="File d'inférence pleine, réessayer plus tard",
+            headers={"Retry-After": str(retry_after_seconds())}
+        )
+
+def as_tensor(context):
+    # Vue sur le tableau, sans copie
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)   # tampon binaire en lecture seule
+        return torch.from_numpy(context)
+
+def cache_key(model_id, request, context):
+    return forecast_cache_key(
+        context,
+        request.prediction_length,
+        request.num_samples,
+        f"{model_id}:{registry[model_id]['path']}:{registry[model_id]['backend']}",
+        request.seed
+    )
+
+async def forecast_response(model_id, request, context, binary_out, headers=None):
+    """
+    Prévision de `context` (float32) : contrôle d'admission, cache, puis
+    micro-batching ; réponse JSON (PredictResponse) ou binaire.
+    """
+    global admitted
+    check_admission()
+
+    admitted += 1
     try:
-        # Préparer le contexte
-        context = torch.tensor(request.context, dtype=torch.float32)
+        context_tensor = as_tensor(context)
+        key = cache_key(model_id, request, context)
+
+        computed = False
+
+        async def compute():
+            nonlocal computed
+            computed = True
+            # Le modèle n'est chargé (ou gardé en mémoire) que sur un défaut de cache
+            async with models.lease(model_id):
+                return await batcher.submit(
+                    context_tensor,
+                    model_id,
+                    request.prediction_length,
+                    request.num_samples,
+                    request.seed
+                )
         
-        # Générer la prédiction
-        forecast = pipeline.predict(
-            context,
-            request.prediction_length,
-            num_samples=request.num_samples
-        )
+        # Générer la prédiction (cache, sinon regroupée dans le pool d'inférence)
+        samples = await cache.get_or_compute(key, compute)
+        CACHE_RESULTS.labels("miss" if computed else "hit").inc()
         
-        # Calculer la médiane
-        median = np.quantile(forecast[0].numpy(), 0.5, axis=0)
-        predictions = [round(float(v), 2) for v in median]
+        # Médiane + bandes en une passe, hors de la boucle asyncio
+        summary = await asyncio.to_thread(
+            summarize_samples,
+            samples,
+            request.quantiles,
+            request.return_samples,
+            binary_out
+        )
+
+        headers = {"X-Model-Id": model_id, **(headers or {})}
+        if binary_out:
+            logger.info(f"✓ Prédiction générée : {request.prediction_length} valeurs (binaire)")
+            return Response(content=summary, media_type=WIRE_CONTENT_TYPE, headers=headers)
         
-        logger.info(f"✓ Prédiction générée : {len(predictions)} valeurs")
-        logger.info(f"  Moyenne : {np.mean(predictions):.2f} MW")
+        logger.info(f"✓ Prédiction générée : {len(summary['predictions'])} valeurs")
+        logger.info(f"  Moyenne : {summary['mean']:.2f} MW")
         
-        return PredictResponse(
-            predictions=predictions,
-            mean=round(float(np.mean(predictions)), 2),
-            min=round(float(np.min(predictions)), 2),
-            max=round(float(np.max(predictions)), 2)
+        return JSONResponse(
+            content=PredictResponse(model=model_id, **summary).model_dump(),
+            headers=headers
         )
     
     except Exception as e:
         logger.error(f"Erreur prédiction : {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+    finally:
+        admitted -= 1
+
+# ─── Prévision en flux (NDJSON ou SSE) ────────────────────────────────────────
+def stream_response(model_id, request, context, media_type, headers=None):
+    """
+    Prévision envoyée pas à pas : un événement « step » (médiane et bandes)
+    par heure de l'horizon dès qu'elle est décodée, puis « done » avec le
+    résumé, le délai avant la première valeur et la durée totale. Hors
+    micro-batching (un contexte par appel au modèle) ; un résultat en cache
+    est envoyé d'un bloc, de même qu'une prévision d'un backend hors de
+    STREAMING_BACKENDS (onnx), calculée par le MicroBatcher.
+    """
+    global admitted
+    check_admission()
+
+    admitted += 1
+    started  = time.perf_counter()
+    labels   = (model_id, str(request.prediction_length), str(request.num_samples))
+    loop     = asyncio.get_running_loop()
+    queue    = asyncio.Queue()
+    computed = False
+
+    def on_step(step, values):
+        # Thread du pool d'inférence → boucle asyncio
+        loop.call_soon_threadsafe(queue.put_nowait, ("step", step, values))
+
+    async def compute():
+        nonlocal computed
+        computed = True
+        async with models.lease(model_id):
+            if registry[model_id]["backend"] not in STREAMING_BACKENDS:
+                return await batcher.submit(
+                    as_tensor(context), model_id, request.prediction_length, request.num_samples, request.seed
+                )
+            return await loop.run_in_executor(
+                executor, stream_samples, models.pipeline(model_id), as_tensor(context),
+                request.prediction_length, request.num_samples, request.seed, on_step
+            )
+
+    async def produce():
+        # Va jusqu'au bout même si le client se déconnecte : le résultat reste en cache
+        global admitted
+        try:
+            samples = await cache.get_or_compute(cache_key(model_id, request, context), compute)
+            CACHE_RESULTS.labels("miss" if computed else "hit").inc()
+            queue.put_nowait(("done", None, samples))
+        except Exception as e:
+            logger.error(f"Erreur prédiction (flux) : {e}")
+            queue.put_nowait(("error", None, str(e)))
+        finally:
+            admitted -= 1
+
+    async def events():
+        first_value = None
+        sent        = 0
+        while True:
+            kind, step, payload = await queue.get()
+            if kind == "error":
+                yield encode_event(media_type, {"event": "error", "detail": payload})
+                return
+
+            # Cache (ou calcul identique déjà en cours) : pas encore envoyés → d'un bloc
+            pending = [(step, payload)] if kind == "step" else [(s, payload[:, s]) for s in range(sent, payload.shape[1])]
+            for step, values in pending:
+                if step < sent:
+                    continue
+                median, bands = step_summary(values, request.quantiles)
+                elapsed = time.perf_counter() - started
+                if first_value is None:
+                    first_value = elapsed
+                    STREAM_FIRST_VALUE.labels(*labels).observe(first_value)
+                sent += 1
+                yield encode_event(media_type, {
+                    "event": "step", "step": step + 1, "prediction": median,
+                    "quantiles": bands, "elapsed_ms": round(elapsed * 1000, 1)
+                })
+
+            if kind == "done":
+                total  = time.perf_counter() - started
+                median = np.round(np.quantile(payload, 0.5, axis=0), 2)
+                STREAM_LATENCY.labels(*labels).observe(total)
+                logger.info(
+                    f"✓ Prédiction en flux : {sent} valeurs, première après {(first_value or total) * 1000:.0f} ms, "
+                    f"totale {total * 1000:.0f} ms ({'calcul' if computed else 'cache'})"
+                )
+                yield encode_event(media_type, {
+                    "event": "done", "model": model_id,
+                    "mean": round(float(np.mean(median)), 2),
+                    "min": round(float(np.min(median)), 2),
+                    "max": round(float(np.max(median)), 2),
+                    "cached": not computed,
+                    "time_to_first_value_ms": round((first_value or total) * 1000, 1),
+                    "total_ms": round(total * 1000, 1)
+                })
+                return
+
+    task = asyncio.create_task(produce())
+    stream_tasks.add(task)
+    task.add_done_callback(stream_tasks.discard)
+    return StreamingResponse(
+        events(),
+        media_type=media_type,
+        headers={"X-Model-Id": model_id, "Cache-Control": "no-cache", **(headers or {})}
+    )
+
+# ─── Sessions de séries : contexte gardé par l'API, complété point par point ──
+class SeriesPoint(BaseModel):
+    timestamp: datetime         # Heure pleine, avec fuseau
+    value: float
+
+class SeriesAppend(BaseModel):
+    real: list[SeriesPoint] = []    # Consommation réalisée (début du contexte)
+    rte: list[SeriesPoint] = []     # Prévisions RTE (fin du contexte)
+    # Dernier point que le client croit présent par couche (null = couche vide) :
+    # 409 si la session diffère, le client renvoie alors tout le contexte
+    expected_last: dict[str, datetime | None] | None = None
+
+class SeriesCreate(SeriesAppend):
+    real_length: int = Field(DEFAULT_LAYERS["real"], ge=1, le=MAX_SERIES_LENGTH)  # Taille des tampons
+    rte_length: int = Field(DEFAULT_LAYERS["rte"], ge=1, le=MAX_SERIES_LENGTH)
+
+class SeriesPredictRequest(ForecastParams):
+    expected_last: dict[str, datetime | None] | None = None
+
+def get_series(series_id):
+    session = series.get(series_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Série inconnue : {series_id}")
+    return session
+
+def append_points(session, body):
+    try:
+        appended = session.append(
+            {
+                "real": [(p.timestamp, p.value) for p in body.real],
+                "rte":  [(p.timestamp, p.value) for p in body.rte],
+            },
+            body.expected_last
+        )
+    except SeriesConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**session.state(), "appended": appended}
+
+@app.put("/series/{series_id}")
+async def create_series(series_id: str, body: SeriesCreate):
+    """Crée (ou remplace) la série `series_id` avec son contexte complet."""
+    # Remplie avant de remplacer l'ancienne : une requête invalide (400) la laisse intacte
+    session = SeriesSession(series_id, {"real": body.real_length, "rte": body.rte_length})
+    state   = append_points(session, body.model_copy(update={"expected_last": None}))
+    series.put(session)
+    logger.info(f"Série {series_id} créée : {session.context().size} valeurs de contexte")
+    return state
+
+@app.post("/series/{series_id}/append")
+async def append_series(series_id: str, body: SeriesAppend):
+    """Ajoute les nouveaux points (réels, RTE) ; les points déjà connus sont ignorés."""
+    return append_points(get_series(series_id), body)
+
+@app.get("/series/{series_id}")
+async def series_state(series_id: str):
+    return get_series(series_id).state()
+
+@app.delete("/series/{series_id}", status_code=204)
+async def delete_series(series_id: str):
+    if not series.delete(series_id):
+        raise HTTPException(status_code=404, detail=f"Série inconnue : {series_id}")
+
+@app.post("/series/{series_id}/predict", response_model=PredictResponse)
+@app.post("/series/{series_id}/predict/{model_id}", response_model=PredictResponse)
+async def predict_series(http_request: Request, series_id: str, body: SeriesPredictRequest, model_id: str | None = None):
+    """
+    Prévision sur le contexte de la session : seuls les paramètres sont
+    envoyés. Le contexte float32 assemblé est réutilisé tant que la série ne
+    change pas (et la prévision elle-même par le cache).
+    """
+    model_id = model_id or DEFAULT_MODEL_ID
+    check_model_ready(model_id)
+    http_request.state.metric_labels = (model_id, str(body.prediction_length), str(body.num_samples))
+
+    session = get_series(series_id)
+    try:
+        session.check_last(body.expected_last)
+    except SeriesConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    context = session.context()
+    if context.size == 0:
+        raise HTTPException(status_code=400, detail="Le contexte est vide")
+
+    logger.info(f"Prédiction reçue : série {series_id} (version {session.version}), modèle {model_id}")
+    accept  = http_request.headers.get("accept", "")
+    headers = {"X-Series-Version": str(session.version)}
+    if stream_media_type(accept):
+        return stream_response(model_id, body, context, stream_media_type(accept), headers)
+    return await forecast_response(model_id, body, context, WIRE_CONTENT_TYPE in accept, headers)
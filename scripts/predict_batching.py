@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Élément en attente dans la file ─────────────────────────────────────────
+class _PendingRequest:
+    __slots__ = ("context", "key", "future", "enqueued_at")
+
+    def __init__(self, context, key, future):
+        self.context     = context           # Tenseur 1D du contexte
+        self.key         = key               # (prediction_length, num_samples, ...)
+        self.future      = future            # Résultat renvoyé à l'appelant
+        self.enqueued_at = time.perf_counter()
+
+
+# ─── Micro-batching dynamique ────────────────────────────────────────────────
+class MicroBatcher:
+    """
+    Regroupe les requêtes /predict concurrentes en un seul appel au modèle.
+
+    Les requêtes arrivées pendant `max_wait_ms` (ou jusqu'à `max_batch_size`)
+    sont regroupées par paramètres identiques (prediction_length, num_samples,
+    ...), puis envoyées en une seule fois à `predict_fn` sous forme de liste
+    de tenseurs : ChronosPipeline se charge du padding à gauche. Chaque
+    appelant reçoit sa propre tranche du résultat.
+
+    `predict_fn` est exécutée dans `executor` (jamais sur la boucle asyncio),
+    avec au plus `max_concurrent_batches` batchs en cours : tant que tous les
+    workers sont occupés, les requêtes s'accumulent dans la file et formeront
+    le batch suivant.
+
+    `observer(params, wait_times, service_time)`, si fourni, est appelé après
+    chaque batch réussi (métriques) avec l'attente en file de chaque requête
+    et la durée de l'appel au modèle, en secondes.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0,
+                 executor=None, max_concurrent_batches=1, observer=None):
+        self.predict_fn             = predict_fn
+        self.max_batch_size         = max(1, int(max_batch_size))
+        self.max_wait               = max(0.0, float(max_wait_ms)) / 1000.0
+        self.executor               = executor
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self.observer               = observer
+        self.queue                  = None
+        self._slots                 = None
+        self._task                  = None
+        self._running               = set()
+
+        # Compteurs pour suivre l'efficacité du regroupement et la charge
+        self.batches_run    = 0
+        self.requests_done  = 0
+        self.wait_times     = deque(maxlen=1000)   # secondes, file → worker
+        self.service_times  = deque(maxlen=200)    # secondes, durée d'un batch
+
+    # ─── Cycle de vie ────────────────────────────────────────────────────────
+    def start(self):
+        self.queue  = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._task  = asyncio.create_task(self._run())
+        logger.info(
+            f"Micro-batching actif : batch max {self.max_batch_size}, "
+            f"attente max {self.max_wait * 1000:.1f} ms, "
+            f"{self.max_concurrent_batches} batch(s) en parallèle"
+        )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ─── Statistiques ────────────────────────────────────────────────────────
+    @property
+    def mean_batch_size(self):
+        if self.batches_run == 0:
+            return 0.0
+        return self.requests_done / self.batches_run
+
+    @property
+    def queue_depth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    @property
+    def mean_service_time(self):
+        if not self.service_times:
+            return None
+        return float(np.mean(self.service_times))
+
+    def stats(self):
+        waits = np.array(self.wait_times) * 1000 if self.wait_times else np.zeros(1)
+        return {
+            "queue_depth":       self.queue_depth,
+            "running_batches":   len(self._running),
+            "batches":           self.batches_run,
+            "requests":          self.requests_done,
+            "mean_batch_size":   round(self.mean_batch_size, 2),
+            "wait_ms_mean":      round(float(np.mean(waits)), 2),
+            "wait_ms_p95":       round(float(np.percentile(waits, 95)), 2),
+            "batch_ms_mean":     round((self.mean_service_time or 0.0) * 1000, 2),
+        }
+
+    # ─── Soumission d'une requête ────────────────────────────────────────────
+    async def submit(self, context, *params):
+        """`params` est transmis tel quel à `predict_fn` après la liste des contextes."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(_PendingRequest(context, params, future))
+        return await future
+
+    # ─── Boucle de regroupement ──────────────────────────────────────────────
+    async def _collect(self):
+        loop  = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Vider d'abord ce qui est déjà en file, sans attendre
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # Ignorer les requêtes dont le client s'est déjà déconnecté
+        return [item for item in batch if not item.future.done()]
+
+    async def _run(self):
+        while True:
+            # Attendre un worker libre AVANT de former le batch
+            await self._slots.acquire()
+            batch = await self._collect()
+            if not batch:
+                self._slots.release()
+                continue
+
+            groups = {}
+            for item in batch:
+                groups.setdefault(item.key, []).append(item)
+
+            for i, (params, items) in enumerate(groups.items()):
+                if i > 0:
+                    await self._slots.acquire()
+                task = asyncio.create_task(self._execute(items, params))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _execute(self, items, params):
+        loop    = asyncio.get_running_loop()
+        started = time.perf_counter()
+        waits   = [started - item.enqueued_at for item in items]
+        self.wait_times.extend(waits)
+
+        try:
+            forecast = await loop.run_in_executor(
+                self.executor,
+                self.predict_fn,
+                [item.context for item in items],
+                *params
+            )
+        except Exception as e:
+            logger.error(f"Erreur batch ({len(items)} requêtes) : {e}")
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        service = time.perf_counter() - started
+        self.service_times.append(service)
+        self.batches_run   += 1
+        self.requests_done += len(items)
+
+        for i, item in enumerate(items):
+            if not item.future.done():
+                item.future.set_result(forecast[i])
+
+        if self.observer is not None:
+            try:
+                self.observer(params, waits, service)
+            except Exception as e:
+                logger.warning(f"⚠ Observateur du batch en erreur : {e}")
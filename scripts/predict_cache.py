@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Clé de cache adressée par le contenu ────────────────────────────────────
+# À changer si la forme des valeurs stockées change (invalide le cache disque)
+CACHE_FORMAT = "samples-v1"
+
+
+def forecast_cache_key(context, prediction_length, num_samples, model_id, seed=None):
+    """
+    Empreinte SHA-256 de tout ce qui détermine une prévision :
+    octets du contexte (float32), horizon, nombre d'échantillons, modèle, graine.
+    """
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(context, dtype=np.float32))
+    h.update(f"|{prediction_length}|{num_samples}|{model_id}|{seed}|{CACHE_FORMAT}".encode())
+    return h.hexdigest()
+
+
+# ─── Cache LRU + TTL avec niveau disque optionnel ────────────────────────────
+class ForecastCache:
+    """
+    Cache des prévisions en mémoire (LRU, TTL, nombre d'entrées borné), avec
+    un second niveau optionnel sur disque (`disk_dir`) qui survit aux
+    redémarrages de l'API.
+
+    `get_or_compute` assure le « single-flight » : des requêtes identiques
+    concurrentes attendent le même calcul au lieu d'en lancer chacune un.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=6 * 3600,
+                 disk_dir=None, disk_max_entries=10000):
+        self.max_entries      = max(0, int(max_entries))
+        self.ttl              = float(ttl_seconds)
+        self.disk_dir         = disk_dir or None
+        self.disk_max_entries = max(0, int(disk_max_entries))
+        self._entries         = OrderedDict()    # key → (expire_at, valeur)
+        self._inflight        = {}               # key → asyncio.Task du calcul
+        self._waiters         = {}               # asyncio.Task → appelants en attente
+
+        self.hits       = 0
+        self.disk_hits  = 0
+        self.misses     = 0
+        self.coalesced  = 0
+        self.evictions  = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            logger.info(f"Cache disque des prévisions : {self.disk_dir}")
+
+    # ─── Statistiques ────────────────────────────────────────────────────────
+    def stats(self):
+        return {
+            "entries":   len(self._entries),
+            "inflight":  len(self._inflight),
+            "hits":      self.hits,
+            "disk_hits": self.disk_hits,
+            "misses":    self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+    # ─── Niveau mémoire ──────────────────────────────────────────────────────
+    def _get_memory(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expire_at, value = entry
+        if expire_at < time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_memory(self, key, value):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # ─── Niveau disque ───────────────────────────────────────────────────────
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npy")
+
+    def _get_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                self.evictions += 1
+                return None
+            return np.load(path, allow_pickle=False)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def _put_disk(self, key, value):
+        path = self._disk_path(key)
+        tmp  = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, np.asarray(value), allow_pickle=False)
+            os.replace(tmp, path)
+            self._prune_disk()
+        except OSError as e:
+            logger.warning(f"⚠ Écriture cache disque impossible : {e}")
+
+    def _prune_disk(self):
+        files = [e for e in os.scandir(self.disk_dir) if e.name.endswith(".npy")]
+        excess = len(files) - self.disk_max_entries
+        if excess <= 0:
+            return
+        files.sort(key=lambda e: e.stat().st_mtime)
+        for entry in files[:excess]:
+            try:
+                os.remove(entry.path)
+                self.evictions += 1
+            except OSError:
+                pass
+
+    # ─── Lecture / calcul avec coalescence ───────────────────────────────────
+    async def get_or_compute(self, key, compute):
+        value = self._get_memory(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        # Même calcul déjà en cours : on attend son résultat
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._load_or_compute(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # Le calcul est une tâche à part : annuler un appelant ne l'interrompt
+        # pas tant que d'autres l'attendent ; le dernier à partir l'annule.
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    self._forget(key, task)
+                    task.cancel()
+
+    async def _load_or_compute(self, key, compute):
+        value = None
+        if self.disk_dir:
+            value = await asyncio.to_thread(self._get_disk, key)
+            if value is not None:
+                self.disk_hits += 1
+
+        if value is None:
+            self.misses += 1
+            value = await compute()
+            if self.disk_dir:
+                await asyncio.to_thread(self._put_disk, key, value)
+
+        self._put_memory(key, value)
+        return value
+
+    def _forget(self, key, task):
+        # Un calcul annulé ne doit plus être rejoint par de nouveaux appelants
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
@@ -0,0 +1,189 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+from chronos import ChronosPipeline
+from chronos.chronos import ChronosConfig, ChronosModel
+from transformers import AutoConfig
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Chronométrage du démarrage à froid ──────────────────────────────────────
+class StartupTimings:
+    """
+    Durées (s) des étapes du démarrage : imports, chargement des poids,
+    transfert vers le device, warm-up. Exposées par /health pour suivre les
+    régressions de démarrage à froid.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, name, seconds):
+        self.stages[name] = round(seconds, 3)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def as_dict(self):
+        return {**self.stages, "total": round(sum(self.stages.values()), 3)}
+
+    def summary(self):
+        return " | ".join(f"{name} {seconds:.2f}s" for name, seconds in self.as_dict().items())
+
+
+# ─── Backends d'inférence ────────────────────────────────────────────────────
+# float32  : eager PyTorch, référence de précision
+# bfloat16 : eager PyTorch, rapide seulement sur CPU/GPU avec support bf16 natif
+# int8     : couches Linear quantifiées dynamiquement (CPU uniquement)
+# onnx     : graphe T5 exporté, exécuté par ONNX Runtime (CPU, dépendance optionnelle)
+BACKENDS = ("float32", "bfloat16", "int8", "onnx")
+
+
+class OnnxSeq2SeqLM(torch.nn.Module):
+    """
+    Adaptateur : ChronosModel attend un nn.Module exposant `generate` et
+    `device` ; le modèle ONNX Runtime d'optimum n'en est pas un.
+    """
+
+    def __init__(self, ort_model, nbytes=0):
+        super().__init__()
+        self.ort_model = ort_model
+        self.nbytes    = nbytes   # Taille des graphes .onnx (poids inclus)
+
+    @property
+    def device(self):
+        return torch.device("cpu")
+
+    def generate(self, **kwargs):
+        return self.ort_model.generate(**kwargs)
+
+
+def _load_onnx(model_path, onnx_dir, num_threads):
+    try:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise RuntimeError("Backend onnx : installer onnxruntime et optimum-onnx[onnxruntime]")
+
+    options = onnxruntime.SessionOptions()
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+
+    onnx_dir = onnx_dir or os.path.join(model_path, "onnx")
+    if not os.path.isfile(os.path.join(onnx_dir, "encoder_model.onnx")):
+        logger.info(f"Export ONNX du modèle vers {onnx_dir} (une seule fois)...")
+        ORTModelForSeq2SeqLM.from_pretrained(model_path, export=True, use_cache=True).save_pretrained(onnx_dir)
+
+    ort_model = ORTModelForSeq2SeqLM.from_pretrained(
+        onnx_dir,
+        use_cache=True,
+        use_merged=False,
+        session_options=options,
+    )
+    nbytes = sum(
+        os.path.getsize(os.path.join(onnx_dir, name))
+        for name in os.listdir(onnx_dir) if name.endswith((".onnx", ".onnx_data"))
+    )
+    return OnnxSeq2SeqLM(ort_model, nbytes)
+
+
+def load_pipeline(model_path, device, backend, timings, onnx_dir=None, num_threads=None):
+    """
+    Charge le checkpoint Chronos pour le backend choisi, en étapes chronométrées :
+      - weights   : lecture des poids sur CPU dans leur type d'origine. Les
+                    fichiers safetensors sont mappés en mémoire et le modèle
+                    est construit sans initialisation aléatoire préalable
+                    (low_cpu_mem_usage) ;
+      - to_device : conversion de type ou quantification, puis transfert vers
+                    `device` (toujours le CPU pour int8 et onnx).
+
+    Le backend onnx réutilise l'export présent dans `onnx_dir` (par défaut
+    `<model_path>/onnx`) ou le crée au premier chargement.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend inconnu : {backend} (attendu : {', '.join(BACKENDS)})")
+    if backend in ("int8", "onnx") and torch.device(device).type != "cpu":
+        logger.warning(f"⚠ Backend {backend} : exécution sur CPU (device {device} ignoré)")
+
+    if backend == "onnx":
+        with timings.stage("weights"):
+            config         = AutoConfig.from_pretrained(model_path)
+            chronos_config = ChronosConfig(**config.chronos_config)
+            if chronos_config.model_type != "seq2seq":
+                raise ValueError("Backend onnx : seuls les modèles Chronos-T5 (seq2seq) sont supportés")
+            ort_model = _load_onnx(model_path, onnx_dir, num_threads)
+        return ChronosPipeline(
+            tokenizer=chronos_config.create_tokenizer(),
+            model=ChronosModel(config=chronos_config, model=ort_model),
+        )
+
+    with timings.stage("weights"):
+        pipeline = ChronosPipeline.from_pretrained(
+            model_path,
+            device_map="cpu",
+            dtype="auto",
+            use_safetensors=None,   # safetensors si présent, sinon pytorch_model.bin
+            low_cpu_mem_usage=True,
+        )
+
+    with timings.stage("to_device"):
+        if backend == "int8":
+            pipeline.model.to(dtype=torch.float32)
+            torch.ao.quantization.quantize_dynamic(
+                pipeline.model.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+        else:
+            pipeline.model.to(device=device, dtype=getattr(torch, backend))
+        pipeline.model.eval()
+
+    return pipeline
+
+
+def model_nbytes(pipeline):
+    """Mémoire occupée par les poids du modèle (octets), tous backends confondus."""
+    model = pipeline.model.model
+    if isinstance(model, OnnxSeq2SeqLM):
+        return model.nbytes
+
+    sizes = {}   # Par adresse : les embeddings partagés ne comptent qu'une fois
+    for value in model.state_dict(keep_vars=True).values():
+        # Linear quantifiées : poids empaquetés en tuple (poids int8, biais)
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if torch.is_tensor(tensor):
+                sizes[tensor.data_ptr()] = tensor.numel() * tensor.element_size()
+    return sum(sizes.values())
+
+
+# ─── Warm-up ─────────────────────────────────────────────────────────────────
+def warm_up(predict_fn, runs, context_length, prediction_length, num_samples, timings):
+    """
+    Prévisions factices sur un profil journalier synthétique : la première
+    requête réelle ne paie plus l'initialisation paresseuse (allocateurs,
+    noyaux, caches de génération). Retourne la durée (ms) de chaque passe.
+    """
+    hours   = np.arange(context_length)
+    context = torch.tensor(
+        55000 + 8000 * np.sin(2 * np.pi * hours / 24),
+        dtype=torch.float32
+    )
+
+    durations = []
+    with timings.stage("warmup"):
+        for _ in range(runs):
+            start = time.perf_counter()
+            predict_fn([context], prediction_length, num_samples, None)
+            durations.append(round((time.perf_counter() - start) * 1000, 1))
+
+    if durations:
+        logger.info(f"Warm-up : {runs} passe(s), {' / '.join(f'{d:.0f} ms' for d in durations)}")
+    return durations
@@ -0,0 +1,96 @@
+import os
+import resource
+
+import torch
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+# ─── Registre Prometheus de l'API (exposé sur /metrics) ──────────────────────
+# Sous serve_prefork.py, chaque worker a son propre registre : une collecte
+# ne reflète que le worker qui a répondu.
+REGISTRY = CollectorRegistry()
+
+LABELS = ["model", "prediction_length", "num_samples"]
+
+# Latences de l'ordre de 10 ms (cache) à plusieurs dizaines de secondes (CPU)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_LATENCY = Histogram(
+    "predict_request_duration_seconds",
+    "Latence de bout en bout de /predict (réponses 200)",
+    LABELS, buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+QUEUE_WAIT = Histogram(
+    "predict_queue_wait_seconds",
+    "Attente d'une requête dans la file du micro-batching avant l'appel au modèle",
+    LABELS, buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+FORWARD_TIME = Histogram(
+    "predict_forward_duration_seconds",
+    "Durée d'un appel au modèle (un batch)",
+    LABELS, buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+BATCH_SIZE = Histogram(
+    "predict_batch_size",
+    "Nombre de requêtes regroupées par appel au modèle",
+    LABELS, buckets=(1, 2, 4, 8, 16, 32, 64), registry=REGISTRY,
+)
+STREAM_FIRST_VALUE = Histogram(
+    "predict_stream_first_value_seconds",
+    "Prévision en flux : délai avant l'envoi de la première valeur (H+1)",
+    LABELS, buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+STREAM_LATENCY = Histogram(
+    "predict_stream_duration_seconds",
+    "Prévision en flux : durée jusqu'au dernier pas de l'horizon",
+    LABELS, buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+REQUESTS = Counter(
+    "predict_requests",
+    "Requêtes /predict par code de statut",
+    ["model", "status"], registry=REGISTRY,
+)
+CACHE_RESULTS = Counter(
+    "predict_cache_lookups",
+    "Consultations du cache des prévisions (hit mémoire/disque ou calcul)",
+    ["result"], registry=REGISTRY,
+)
+
+PROCESS_RSS = Gauge("process_resident_memory_bytes", "RSS courant du processus", registry=REGISTRY)
+TORCH_THREADS = Gauge("torch_intra_op_threads", "Threads intra-op de torch", registry=REGISTRY)
+TORCH_INTEROP_THREADS = Gauge("torch_inter_op_threads", "Threads inter-op de torch", registry=REGISTRY)
+QUEUE_DEPTH = Gauge("predict_queue_depth", "Requêtes en attente dans la file du micro-batching", registry=REGISTRY)
+ADMITTED = Gauge("predict_admitted_requests", "Requêtes acceptées et pas encore terminées", registry=REGISTRY)
+MODELS_MEMORY = Gauge("predict_models_memory_bytes", "Poids des modèles chargés", registry=REGISTRY)
+
+
+def current_rss_bytes():
+    """RSS courant (Linux : /proc/self/statm), sinon pic de RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def bind_gauges(queue_depth, admitted, models_memory):
+    """Jauges lues à chaque collecte à partir de l'état courant de l'API."""
+    PROCESS_RSS.set_function(current_rss_bytes)
+    TORCH_THREADS.set_function(torch.get_num_threads)
+    TORCH_INTEROP_THREADS.set_function(torch.get_num_interop_threads)
+    QUEUE_DEPTH.set_function(queue_depth)
+    ADMITTED.set_function(admitted)
+    MODELS_MEMORY.set_function(models_memory)
+
+
+def observe_batch(params, wait_times, service_time):
+    """Observateur du MicroBatcher : params = (model_id, prediction_length, num_samples, seed)."""
+    model_id, prediction_length, num_samples = params[:3]
+    labels = (model_id, str(prediction_length), str(num_samples))
+    for wait in wait_times:
+        QUEUE_WAIT.labels(*labels).observe(wait)
+    FORWARD_TIME.labels(*labels).observe(service_time)
+    BATCH_SIZE.labels(*labels).observe(len(wait_times))
+
+
+def render():
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Registre des modèles servis ─────────────────────────────────────────────
+def load_registry(path, default_id, default_path, default_backend):
+    """
+    Registre {model_id: {"path", "backend"}} des checkpoints servis.
+
+    Le modèle par défaut est toujours présent ; le fichier JSON optionnel
+    `path` en ajoute (ou redéfinit le défaut) :
+        {
+          "chronos-fine-tuned-j1": {"path": "models/run-0/checkpoint-final"},
+          "chronos-t5-small":      {"path": "amazon/chronos-t5-small", "backend": "float32"}
+        }
+    Une valeur chaîne est un raccourci pour {"path": ...}.
+    """
+    registry = {default_id: {"path": default_path, "backend": default_backend}}
+    if path and os.path.isfile(path):
+        with open(path) as f:
+            for model_id, spec in json.load(f).items():
+                if isinstance(spec, str):
+                    spec = {"path": spec}
+                registry[model_id] = {
+                    "path":    spec["path"],
+                    "backend": spec.get("backend", default_backend),
+                }
+    return registry
+
+
+# ─── Cache LRU des modèles chargés ───────────────────────────────────────────
+class ModelCache:
+    """
+    Modèles chargés en mémoire, par identifiant du registre.
+
+    - chargement à la demande via `load_fn(model_id, spec)` (coroutine qui
+      renvoie (pipeline, nbytes)), un seul chargement par modèle même si
+      plusieurs requêtes arrivent en même temps ;
+    - budget mémoire : au-delà de `memory_budget` octets, les modèles les
+      moins récemment utilisés sont évincés ;
+    - `idle_seconds` > 0 : évince aussi les modèles sans requête depuis ce délai.
+
+    Un modèle en cours d'utilisation (bail ouvert par `lease`) ou épinglé
+    n'est jamais évincé : le budget peut alors être dépassé temporairement.
+    """
+
+    def __init__(self, registry, load_fn, memory_budget, idle_seconds=0, pinned=()):
+        self.registry      = registry
+        self.load_fn       = load_fn
+        self.memory_budget = memory_budget
+        self.idle_seconds  = idle_seconds
+        self.pinned        = set(pinned)
+        self._models       = OrderedDict()   # model_id → entrée, du moins au plus récent
+        self._loading      = {}              # model_id → Task du chargement en cours
+        self._waiters      = {}              # Task → appelants en attente
+        self.loads         = 0
+        self.evictions     = 0
+
+    def __contains__(self, model_id):
+        return model_id in self._models
+
+    def pipeline(self, model_id):
+        """Accès direct (pool d'inférence) : le modèle est tenu par un bail."""
+        return self._models[model_id]["pipeline"]
+
+    @property
+    def used_bytes(self):
+        return sum(entry["nbytes"] for entry in self._models.values())
+
+    @asynccontextmanager
+    async def lease(self, model_id):
+        """Charge le modèle si besoin et le protège de l'éviction pendant l'usage."""
+        entry = await self._acquire(model_id)
+        while self._models.get(model_id) is not entry:
+            # Évincé entre la fin du chargement et notre reprise : recharger
+            entry = await self._acquire(model_id)
+        entry["leases"] += 1
+        self.evict()
+        try:
+            yield entry["pipeline"]
+        finally:
+            entry["leases"]   -= 1
+            entry["last_used"] = time.monotonic()
+            self.evict()
+
+    async def _acquire(self, model_id):
+        if model_id not in self.registry:
+            raise KeyError(model_id)
+
+        entry = self._models.get(model_id)
+        if entry is not None:
+            self._models.move_to_end(model_id)
+            return entry
+
+        # Chargement déjà en cours : on attend le même
+        task = self._loading.get(model_id)
+        if task is None:
+            task = asyncio.create_task(self._load(model_id))
+            self._loading[model_id] = task
+            task.add_done_callback(lambda done: self._forget(model_id, done))
+
+        # Le chargement est une tâche à part : annuler un appelant ne
+        # l'interrompt pas tant que d'autres l'attendent ; le dernier l'annule.
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    self._forget(model_id, task)
+                    task.cancel()
+
+    async def _load(self, model_id):
+        started = time.perf_counter()
+        pipeline, nbytes = await self.load_fn(model_id, self.registry[model_id])
+        entry = {
+            "pipeline":     pipeline,
+            "nbytes":       nbytes,
+            "leases":       0,
+            "last_used":    time.monotonic(),
+            "load_seconds": round(time.perf_counter() - started, 3),
+        }
+        self._models[model_id] = entry
+        self.loads += 1
+        logger.info(
+            f"✓ Modèle {model_id} chargé ({nbytes / 2**20:.0f} Mo, "
+            f"{self.used_bytes / 2**20:.0f}/{self.memory_budget / 2**20:.0f} Mo utilisés)"
+        )
+        return entry
+
+    def _forget(self, model_id, task):
+        # Un chargement annulé ne doit plus être rejoint par de nouveaux appelants
+        if self._loading.get(model_id) is task:
+            del self._loading[model_id]
+
+    def evict(self):
+        """Évince les modèles inactifs, du moins récemment utilisé au plus récent."""
+        now = time.monotonic()
+        for model_id in list(self._models):
+            entry = self._models[model_id]
+            if entry["leases"] or model_id in self.pinned:
+                continue
+            over_budget = self.used_bytes > self.memory_budget
+            idle        = self.idle_seconds > 0 and now - entry["last_used"] > self.idle_seconds
+            if over_budget or idle:
+                del self._models[model_id]
+                self.evictions += 1
+                logger.info(f"Modèle {model_id} évincé ({'budget mémoire' if over_budget else 'inactif'})")
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "memory_budget_mb": round(self.memory_budget / 2**20, 1),
+            "used_mb":          round(self.used_bytes / 2**20, 1),
+            "loads":            self.loads,
+            "evictions":        self.evictions,
+            "models": {
+                model_id: {
+                    **spec,
+                    "loaded":  model_id in self._models,
+                    "loading": model_id in self._loading,
+                    **({
+                        "size_mb":      round(self._models[model_id]["nbytes"] / 2**20, 1),
+                        "leases":       self._models[model_id]["leases"],
+                        "idle_seconds": round(now - self._models[model_id]["last_used"], 1),
+                        "load_seconds": self._models[model_id]["load_seconds"],
+                    } if model_id in self._models else {}),
+                }
+                for model_id, spec in self.registry.items()
+            },
+        }
@@ -0,0 +1,34 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Réglages d'inférence retenus par scripts/autotune_day_ahead.py
+PROFILE_KEYS = ("num_samples", "context_length", "backend", "threads")
+
+
+def load_profile(path):
+    """
+    Profil JSON écrit par autotune_day_ahead.py :
+        {"num_samples": 20, "context_length": 336, "backend": "bfloat16", "threads": 1, ...}
+    Seules les clés de PROFILE_KEYS sont retournées ; fichier absent : {}.
+    """
+    if not path or not os.path.isfile(path):
+        return {}
+    with open(path) as f:
+        profile = {key: value for key, value in json.load(f).items() if key in PROFILE_KEYS}
+    logger.info(f"Profil d'inférence {path} : " + ", ".join(f"{k}={v}" for k, v in profile.items()))
+    return profile
+
+
+def save_profile(path, profile):
+    """Écriture atomique (fichier temporaire puis renommage) : un lecteur ne voit jamais un profil à moitié écrit."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
@@ -0,0 +1,196 @@
+import logging
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Contexte hybride de our_predictions_day_ahead : 504 h réelles + 24 h RTE
+DEFAULT_LAYERS = {"real": 504, "rte": 24}
+
+
+class SeriesConflictError(ValueError):
+    """La session ne finit pas là où le client l'attend : il doit renvoyer tout le contexte."""
+
+
+def to_hours(timestamps):
+    """Timestamps (ISO 8601 ou datetimes tz-aware) → heures depuis l'epoch (int64)."""
+    index = pd.DatetimeIndex(pd.to_datetime(list(timestamps), utc=True))
+    if (index != index.floor("h")).any():
+        raise ValueError("Les timestamps doivent tomber sur des heures pleines")
+    return (index.asi8 // 3_600_000_000_000).astype(np.int64)
+
+
+def hour_to_iso(hour):
+    return None if hour is None else pd.Timestamp(int(hour) * 3600, unit="s", tz="UTC").isoformat()
+
+
+# ─── Tampon circulaire horaire ───────────────────────────────────────────────
+class HourlyRing:
+    """
+    Les `capacity` derniers points horaires d'une couche (comme un
+    ORDER BY timestamp DESC LIMIT capacity), dans un tableau float32 de
+    taille fixe. Un ajout écrit sur les plus anciens ; les points déjà connus
+    (timestamp ≤ dernier) sont ignorés, ce qui rend un ajout rejoué sans effet.
+    """
+
+    def __init__(self, capacity):
+        self.capacity  = int(capacity)
+        self.values    = np.full(self.capacity, np.nan, dtype=np.float32)
+        self.hours     = np.zeros(self.capacity, dtype=np.int64)
+        self.size      = 0
+        self.head      = 0       # prochain emplacement écrit
+        self.last_hour = None
+
+    def check(self, hours):
+        if hours.size and (np.diff(hours) <= 0).any():
+            raise ValueError("Les timestamps doivent être strictement croissants")
+
+    def append(self, hours, values):
+        """Ajoute des points horaires triés ; retourne le nombre de points nouveaux."""
+        hours  = np.asarray(hours, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        self.check(hours)
+        if self.last_hour is not None:
+            new           = hours > self.last_hour
+            hours, values = hours[new], values[new]
+        if hours.size == 0:
+            return 0
+
+        kept  = min(self.capacity, int(hours.size))
+        slots = (self.head + np.arange(hours.size - kept, hours.size)) % self.capacity
+        self.values[slots] = values[-kept:]
+        self.hours[slots]  = hours[-kept:]
+        self.head      = int((self.head + hours.size) % self.capacity)
+        self.size      = min(self.capacity, self.size + int(hours.size))
+        self.last_hour = int(hours[-1])
+        return int(hours.size)
+
+    def to_array(self):
+        """Valeurs dans l'ordre chronologique."""
+        if self.size < self.capacity:
+            return self.values[:self.size]
+        return np.concatenate([self.values[self.head:], self.values[:self.head]])
+
+    def state(self):
+        first = None if self.size == 0 else self.hours[self.head if self.size == self.capacity else 0]
+        return {
+            "length":          self.size,
+            "capacity":        self.capacity,
+            "first_timestamp": hour_to_iso(first),
+            "last_timestamp":  hour_to_iso(self.last_hour),
+        }
+
+
+# ─── Session d'une série ─────────────────────────────────────────────────────
+class SeriesSession:
+    """
+    Série nommée : une couche par source (réel puis RTE), concaténées dans
+    cet ordre pour former le contexte. Le contexte float32 assemblé est gardé
+    jusqu'à la prochaine modification (`version`).
+    """
+
+    def __init__(self, series_id, layers=None):
+        self.series_id = series_id
+        self.layers    = {name: HourlyRing(capacity) for name, capacity in (layers or DEFAULT_LAYERS).items()}
+        self.version   = 0
+        self.last_used = time.monotonic()
+        self._context  = None
+
+    def append(self, points, expected_last=None):
+        """
+        `points` : {couche: [(timestamp, valeur), ...]}. `expected_last`
+        ({couche: timestamp ou None}) : dernier point que le client croit
+        présent ; SeriesConflictError sinon. Tout est vérifié avant d'écrire.
+        """
+        self.check_last(expected_last)
+        parsed = {}
+        for name, layer_points in points.items():
+            if name not in self.layers:
+                raise ValueError(f"Couche inconnue : {name}")
+            if layer_points:
+                timestamps, values = zip(*layer_points)
+                parsed[name] = (to_hours(timestamps), np.asarray(values, dtype=np.float32))
+                self.layers[name].check(parsed[name][0])
+
+        appended = {name: self.layers[name].append(*parsed[name]) if name in parsed else 0 for name in self.layers}
+        if any(appended.values()):
+            self.version  += 1
+            self._context  = None
+        self.last_used = time.monotonic()
+        return appended
+
+    def check_last(self, expected_last):
+        for name, timestamp in (expected_last or {}).items():
+            if name not in self.layers:
+                raise ValueError(f"Couche inconnue : {name}")
+            expected = None if timestamp is None else int(to_hours([timestamp])[0])
+            if self.layers[name].last_hour != expected:
+                raise SeriesConflictError(
+                    f"{name} : dernier point {hour_to_iso(self.layers[name].last_hour)}, "
+                    f"attendu {hour_to_iso(expected)}"
+                )
+
+    def context(self):
+        if self._context is None:
+            self._context = np.ascontiguousarray(
+                np.concatenate([layer.to_array() for layer in self.layers.values()]), dtype=np.float32
+            )
+        self.last_used = time.monotonic()
+        return self._context
+
+    def state(self):
+        return {
+            "series_id": self.series_id,
+            "version":   self.version,
+            "layers":    {name: layer.state() for name, layer in self.layers.items()},
+        }
+
+
+# ─── Sessions en mémoire (LRU + inactivité) ──────────────────────────────────
+class SeriesStore:
+    """
+    Sessions du processus, au plus `max_sessions` (LRU), oubliées après
+    `idle_seconds` sans usage. Chaque processus servi a les siennes : un
+    client qui reçoit 404 (session inconnue) ou 409 (session en retard)
+    renvoie le contexte complet.
+    """
+
+    def __init__(self, max_sessions=256, idle_seconds=24 * 3600):
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_seconds = float(idle_seconds)
+        self._sessions    = OrderedDict()   # series_id → SeriesSession, du moins au plus récent
+        self.evictions    = 0
+
+    def get(self, series_id):
+        self.evict()
+        session = self._sessions.get(series_id)
+        if session is not None:
+            self._sessions.move_to_end(series_id)
+        return session
+
+    def put(self, session):
+        """Enregistre (ou remplace) `session` sous son series_id."""
+        self._sessions[session.series_id] = session
+        self._sessions.move_to_end(session.series_id)
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            self.evictions += 1
+            logger.info(f"Série {evicted} évincée (LRU)")
+        return session
+
+    def delete(self, series_id):
+        return self._sessions.pop(series_id, None) is not None
+
+    def evict(self):
+        if self.idle_seconds <= 0:
+            return
+        deadline = time.monotonic() - self.idle_seconds
+        for series_id in [s for s, session in self._sessions.items() if session.last_used < deadline]:
+            del self._sessions[series_id]
+            self.evictions += 1
+
+    def stats(self):
+        return {"sessions": len(self._sessions), "max_sessions": self.max_sessions, "evictions": self.evictions}
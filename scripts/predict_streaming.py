@@ -0,0 +1,116 @@
+import json
+
+import numpy as np
+import torch
+from chronos import ChronosModel, ChronosPipeline
+from transformers.generation.streamers import BaseStreamer
+
+# ─── Backends décodés pas à pas ──────────────────────────────────────────────
+# Modèles torch uniquement (generate de transformers avec streamer). Le
+# backend onnx passe par optimum : prévision calculée d'un bloc, puis envoyée
+# dans le même format de flux (voir predict_api.stream_response).
+STREAMING_BACKENDS = ("float32", "bfloat16", "int8")
+
+# ─── Formats de flux (négociés par l'en-tête Accept) ─────────────────────────
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+SSE_CONTENT_TYPE    = "text/event-stream"
+
+
+def stream_media_type(accept):
+    """Format de flux demandé par `accept`, ou None pour une réponse unique."""
+    for media_type in (SSE_CONTENT_TYPE, NDJSON_CONTENT_TYPE):
+        if media_type in accept:
+            return media_type
+    return None
+
+
+def encode_event(media_type, event):
+    """Un événement ({"event": ..., ...}) en ligne NDJSON ou en bloc SSE."""
+    data = json.dumps(event, separators=(",", ":"))
+    if media_type == SSE_CONTENT_TYPE:
+        return f"event: {event['event']}\ndata: {data}\n\n".encode()
+    return (data + "\n").encode()
+
+
+def step_summary(values, quantiles):
+    """Médiane et bandes d'un pas de l'horizon, à partir de ses num_samples valeurs."""
+    levels = [0.5] + [q for q in quantiles if q != 0.5]
+    stats  = np.round(np.quantile(values, levels), 2)
+    return float(stats[0]), {f"{q:g}": float(stats[levels.index(q)]) for q in quantiles}
+
+
+# ─── Décodage pas à pas ──────────────────────────────────────────────────────
+class _StepStreamer(BaseStreamer):
+    """
+    Reçoit de `generate` les tokens de chaque pas décodé (un par trajectoire).
+    Le premier appel porte l'amorce (token de départ du décodeur) : ignoré.
+    """
+
+    def __init__(self, on_tokens):
+        self.on_tokens = on_tokens
+        self.started   = False
+
+    def put(self, value):
+        if self.started:
+            self.on_tokens(value)
+        self.started = True
+
+    def end(self):
+        self.started = False   # Horizon > prediction_length du modèle : generate suivant
+
+
+class _StreamingModel(torch.nn.Module):
+    """Même modèle, dont `generate` transmet chaque pas au streamer."""
+
+    def __init__(self, model, streamer):
+        super().__init__()
+        self.model    = model
+        self.streamer = streamer
+
+    @property
+    def device(self):
+        return self.model.device
+
+    def generate(self, **kwargs):
+        return self.model.generate(**kwargs, streamer=self.streamer)
+
+
+class _ScaleRecorder:
+    """Tokenizer Chronos dont on garde l'échelle du dernier contexte encodé."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.scale     = None
+
+    def context_input_transform(self, context):
+        token_ids, attention_mask, self.scale = self.tokenizer.context_input_transform(context)
+        return token_ids, attention_mask, self.scale
+
+    def output_transform(self, samples, scale):
+        return self.tokenizer.output_transform(samples, scale)
+
+
+def stream_samples(pipeline, context, prediction_length, num_samples, seed, on_step):
+    """
+    Même calcul que forecast_samples pour un seul contexte (même graine, mêmes
+    trajectoires), mais `on_step(step, values)` est appelé dès que chaque pas
+    de l'horizon est décodé, avec ses num_samples valeurs (float32).
+    Exécuté dans le pool d'inférence ; renvoie [num_samples, prediction_length].
+    """
+    tokenizer = _ScaleRecorder(pipeline.tokenizer)
+    step      = 0
+
+    def on_tokens(tokens):
+        nonlocal step
+        values = tokenizer.output_transform(tokens.reshape(1, num_samples, 1).to(tokenizer.scale.device), tokenizer.scale)
+        on_step(step, values[0, :, 0].to(torch.float32).numpy())
+        step += 1
+
+    streaming = ChronosPipeline(
+        tokenizer=tokenizer,
+        model=ChronosModel(config=pipeline.model.config, model=_StreamingModel(pipeline.model.model, _StepStreamer(on_tokens))),
+    )
+    if seed is not None:
+        torch.manual_seed(seed)
+    forecast = streaming.predict([context], prediction_length, num_samples=num_samples)
+    return forecast[0].numpy().astype(np.float32, copy=False)
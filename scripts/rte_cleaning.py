@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+# ─── Fuseau de référence des données RTE ─────────────────────────────────────
+PARIS_TZ = "Europe/Paris"
+
+HOURLY_COLUMNS = ["start_date", "date_column", "hour_column", "mean_value_hourly"]
+
+
+# ─── 1. Parsing vectorisé des timestamps RTE ─────────────────────────────────
+def _offset_to_timedelta(offset):
+    sign = -1 if offset.startswith("-") else 1
+    hours, minutes = offset[1:].split(":")
+    return sign * pd.Timedelta(hours=int(hours), minutes=int(minutes))
+
+
+def parse_rte_timestamps(all_start_dates):
+    """
+    Timestamps RTE (« 2024-03-31T03:00:00+02:00 ») → DatetimeIndex UTC.
+
+    Chemin rapide : partie locale parsée avec un format fixe, puis décalage
+    appliqué à partir des quelques offsets distincts (+01:00 / +02:00). Tout
+    autre format passe par le parseur ISO 8601 générique.
+    """
+    stamps = pd.Series(all_start_dates, dtype="object")
+    if not (stamps.str.len() == 25).all():
+        return pd.DatetimeIndex(pd.to_datetime(stamps, utc=True, format="ISO8601"))
+
+    local   = pd.to_datetime(stamps.str[:19], format="%Y-%m-%dT%H:%M:%S")
+    offsets = stamps.str[19:]
+    deltas  = offsets.map({o: _offset_to_timedelta(o) for o in offsets.unique()})
+    return pd.DatetimeIndex(local - deltas).tz_localize("UTC")
+
+
+# ─── 2. Agrégation quart d'heure → heure ─────────────────────────────────────
+def _format_paris(utc_index):
+    """Index UTC → chaînes ISO 8601 en heure de Paris avec offset (+01:00/+02:00)."""
+    local_naive = utc_index.tz_convert(PARIS_TZ).tz_localize(None)
+    text        = np.datetime_as_string(local_naive.values, unit="s")
+    offset_min  = ((local_naive - utc_index.tz_localize(None)) // pd.Timedelta(minutes=1)).to_numpy()
+    labels      = {m: f"{'+' if m >= 0 else '-'}{abs(m) // 60:02d}:{abs(m) % 60:02d}" for m in np.unique(offset_min)}
+    suffix      = pd.Series(offset_min).map(labels).to_numpy(dtype=str)
+    return np.char.add(text.astype(str), suffix), local_naive
+
+
+def aggregate_hourly(all_start_dates, all_values):
+    """
+    Moyenne horaire des valeurs 15 min renvoyées par l'API RTE.
+
+    Les timestamps sont parsés en une seule passe vectorisée (UTC) et
+    l'agrégation se fait par `resample` sur un index tz-aware : les jours de
+    changement d'heure (23 ou 25 heures) donnent bien 23 ou 25 lignes, les
+    deux « 02:00 » d'octobre restant distincts.
+
+    Retourne les colonnes historiques des scripts :
+      - start_date        : début de l'heure, ISO 8601 heure de Paris (+01:00/+02:00)
+      - date_column       : date locale (YYYY-MM-DD)
+      - hour_column       : heure locale (0-23)
+      - mean_value_hourly : moyenne des quarts d'heure présents
+    """
+    if len(all_start_dates) == 0:
+        return pd.DataFrame(columns=HOURLY_COLUMNS)
+
+    index = parse_rte_timestamps(all_start_dates)
+    return aggregate_hourly_utc(index, pd.to_numeric(pd.Series(all_values), errors="coerce").to_numpy())
+
+
+def aggregate_hourly_utc(index, values):
+    """Même agrégation à partir d'un DatetimeIndex UTC déjà construit (archives eCO2mix)."""
+    values = pd.Series(values, index=index, dtype="float64")
+
+    hourly = values.sort_index().resample("h").mean().dropna()
+    if hourly.empty:
+        return pd.DataFrame(columns=HOURLY_COLUMNS)
+
+    start_dates, local_naive = _format_paris(hourly.index)
+
+    return pd.DataFrame({
+        "start_date":        start_dates,
+        "date_column":       start_dates.astype("U10"),
+        "hour_column":       local_naive.hour,
+        "mean_value_hourly": hourly.to_numpy(),
+    })
+
+
+# ─── 3. Détection des heures manquantes ──────────────────────────────────────
+def _to_paris(ts):
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        return ts.tz_localize(PARIS_TZ)
+    return ts.tz_convert(PARIS_TZ)
+
+
+def find_missing_hours(df_hourly, start=None, end=None):
+    """
+    Heures absentes de `df_hourly` sur [start, end[ (heure de Paris).
+
+    Sans bornes, la plage attendue couvre les jours locaux complets présents
+    dans les données. Les bornes naïves sont interprétées en heure de Paris.
+    Retourne un DatetimeIndex tz-aware (Europe/Paris).
+    """
+    present = parse_rte_timestamps(df_hourly["start_date"])
+
+    if start is None:
+        if present.empty:
+            return pd.DatetimeIndex([], tz=PARIS_TZ)
+        start = present.min().tz_convert(PARIS_TZ).normalize()
+    if end is None:
+        if present.empty:
+            return pd.DatetimeIndex([], tz=PARIS_TZ)
+        # Minuit local suivant (jour de 23 ou 25 heures), pas 24 heures plus tard
+        last_day = present.max().tz_convert(PARIS_TZ).tz_localize(None).normalize()
+        end = (last_day + pd.Timedelta(days=1)).tz_localize(PARIS_TZ)
+
+    expected = pd.date_range(_to_paris(start), _to_paris(end), freq="h", inclusive="left")
+    missing  = expected.tz_convert("UTC").difference(present)
+    return missing.tz_convert(PARIS_TZ)
+
+
+def format_missing_hours(missing, limit=10):
+    """Résumé lisible pour les logs : « 2024-03-31 02:00, ... (+N) »."""
+    labels = [ts.strftime("%Y-%m-%d %H:%M%z") for ts in missing[:limit]]
+    if len(missing) > limit:
+        labels.append(f"... (+{len(missing) - limit})")
+    return ", ".join(labels)
@@ -0,0 +1,333 @@
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import psycopg2
+import pytz
+import requests
+from dotenv import load_dotenv
+from psycopg2 import sql
+
+logger = logging.getLogger(__name__)
+
+# ─── Accès RTE et PostgreSQL, communs aux scripts fetch_rte_* ────────────────
+load_dotenv()
+
+RTE_CLIENT_ID     = os.getenv("RTE_CLIENT_ID")
+RTE_CLIENT_SECRET = os.getenv("RTE_CLIENT_SECRET")
+DB_HOST           = os.getenv("DB_HOST")
+DB_PORT           = os.getenv("DB_PORT")
+DB_NAME           = os.getenv("DB_NAME")
+DB_USER           = os.getenv("DB_USER")
+DB_PASSWORD       = os.getenv("DB_PASSWORD")
+
+# RTE_API_URL : surcharge pour les benchmarks (benchmarks/fake_rte.py)
+RTE_API_URL = os.getenv("RTE_API_URL", "https://digital.iservices.rte-france.com").rstrip("/")
+BASE_URL    = f"{RTE_API_URL}/open_api/consumption/v1/short_term"
+
+# ─── Fuseau de référence des données RTE ─────────────────────────────────────
+PARIS_TZ = pytz.timezone("Europe/Paris")
+
+
+# ─── 1. Périodes demandées à l'API RTE ───────────────────────────────────────
+def paris_offset(dt):
+    """Décalage de l'heure de Paris (« +01:00 » / « +02:00 ») pour une date naïve locale."""
+    offset = PARIS_TZ.localize(dt).strftime("%z")
+    return f"{offset[:3]}:{offset[3:]}"
+
+
+def build_period_url(base_url, start_date, end_date, series_type="REALISED"):
+    """
+    URL short_term pour [start_date, end_date[ (dates naïves en heure de Paris).
+    `series_type` : un type ou plusieurs (liste), servis par la même requête.
+    """
+    if not isinstance(series_type, str):
+        series_type = ",".join(series_type)
+    return (
+        f"{base_url}?type={series_type}"
+        f"&start_date={start_date.strftime('%Y-%m-%dT%H:%M:%S')}{paris_offset(start_date)}"
+        f"&end_date={end_date.strftime('%Y-%m-%dT%H:%M:%S')}{paris_offset(end_date)}"
+    )
+
+
+# ─── 2. Ligne de flottaison et trous ─────────────────────────────────────────
+def _type_filter(series_type, alias=None):
+    """Condition sur series_type (tables multi-types comme rte_series), vide sinon."""
+    if series_type is None:
+        return sql.SQL("")
+    column = sql.Identifier(alias, "series_type") if alias else sql.Identifier("series_type")
+    return sql.SQL(" AND {} = {}").format(column, sql.Literal(series_type))
+
+
+def high_water_mark(conn, table, series_type=None):
+    """Dernier timestamp stocké (lecture de l'index unique sur timestamp), None si la table est vide."""
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL('SELECT max("timestamp") FROM {} WHERE true{}').format(
+            sql.Identifier(table), _type_filter(series_type)
+        ))
+        return cur.fetchone()[0]
+
+
+# Heures attendues sans ligne correspondante, regroupées en plages contiguës
+# (îlots : ts - rang × 1 h est constant le long d'une plage). Le NOT EXISTS
+# est résolu par l'index unique sur timestamp, une sonde par heure attendue :
+# le coût suit la période examinée, pas la taille de la table.
+_GAPS_QUERY = """
+    WITH missing AS (
+        SELECT s.ts
+        FROM generate_series(%(start)s::timestamptz, %(end)s::timestamptz - interval '1 hour',
+                             interval '1 hour') AS s(ts)
+        WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t."timestamp" = s.ts{series_filter})
+    )
+    SELECT min(ts), max(ts) + interval '1 hour'
+    FROM (SELECT ts, ts - row_number() OVER (ORDER BY ts) * interval '1 hour' AS island FROM missing) m
+    GROUP BY island
+    ORDER BY 1
+"""
+
+
+def find_missing_ranges(conn, table, start, end, series_type=None):
+    """
+    Plages horaires [début, fin[ absentes de `table` (du type `series_type`
+    s'il est donné) sur [start, end[ (datetimes tz-aware). Au-delà de la
+    ligne de flottaison, toute la fin de période manque : elle est ajoutée
+    sans sonder la table.
+    """
+    hwm = high_water_mark(conn, table, series_type)
+    if hwm is None or hwm < start:
+        return [(start, end)] if start < end else []
+
+    tail_start = hwm + timedelta(hours=1)
+    ranges     = []
+    if start < min(tail_start, end):
+        with conn.cursor() as cur:
+            cur.execute(
+                sql.SQL(_GAPS_QUERY).format(table=sql.Identifier(table), series_filter=_type_filter(series_type, "t")),
+                {"start": start, "end": min(tail_start, end)}
+            )
+            ranges = cur.fetchall()
+    if tail_start < end:
+        ranges.append((max(start, tail_start), end))
+    return ranges
+
+
+def plan_windows(ranges, max_days):
+    """
+    Fenêtres de requêtes couvrant toutes les plages manquantes, en jours
+    locaux complets (minuits naïfs, heure de Paris) de `max_days` jours au
+    plus, sans chevauchement. Les jours des plages qui se recouvrent ou se
+    touchent sont d'abord fusionnés. Des trous proches sont regroupés dans
+    une même fenêtre : les heures déjà présentes ainsi re-téléchargées sont
+    ignorées à l'insertion. Chaque fenêtre part du premier jour non couvert
+    et s'étend au plus loin : le nombre de fenêtres est minimal.
+    """
+    days = []
+    for start, end in ranges:
+        first = start.astimezone(PARIS_TZ).replace(tzinfo=None)
+        last  = (end - timedelta(microseconds=1)).astimezone(PARIS_TZ).replace(tzinfo=None)
+        days.append((datetime.combine(first.date(), datetime.min.time()),
+                     datetime.combine(last.date() + timedelta(days=1), datetime.min.time())))
+
+    merged = []
+    for day_start, day_end in sorted(days):
+        if merged and day_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], day_end))
+        else:
+            merged.append((day_start, day_end))
+
+    span    = timedelta(days=max_days)
+    windows = []
+    for day_start, day_end in merged:
+        # Début de plage à portée de la fenêtre précédente : elle est prolongée
+        if windows and day_start < windows[-1][0] + span:
+            windows[-1] = (windows[-1][0], min(day_end, windows[-1][0] + span))
+            day_start   = windows[-1][1]
+        # Le reste (une plage plus longue que max_days) occupe de nouvelles fenêtres
+        while day_start < day_end:
+            windows.append((day_start, min(day_start + span, day_end)))
+            day_start = windows[-1][1]
+    return windows
+
+
+# ─── 3. Rattrapage ───────────────────────────────────────────────────────────
+def _hours(ranges):
+    return sum(int((r_end - r_start).total_seconds() // 3600) for r_start, r_end in ranges)
+
+
+def catch_up(conn, table, periods, fetch, store, max_days):
+    """
+    Complète `table` (clé series_type, timestamp) pour chaque type de
+    `periods` = {type: (start, end)} (minuits naïfs, heure de Paris).
+
+    Les plages manquantes de tous les types sont couvertes par les mêmes
+    fenêtres : une seule requête par fenêtre, pour les types qui y ont un
+    trou.
+    - `fetch(w_start, w_end, types)` → réponse ou None si RTE refuse la
+      période (elle est alors coupée en deux) ;
+    - `store(réponse, w_start, w_end)` nettoie, insère et retourne le nombre
+      d'heures reçues.
+
+    Retourne {"fetched", "requests", "types": {type: {"missing_hours",
+    "watermark", "complete"}}} relus après le rattrapage, et au premier
+    niveau "missing_hours", "watermark" et "complete" du premier type de
+    `periods` (le type principal du script). `missing_hours` compte les
+    heures encore absentes chez RTE, `complete` indique que la dernière
+    heure attendue est en base.
+    """
+    bounds = {t: (PARIS_TZ.localize(start), PARIS_TZ.localize(end)) for t, (start, end) in periods.items()}
+    ranges = {t: find_missing_ranges(conn, table, *bounds[t], series_type=t) for t in periods}
+    conn.rollback()
+
+    summary = {"fetched": 0, "requests": 0}
+    missing = sorted(r for type_ranges in ranges.values() for r in type_ranges)
+    if missing:
+        windows = plan_windows(missing, max_days)
+        for series_type, type_ranges in ranges.items():
+            if type_ranges:
+                logger.info(
+                    f"{series_type} : {_hours(type_ranges)} heure(s) manquante(s) en {len(type_ranges)} "
+                    f"plage(s) depuis le {periods[series_type][0].date()}"
+                )
+        logger.info(f"{table} : {len(windows)} requête(s) pour {', '.join(t for t in ranges if ranges[t])}")
+
+        pending = list(reversed(windows))
+        while pending:
+            w_start, w_end = pending.pop()
+            lower, upper   = PARIS_TZ.localize(w_start), PARIS_TZ.localize(w_end)
+            types = [t for t, type_ranges in ranges.items() if any(s < upper and e > lower for s, e in type_ranges)]
+            if not types:
+                continue   # moitié d'une fenêtre découpée sans trou
+            summary["requests"] += 1
+            result = fetch(w_start, w_end, types)
+            if result is None:
+                middle = w_start + timedelta(days=max(1, (w_end - w_start).days // 2))
+                logger.warning(f"⚠ Fenêtre {w_start.date()} → {w_end.date()} refusée, découpage en deux")
+                pending.extend([(middle, w_end), (w_start, middle)])
+                continue
+            summary["fetched"] += store(result, w_start, w_end)
+    else:
+        logger.info(f"✓ {table} complète pour {', '.join(periods)}")
+
+    summary["types"] = {}
+    for series_type, (start_utc, end_utc) in bounds.items():
+        watermark = high_water_mark(conn, table, series_type)
+        summary["types"][series_type] = {
+            "missing_hours": _hours(find_missing_ranges(conn, table, start_utc, end_utc, series_type)),
+            "watermark":     watermark,
+            "complete":      watermark is not None and watermark >= end_utc - timedelta(hours=1),
+        }
+    conn.rollback()
+    summary.update(summary["types"][next(iter(periods))])
+    return summary
+
+
+# ─── 4. Client de l'API RTE (token, débit, requêtes) ─────────────────────────
+def _stage(timer, name):
+    """Étape `name` du StageTimer `timer` (etl_metrics), rien si `timer` est None."""
+    return timer.stage(name) if timer is not None else nullcontext()
+
+
+def request_rte_token(session=None, timer=None):
+    """Login OAuth2 client_credentials : (token, durée de validité en secondes)."""
+    logger.info("Authentification auprès de l'API RTE...")
+    with _stage(timer, "auth"):
+        response = (session or requests).post(
+            f"{RTE_API_URL}/token/oauth/",
+            data={"grant_type": "client_credentials"},
+            auth=(RTE_CLIENT_ID, RTE_CLIENT_SECRET)
+        )
+    response.raise_for_status()
+    payload = response.json()
+    logger.info("Token RTE obtenu avec succès.")
+    return payload.get("access_token"), int(payload.get("expires_in", 7200))
+
+
+class TokenCache:
+    """
+    Token OAuth partagé entre threads : renouvelé uniquement lorsqu'il est
+    sur le point d'expirer (marge de 60 s), au lieu d'un login par requête.
+    `session` (requests.Session) réutilise les connexions HTTP ouvertes.
+    """
+
+    def __init__(self, margin_seconds=60, session=None):
+        self.margin     = margin_seconds
+        self.session    = session
+        self._lock      = threading.Lock()
+        self._token     = None
+        self._expire_at = 0.0
+
+    def get(self, force_refresh=False, timer=None):
+        with self._lock:
+            if force_refresh or self._token is None or time.monotonic() >= self._expire_at - self.margin:
+                self._token, expires_in = request_rte_token(self.session, timer)
+                self._expire_at = time.monotonic() + expires_in
+            return self._token
+
+
+class RateLimiter:
+    """Limite globale du nombre de requêtes par seconde, partagée entre threads."""
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock    = threading.Lock()
+        self._next_at = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now     = time.monotonic()
+            wait_s  = max(0.0, self._next_at - now)
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait_s > 0:
+            time.sleep(wait_s)
+
+
+def request_window(token_cache, limiter, start_date, end_date, types, session=None, timer=None):
+    """
+    Récupère une fenêtre pour tous les `types` en une requête. Retourne les
+    blocs `short_term` (un par type), ou None si RTE refuse la période (400)
+    et qu'il faut la couper en deux. 401, 429 et 5xx sont retentés (token
+    renouvelé, Retry-After respecté), trois essais au plus.
+    """
+    url = build_period_url(BASE_URL, start_date, end_date, types)
+
+    for attempt in range(1, 4):
+        limiter.acquire()
+        headers = {
+            "Host": urlparse(RTE_API_URL).netloc,
+            "Authorization": f"Bearer {token_cache.get(force_refresh=attempt > 1, timer=timer)}"
+        }
+        with _stage(timer, "fetch"):
+            response = (session or requests).get(url, headers=headers, timeout=120)
+
+        if response.status_code == 200:
+            return response.json().get("short_term") or []
+
+        if response.status_code == 400 and (end_date - start_date).days > 1:
+            return None
+
+        if response.status_code in (401, 429) or response.status_code >= 500:
+            logger.warning(f"⚠ {start_date.date()} → {end_date.date()} : statut {response.status_code}, nouvel essai...")
+            time.sleep(int(response.headers.get("Retry-After", 2 ** attempt)))
+            continue
+
+        break
+
+    raise RuntimeError(
+        f"Échec requête RTE {start_date.date()} → {end_date.date()} : "
+        f"{response.status_code} - {response.text[:200]}"
+    )
+
+
+# ─── 5. Connexion PostgreSQL ─────────────────────────────────────────────────
+def connect_db():
+    return psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD
+    )
@@ -0,0 +1,108 @@
+import logging
+
+import pandas as pd
+
+from db_bulk import bulk_upsert
+from db_partitions import ensure_monthly_partitions
+from rte_cleaning import PARIS_TZ, parse_rte_timestamps
+
+logger = logging.getLogger(__name__)
+
+RAW_TABLE   = "rte_quarter_hours"
+RESOLUTIONS = ("hour", "day", "week")
+
+
+# ─── 1. Séries brutes au quart d'heure ───────────────────────────────────────
+def store_quarter_hours(conn, series_type, all_start_dates, all_values):
+    """
+    Enregistre les valeurs 15 min brutes de RTE dans rte_quarter_hours puis
+    recalcule les agrégats des heures, jours et semaines touchés.
+
+    Une valeur révisée par RTE remplace l'ancienne. Ne fait pas de COMMIT.
+    Retourne les compteurs de bulk_upsert.
+    """
+    if len(all_start_dates) == 0:
+        return {"inserted": 0, "updated": 0, "skipped": 0}
+
+    index  = parse_rte_timestamps(all_start_dates)
+    values = pd.to_numeric(pd.Series(all_values), errors="coerce")
+    keep   = values.notna().to_numpy()
+    index, values = index[keep], values[keep].round().astype(int)
+
+    start, end = index.min(), index.max()
+    ensure_monthly_partitions(conn, RAW_TABLE, start, end)
+
+    counts = bulk_upsert(
+        conn,
+        RAW_TABLE,
+        ["series_type", "timestamp", "value"],
+        zip([series_type] * len(index), index.to_pydatetime(), values.tolist()),
+        conflict_columns=["series_type", "timestamp"],
+        update_columns=["value"]
+    )
+    if counts["inserted"] or counts["updated"]:
+        refresh_rollups(conn, series_type, start, end + pd.Timedelta(minutes=15))
+    return counts
+
+
+# ─── 2. Agrégats heure / jour / semaine ──────────────────────────────────────
+def bucket_bounds(resolution, start, end):
+    """
+    [début du premier paquet, fin du dernier paquet[ recoupant [start, end[.
+    Jours et semaines (lundi) en heure de Paris : les bornes sont calculées
+    en heure locale, un jour de changement d'heure dure donc 23 ou 25 heures.
+    """
+    start, last = pd.Timestamp(start), pd.Timestamp(end) - pd.Timedelta(microseconds=1)
+    if resolution == "hour":
+        return start.floor("h"), last.floor("h") + pd.Timedelta(hours=1)
+
+    first = start.tz_convert(PARIS_TZ).tz_localize(None).normalize()
+    last  = last.tz_convert(PARIS_TZ).tz_localize(None).normalize()
+    if resolution == "week":
+        first -= pd.Timedelta(days=first.dayofweek)
+        last  -= pd.Timedelta(days=last.dayofweek)
+    step = pd.Timedelta(days=7 if resolution == "week" else 1)
+    return first.tz_localize(PARIS_TZ), (last + step).tz_localize(PARIS_TZ)
+
+
+# Paquets entiers recalculés à partir des points bruts ; une ligne inchangée
+# n'est pas réécrite.
+_ROLLUP_QUERY = """
+    INSERT INTO rte_rollups (resolution, series_type, bucket, mean_value, min_value, max_value, points)
+    SELECT %(resolution)s, series_type, date_trunc(%(resolution)s, "timestamp", %(tz)s) AS bucket,
+           avg(value), min(value), max(value), count(*)
+    FROM rte_quarter_hours
+    WHERE series_type = %(series_type)s
+      AND "timestamp" >= %(lower)s
+      AND "timestamp" <  %(upper)s
+    GROUP BY series_type, bucket
+    ON CONFLICT (resolution, series_type, bucket) DO UPDATE SET
+        mean_value = EXCLUDED.mean_value,
+        min_value  = EXCLUDED.min_value,
+        max_value  = EXCLUDED.max_value,
+        points     = EXCLUDED.points,
+        updated_at = now()
+    WHERE (rte_rollups.mean_value, rte_rollups.min_value, rte_rollups.max_value, rte_rollups.points)
+          IS DISTINCT FROM (EXCLUDED.mean_value, EXCLUDED.min_value, EXCLUDED.max_value, EXCLUDED.points)
+"""
+
+
+def refresh_rollups(conn, series_type, start, end, resolutions=RESOLUTIONS):
+    """Recalcule les agrégats de `series_type` dont le paquet recoupe [start, end[."""
+    updated = {}
+    with conn.cursor() as cur:
+        for resolution in resolutions:
+            lower, upper = bucket_bounds(resolution, start, end)
+            cur.execute(_ROLLUP_QUERY, {
+                "resolution":  resolution,
+                "series_type": series_type,
+                "tz":          PARIS_TZ,
+                "lower":       lower.to_pydatetime(),
+                "upper":       upper.to_pydatetime(),
+            })
+            updated[resolution] = cur.rowcount
+    logger.info(
+        f"Agrégats {series_type} mis à jour : "
+        + ", ".join(f"{n} {resolution}(s)" for resolution, n in updated.items())
+    )
+    return updated
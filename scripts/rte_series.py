@@ -0,0 +1,130 @@
+import logging
+import os
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from dashboard_series import DASHBOARD_TYPES, refresh_dashboard
+from db_bulk import bulk_upsert
+from db_partitions import ensure_partitions_for
+from rte_cleaning import (
+    HOURLY_COLUMNS, aggregate_hourly_utc, find_missing_hours, format_missing_hours, parse_rte_timestamps
+)
+from rte_raw import store_quarter_hours
+
+logger = logging.getLogger(__name__)
+
+# Table horaire de tous les types (migration 003) ; historical_data et
+# rte_forecasts en sont des vues (REALISED et D-1)
+SERIES_TABLE = "rte_series"
+SERIES_TYPES = ("REALISED", "ID", "D-1", "D-2")
+
+# Fin des données attendues, en jours après aujourd'hui (minuit, heure de
+# Paris) : réalisé jusqu'à J-1, intraday jusqu'à J, D-1 jusqu'à J+1, D-2 jusqu'à J+2
+DAYS_AHEAD = {"REALISED": 0, "ID": 1, "D-1": 2, "D-2": 3}
+
+# ─── Valeurs 15 min brutes + agrégats (rte_quarter_hours / rte_rollups) ──────
+load_dotenv()
+STORE_QUARTER_HOURS = os.getenv("RTE_STORE_QUARTER_HOURS", "1") == "1"
+
+
+def parse_types(text):
+    """« D-1,D-2 » → ("D-1", "D-2") ; type inconnu : ValueError."""
+    types = tuple(t.strip() for t in text.split(",") if t.strip())
+    unknown = [t for t in types if t not in SERIES_TYPES]
+    if unknown or not types:
+        raise ValueError(f"Type(s) de série inconnu(s) : {text} (attendus : {', '.join(SERIES_TYPES)})")
+    return types
+
+
+# ─── 1. Réponse short_term multi-type → quarts d'heure ───────────────────────
+def parse_short_term(entries):
+    """
+    Blocs `short_term` d'une réponse (un par type demandé) → DataFrame
+    (series_type, start_date, timestamp UTC, value), tous types à la suite :
+    les timestamps sont parsés en une seule passe vectorisée.
+    """
+    types, start_dates, values = [], [], []
+    for entry in entries or []:
+        points = entry.get("values") or []
+        types.extend([entry["type"]] * len(points))
+        start_dates.extend(point["start_date"] for point in points)
+        values.extend(point["value"] for point in points)
+
+    quarters = pd.DataFrame({
+        "series_type": pd.Series(types, dtype="object"),
+        "start_date":  pd.Series(start_dates, dtype="object"),
+        "value":       pd.to_numeric(pd.Series(values, dtype="object"), errors="coerce"),
+    })
+    quarters["timestamp"] = parse_rte_timestamps(start_dates) if len(quarters) else pd.DatetimeIndex([], tz="UTC")
+    return quarters
+
+
+def hourly_series(quarters):
+    """
+    Moyennes horaires par type (rte_cleaning.aggregate_hourly_utc, correcte
+    les jours de 23 et 25 heures) : colonnes series_type + HOURLY_COLUMNS.
+    """
+    frames = [
+        aggregate_hourly_utc(pd.DatetimeIndex(df["timestamp"]), df["value"].to_numpy()).assign(series_type=series_type)
+        for series_type, df in quarters.groupby("series_type", sort=False)
+    ]
+    if not frames:
+        return pd.DataFrame(columns=["series_type", *HOURLY_COLUMNS])
+    return pd.concat(frames, ignore_index=True)[["series_type", *HOURLY_COLUMNS]]
+
+
+# ─── 2. Écriture ─────────────────────────────────────────────────────────────
+def upsert_hours(conn, series_type, timestamps, values, source="RTE", update=False):
+    """
+    COPY + upsert d'heures d'un type dans rte_series. Une heure déjà en base
+    est conservée, sauf `update`. REALISED et D-1 : les heures modifiées sont
+    reportées dans dashboard_series. Ne fait pas de COMMIT.
+    """
+    ensure_partitions_for(conn, SERIES_TABLE, timestamps)
+    counts = bulk_upsert(
+        conn,
+        SERIES_TABLE,
+        ["series_type", "timestamp", "value", "source"],
+        zip([series_type] * len(timestamps), timestamps, values, [source] * len(timestamps)),
+        conflict_columns=["series_type", "timestamp"],
+        update_columns=["value", "source"] if update else None
+    )
+    if series_type in DASHBOARD_TYPES and (counts["inserted"] or counts["updated"]):
+        refresh_dashboard(conn, timestamps)
+    return counts
+
+
+def store_short_term(conn, entries, metrics, store_raw=STORE_QUARTER_HOURS, source="RTE"):
+    """
+    Réponse short_term multi-type → rte_series (moyennes horaires) et, si
+    `store_raw` (défaut : RTE_STORE_QUARTER_HOURS), rte_quarter_hours +
+    agrégats (voir rte_raw.py), un COMMIT par étape. Retourne le nombre
+    d'heures reçues par type.
+    """
+    with metrics.stage("clean", rows=sum(len(e.get("values") or []) for e in entries or [])):
+        quarters = parse_short_term(entries)
+        hourly   = hourly_series(quarters)
+        # Contrôle sur les jours locaux complets couverts par la réponse (23/25 heures aux changements d'heure)
+        by_type  = {series_type: (df, find_missing_hours(df)) for series_type, df in hourly.groupby("series_type", sort=False)}
+
+    hours = {}
+    for series_type, (df, missing) in by_type.items():
+        if len(missing) > 0:
+            logger.warning(f"⚠ {series_type} : {len(missing)} heure(s) manquante(s) : {format_missing_hours(missing)}")
+        with metrics.stage("db_write", rows=len(df)):
+            counts = upsert_hours(conn, series_type, df["start_date"].tolist(), df["mean_value_hourly"].tolist(), source)
+            conn.commit()
+        hours[series_type] = len(df)
+        logger.info(
+            f"✓ {series_type} : {len(df)} heure(s), {counts['inserted']} nouvelle(s), "
+            f"{counts['skipped']} déjà en base"
+        )
+
+    if store_raw:
+        for series_type, df in quarters.groupby("series_type", sort=False):
+            with metrics.stage("db_write_raw", rows=len(df)):
+                store_quarter_hours(conn, series_type, df["start_date"].tolist(), df["value"].tolist())
+                conn.commit()
+    return hours
+
@@ -0,0 +1,155 @@
+"""
+Serveur pre-fork de predict_api : poids chargés une fois, workers forkés.
+
+Le processus parent charge le modèle par défaut, place ses poids en mémoire
+partagée (share_memory), ouvre la socket d'écoute puis forke --workers
+processus uvicorn qui servent tous cette socket. Les poids ne sont donc
+présents qu'une fois en RAM quel que soit le nombre de workers ; chaque
+worker garde son pool d'inférence, sa file, son cache et fait son propre
+warm-up. Les autres modèles du registre restent chargés à la demande, par
+worker.
+
+Budget de threads : chaque worker reçoit --threads threads intra-op et
+--interop-threads threads inter-op (workers × threads ≈ nombre de cœurs).
+Le parent n'exécute aucun calcul avec plusieurs threads avant le fork : les
+pools OpenMP ne survivent pas à un fork.
+
+Un worker qui meurt est relancé à partir des poids déjà chargés.
+Sur un seul cœur, plusieurs workers ne donnent pas plus de débit qu'un seul
+(mesures dans benchmarks/bench_prefork.py) : --workers 1 suffit.
+Limites : CPU uniquement ; le backend onnx est chargé par chaque worker
+(les sessions ONNX Runtime ne se partagent pas à travers un fork).
+
+Usage (depuis la racine du dépôt) :
+    python scripts/serve_prefork.py --workers 4 --threads 2 --port 8000
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger("serve_prefork")
+
+
+def parse_args():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PREDICT_PROCESSES", "2")))
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads intra-op par worker (défaut : cœurs / workers)")
+    parser.add_argument("--interop-threads", type=int, default=1,
+                        help="Threads inter-op par worker")
+    args = parser.parse_args()
+    if args.threads is None:
+        args.threads = max(1, cores // args.workers)
+    return args
+
+
+# ─── 1. Socket partagée ──────────────────────────────────────────────────────
+def open_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+# ─── 2. Worker forké ─────────────────────────────────────────────────────────
+def run_worker(api, sock):
+    import uvicorn
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(api.app, log_level="info", access_log=False))
+    server.run(sockets=[sock])
+
+
+def spawn(api, sock, index):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(api, sock)
+        finally:
+            os._exit(0)
+    logger.info(f"Worker {index} démarré (pid {pid})")
+    return pid
+
+
+# ─── 3. Processus parent ─────────────────────────────────────────────────────
+def main():
+    args = parse_args()
+
+    # Budget de threads des workers, lu par predict_api à l'import
+    os.environ["PREDICT_PROCESSES"]       = str(args.workers)
+    os.environ["PREDICT_TORCH_THREADS"]   = str(args.threads)
+    os.environ["PREDICT_INTEROP_THREADS"] = str(args.interop_threads)
+
+    import torch
+    from scripts import predict_api as api
+    from scripts.predict_loading import load_pipeline
+
+    logger.info(
+        f"Pre-fork : {args.workers} worker(s) × {args.threads} thread(s) intra-op "
+        f"+ {args.interop_threads} inter-op ({os.cpu_count()} cœurs)"
+    )
+
+    spec = api.registry[api.DEFAULT_MODEL_ID]
+    if spec["backend"] == "onnx":
+        logger.warning("⚠ Backend onnx : chaque worker charge sa propre session ONNX Runtime")
+    else:
+        # Un seul thread dans le parent : aucun pool OpenMP créé avant le fork
+        torch.set_num_threads(1)
+        pipeline = load_pipeline(spec["path"], "cpu", spec["backend"], api.startup_timings)
+        pipeline.model.share_memory()
+        api.PRELOADED_PIPELINES[api.DEFAULT_MODEL_ID] = pipeline
+        logger.info(f"✓ Poids de {api.DEFAULT_MODEL_ID} chargés une fois ({api.startup_timings.summary()})")
+
+    sock     = open_socket(args.host, args.port)
+    children = {spawn(api, sock, i): i for i in range(args.workers)}
+    logger.info(f"Écoute sur {args.host}:{args.port}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Supervision : relancer les workers morts tant qu'on ne s'arrête pas
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        logger.warning(f"⚠ Worker {index} (pid {pid}) arrêté (code {os.waitstatus_to_exitcode(status)}), relance")
+        time.sleep(1)
+        children[spawn(api, sock, index)] = index
+
+    logger.info("Serveur pre-fork arrêté.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Les scripts s'importent entre eux à plat (python scripts/xxx.py) : même chemin ici
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+# predict_api importe ses voisins en paquet (uvicorn scripts.predict_api:app)
+sys.path.insert(0, ROOT)
+
+# Les scripts journalisent dans ./logs (chemin relatif au répertoire courant)
+os.chdir(ROOT)
+os.makedirs("logs", exist_ok=True)
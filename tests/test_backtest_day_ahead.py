@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_day_ahead import HORIZON, PARIS_TZ, REAL_HOURS, RTE_HOURS, build_origins
+
+
+def hourly_grid(start_day, end_day):
+    """Même grille que load_hourly_series ; valeur = position dans la grille."""
+    first = pd.Timestamp(start_day).tz_localize(PARIS_TZ) - pd.Timedelta(hours=REAL_HOURS + RTE_HOURS)
+    last  = pd.Timestamp(end_day).tz_localize(PARIS_TZ) + pd.Timedelta(days=3)
+    grid  = pd.date_range(first.tz_convert("UTC"), last.tz_convert("UTC"), freq="h", inclusive="left")
+    return grid, np.arange(len(grid), dtype=float)
+
+
+@pytest.mark.parametrize("origin", ["2024-03-30", "2024-03-31", "2024-10-26", "2024-10-27", "2024-06-15"])
+def test_target_starts_at_next_local_midnight(origin):
+    grid, values = hourly_grid(origin, origin)
+    days, contexts, actuals, rte_pred, targets = build_origins(grid, values, values, origin, origin)
+
+    next_midnight = (pd.Timestamp(origin) + pd.Timedelta(days=1)).tz_localize(PARIS_TZ)
+    assert targets[0] == next_midnight
+    assert len(targets) == HORIZON
+    # Contexte contigu à la cible : 504 h réelles puis 24 h RTE
+    end = grid.get_loc(next_midnight)
+    np.testing.assert_array_equal(contexts[0], np.arange(end - REAL_HOURS - RTE_HOURS, end))
+    np.testing.assert_array_equal(actuals[0], np.arange(end, end + HORIZON))
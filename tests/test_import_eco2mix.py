@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+import pytest
+
+import import_eco2mix
+from rte_cleaning import aggregate_hourly_utc
+
+SAMPLES = os.path.join("backend", "samples", "eco2mix")
+OCTOBER = os.path.join(SAMPLES, "eCO2mix_RTE_Annuel-Definitif_sample.zip")
+MARCH   = os.path.join(SAMPLES, "eco2mix-national-cons-def_sample.csv")
+
+
+def imported_hours(monkeypatch, path, chunk_rows):
+    """Heures que import_file écrirait en base, morceau par morceau."""
+    written = []
+    monkeypatch.setattr(import_eco2mix, "insert_hours", lambda conn, df, update=False: (
+        written.append(df) or {"inserted": len(df), "updated": 0, "skipped": 0}
+    ))
+    totals = import_eco2mix.import_file(path, conn=object(), chunk_rows=chunk_rows)
+    df = pd.concat(written, ignore_index=True)
+    assert totals["inserted"] == len(df)
+    return df
+
+
+def reference_hours(path):
+    """Agrégation du fichier entier en une fois, sans report entre morceaux."""
+    for _, open_source in import_eco2mix.iter_sources(path):
+        quarters = list(import_eco2mix.quarter_hours(import_eco2mix.read_chunks(open_source, 10**6)))
+    index  = quarters[0][0].append([q[0] for q in quarters[1:]])
+    values = pd.concat([pd.Series(q[1]) for q in quarters]).to_numpy()
+    return aggregate_hourly_utc(index, values)
+
+
+@pytest.mark.parametrize("path, hours", [(OCTOBER, 73), (MARCH, 71)])
+def test_hour_counts(monkeypatch, path, hours):
+    assert len(imported_hours(monkeypatch, path, chunk_rows=37)) == hours
+
+
+def test_october_repeated_hour_is_kept_twice(monkeypatch):
+    starts = imported_hours(monkeypatch, OCTOBER, chunk_rows=37)["start_date"].tolist()
+    assert starts.count("2023-10-29T02:00:00+02:00") == 1
+    assert starts.count("2023-10-29T02:00:00+01:00") == 1
+    assert starts.index("2023-10-29T02:00:00+01:00") == starts.index("2023-10-29T02:00:00+02:00") + 1
+
+
+def test_march_missing_hour_is_skipped(monkeypatch):
+    starts = imported_hours(monkeypatch, MARCH, chunk_rows=37)["start_date"].tolist()
+    assert not any(start.startswith("2023-03-26T02:") for start in starts)
+    assert starts.index("2023-03-26T03:00:00+02:00") == starts.index("2023-03-26T01:00:00+01:00") + 1
+
+
+@pytest.mark.parametrize("path", [OCTOBER, MARCH])
+def test_matches_aggregate_hourly_utc(monkeypatch, path):
+    pd.testing.assert_frame_equal(imported_hours(monkeypatch, path, chunk_rows=37), reference_hours(path))
+
+
+@pytest.mark.parametrize("path", [OCTOBER, MARCH])
+def test_chunked_equals_unchunked(monkeypatch, path):
+    pd.testing.assert_frame_equal(
+        imported_hours(monkeypatch, path, chunk_rows=37),
+        imported_hours(monkeypatch, path, chunk_rows=10**6)
+    )
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("chronos")
+
+from fastapi.exceptions import RequestValidationError
+
+from scripts.chronos_wire import encode_request
+from scripts.predict_api import MAX_NUM_SAMPLES, MAX_PREDICTION_LENGTH, parse_predict_body
+
+
+def json_body(**params):
+    return json.dumps({"context": [1.0, 2.0, 3.0], **params}).encode()
+
+
+@pytest.mark.parametrize("params", [
+    {"prediction_length": 0},
+    {"prediction_length": -24},
+    {"prediction_length": MAX_PREDICTION_LENGTH + 1},
+    {"num_samples": 0},
+    {"num_samples": MAX_NUM_SAMPLES + 1},
+    {"quantiles": [0.0, 0.5]},
+    {"quantiles": [0.9, 1.0]},
+])
+def test_out_of_range_params_are_rejected(params):
+    # RequestValidationError : 422 avant toute mise en file du MicroBatcher
+    with pytest.raises(RequestValidationError):
+        parse_predict_body(json_body(**params), binary=False)
+
+
+def test_binary_body_is_bounded_too():
+    body = encode_request([1.0, 2.0, 3.0], prediction_length=24, num_samples=0)
+    with pytest.raises(RequestValidationError):
+        parse_predict_body(body, binary=True)
+
+
+def test_quantiles_are_sorted_and_deduplicated():
+    request, context = parse_predict_body(
+        json_body(prediction_length=MAX_PREDICTION_LENGTH, num_samples=1, quantiles=[0.9, 0.1, 0.9]),
+        binary=False
+    )
+    assert request.quantiles == [0.1, 0.9]
+    assert context.tolist() == [1.0, 2.0, 3.0]
+
+
+def series_points(start, values):
+    return [{"timestamp": f"{start[:11]}{h:02d}:00:00+00:00", "value": v} for h, v in enumerate(values)]
+
+
+def test_series_length_is_bounded():
+    from fastapi.testclient import TestClient
+    from scripts.predict_api import MAX_SERIES_LENGTH, app
+
+    client = TestClient(app)
+    for field in ("real_length", "rte_length"):
+        response = client.put("/series/borne", json={field: MAX_SERIES_LENGTH + 1})
+        assert response.status_code == 422
+    assert client.get("/series/borne").status_code == 404
+
+
+def test_invalid_replacement_keeps_the_existing_series():
+    from fastapi.testclient import TestClient
+    from scripts.predict_api import app
+
+    client = TestClient(app)
+    created = client.put("/series/intacte", json={"real": series_points("2026-10-01T", [1.0, 2.0, 3.0])})
+    assert created.status_code == 200
+
+    # Timestamp hors heure pleine : 400, la session existante n'est pas remplacée
+    bad = client.put("/series/intacte", json={
+        "real_length": 10, "real": [{"timestamp": "2026-10-02T00:30:00+00:00", "value": 9.0}]
+    })
+    assert bad.status_code == 400
+    state = client.get("/series/intacte").json()
+    assert state["layers"] == created.json()["layers"]
+    assert state["layers"]["real"]["capacity"] == 504
+    client.delete("/series/intacte")
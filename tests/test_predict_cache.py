@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from predict_cache import ForecastCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_cancelled_caller_does_not_cancel_coalesced_callers():
+    async def scenario():
+        cache   = ForecastCache()
+        release = asyncio.Event()
+        calls   = []
+
+        async def compute():
+            calls.append(1)
+            await release.wait()
+            return "prévision"
+
+        first  = asyncio.create_task(cache.get_or_compute("k", compute))
+        second = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == "prévision"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert calls == [1]
+        assert cache.coalesced == 1
+        assert await cache.get_or_compute("k", compute) == "prévision"
+        assert cache.hits == 1
+
+    run(scenario())
+
+
+def test_computation_is_cancelled_when_no_caller_is_left():
+    async def scenario():
+        cache     = ForecastCache()
+        started   = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def compute():
+            started.set()
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(2)]
+        await started.wait()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert not cache._inflight
+
+        # Un nouvel appelant relance le calcul au lieu de rejoindre l'ancien
+        async def fresh():
+            return "nouvelle"
+
+        assert await cache.get_or_compute("k", fresh) == "nouvelle"
+
+    run(scenario())
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        cache   = ForecastCache()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            raise RuntimeError("modèle indisponible")
+
+        callers = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not cache._inflight and cache.misses == 1
+
+    run(scenario())
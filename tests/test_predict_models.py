@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from predict_models import ModelCache
+
+REGISTRY = {"m": {"path": "models/m", "backend": "float32"}}
+
+
+def test_cancelled_caller_does_not_fail_other_waiters():
+    async def scenario():
+        release = asyncio.Event()
+        loads   = []
+
+        async def load_fn(model_id, spec):
+            loads.append(model_id)
+            await release.wait()
+            return "pipeline", 1024
+
+        cache  = ModelCache(REGISTRY, load_fn, memory_budget=2**30)
+        first  = asyncio.create_task(cache._acquire("m"))
+        second = asyncio.create_task(cache._acquire("m"))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        entry = await second
+        assert entry["pipeline"] == "pipeline"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert loads == ["m"] and cache.loads == 1 and "m" in cache
+        async with cache.lease("m") as pipeline:
+            assert pipeline == "pipeline"
+        assert loads == ["m"]
+
+    asyncio.run(scenario())
+
+
+def test_load_is_cancelled_when_no_caller_is_left():
+    async def scenario():
+        cancelled = asyncio.Event()
+        attempts  = []
+
+        async def load_fn(model_id, spec):
+            attempts.append(model_id)
+            if len(attempts) == 1:
+                try:
+                    await asyncio.sleep(3600)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return "pipeline", 1024
+
+        cache   = ModelCache(REGISTRY, load_fn, memory_budget=2**30)
+        callers = [asyncio.create_task(cache._acquire("m")) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert cache.stats()["models"]["m"]["loading"] is False
+
+        # Un nouvel appelant relance le chargement
+        assert (await cache._acquire("m"))["pipeline"] == "pipeline"
+        assert len(attempts) == 2
+
+    asyncio.run(scenario())
+
+
+def test_load_error_reaches_every_waiter():
+    async def scenario():
+        async def load_fn(model_id, spec):
+            await asyncio.sleep(0)
+            raise OSError("checkpoint introuvable")
+
+        cache   = ModelCache(REGISTRY, load_fn, memory_budget=2**30)
+        results = await asyncio.gather(*[cache._acquire("m") for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, OSError) for r in results)
+        assert "m" not in cache and not cache._loading
+
+    asyncio.run(scenario())
@@ -0,0 +1,14 @@
+from predict_profile import load_profile, save_profile
+
+
+def test_profile_keeps_serving_settings_only(tmp_path):
+    path = tmp_path / "predict_profile.json"
+    save_profile(str(path), {
+        "num_samples": 20, "context_length": 336, "backend": "bfloat16", "threads": 2,
+        "mae": 812.5, "created_at": "2026-01-01T00:00:00",
+    })
+    assert load_profile(str(path)) == {"num_samples": 20, "context_length": 336, "backend": "bfloat16", "threads": 2}
+
+
+def test_missing_profile_is_empty(tmp_path):
+    assert load_profile(str(tmp_path / "absent.json")) == {}
@@ -0,0 +1,72 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("chronos")
+
+from benchmarks.tiny_chronos import make_tiny_checkpoint
+from scripts import predict_api
+from scripts.predict_loading import StartupTimings, load_pipeline
+from scripts.predict_streaming import NDJSON_CONTENT_TYPE, stream_samples
+
+CONTEXT = (np.sin(np.arange(96) / 4) * 1000 + 50000).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    return make_tiny_checkpoint(str(tmp_path_factory.mktemp("tiny-chronos")))
+
+
+def test_streamed_steps_match_the_batched_forecast(tiny_model):
+    pipeline = load_pipeline(tiny_model, "cpu", "float32", StartupTimings())
+    steps    = []
+
+    samples = stream_samples(pipeline, torch.from_numpy(CONTEXT), 12, 5, 7, lambda step, values: steps.append((step, values)))
+    batched = predict_api.forecast_samples(pipeline, [torch.from_numpy(CONTEXT)], 12, 5, 7)[0]
+
+    assert [step for step, _ in steps] == list(range(12))
+    np.testing.assert_allclose(samples, batched, rtol=1e-5)
+    np.testing.assert_allclose(np.stack([values for _, values in steps], axis=1), samples, rtol=1e-5)
+
+
+def read_events(response):
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def stream(client, seed):
+    body = {"context": CONTEXT.tolist(), "prediction_length": 6, "num_samples": 4, "seed": seed}
+    with client.stream("POST", "/predict", json=body, headers={"Accept": NDJSON_CONTENT_TYPE}) as response:
+        assert response.status_code == 200
+        return read_events(response)
+
+
+def test_predict_streams_every_step_and_falls_back_for_onnx(tiny_model, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setitem(predict_api.registry, predict_api.DEFAULT_MODEL_ID, {"path": tiny_model, "backend": "float32"})
+    monkeypatch.setattr(predict_api, "WARMUP_RUNS", 0)
+    monkeypatch.setattr(predict_api, "CACHE_DIR", "")
+
+    with TestClient(predict_api.app) as client:
+        deadline = time.monotonic() + 60
+        while client.get("/health").json().get("status") != "ready":
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+
+        events = stream(client, seed=1)
+        assert [e["event"] for e in events] == ["step"] * 6 + ["done"]
+        assert [e["step"] for e in events[:-1]] == list(range(1, 7))
+        assert events[-1]["cached"] is False
+
+        # Backend sans décodage pas à pas : calcul par le MicroBatcher, même flux
+        def no_streaming(*args):
+            raise AssertionError("stream_samples appelé pour un backend onnx")
+
+        monkeypatch.setitem(predict_api.registry[predict_api.DEFAULT_MODEL_ID], "backend", "onnx")
+        monkeypatch.setattr(predict_api, "stream_samples", no_streaming)
+        events = stream(client, seed=2)
+        assert [e["event"] for e in events] == ["step"] * 6 + ["done"]
+        assert events[-1]["cached"] is False
@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from rte_cleaning import PARIS_TZ, find_missing_hours
+
+
+def hourly_frame(day):
+    """Toutes les heures du jour local `day` (23, 24 ou 25), au format RTE."""
+    start = pd.Timestamp(day).tz_localize(PARIS_TZ)
+    end   = (pd.Timestamp(day) + pd.Timedelta(days=1)).tz_localize(PARIS_TZ)
+    hours = pd.date_range(start, end, freq="h", inclusive="left")
+    return pd.DataFrame({"start_date": [ts.isoformat() for ts in hours]})
+
+
+@pytest.mark.parametrize("day, hours", [("2024-03-31", 23), ("2024-10-27", 25), ("2024-06-15", 24)])
+def test_complete_day_has_no_missing_hour(day, hours):
+    df = hourly_frame(day)
+    assert len(df) == hours
+    assert find_missing_hours(df).empty
+
+
+def test_last_hour_of_long_day_is_checked():
+    df = hourly_frame("2024-10-27").iloc[:-1]   # 23:00+01:00 absente
+    missing = find_missing_hours(df)
+    assert [ts.isoformat() for ts in missing] == ["2024-10-27T23:00:00+01:00"]
+
+
+def test_short_day_does_not_spill_into_next_day():
+    df = hourly_frame("2024-03-31").drop(index=5)
+    missing = find_missing_hours(df)
+    assert len(missing) == 1
+    assert missing[0].date() == pd.Timestamp("2024-03-31").date()
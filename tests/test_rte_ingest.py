@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import rte_ingest
+from rte_ingest import PARIS_TZ, RateLimiter, TokenCache, plan_windows, request_window
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload     = payload or {}
+        self.headers     = headers or {}
+        self.text        = ""
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Réponses GET données dans l'ordre ; chaque POST délivre un nouveau token."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.tokens   = 0
+        self.auth     = []
+
+    def post(self, url, **kwargs):
+        self.tokens += 1
+        return FakeResponse(200, {"access_token": f"token-{self.tokens}", "expires_in": 3600})
+
+    def get(self, url, headers, timeout):
+        self.auth.append(headers["Authorization"])
+        status = self.statuses.pop(0)
+        return FakeResponse(status, {"short_term": [{"type": "D-1", "values": []}]}, {"Retry-After": "0"})
+
+
+def test_request_window_retries_with_a_fresh_token(monkeypatch):
+    monkeypatch.setattr(rte_ingest.time, "sleep", lambda seconds: None)
+    session = FakeSession([401, 503, 200])
+
+    entries = request_window(
+        TokenCache(session=session), RateLimiter(0),
+        datetime(2024, 1, 1), datetime(2024, 1, 2), ["D-1"], session
+    )
+
+    assert entries == [{"type": "D-1", "values": []}]
+    assert session.auth == ["Bearer token-1", "Bearer token-2", "Bearer token-3"]
+
+
+def test_request_window_asks_to_split_a_refused_period():
+    session = FakeSession([400])
+    entries = request_window(
+        TokenCache(session=session), RateLimiter(0),
+        datetime(2024, 1, 1), datetime(2024, 3, 1), ["REALISED"], session
+    )
+    assert entries is None
+
+
+def paris(*args):
+    return PARIS_TZ.localize(datetime(*args))
+
+
+def assert_disjoint_cover(windows, ranges, max_days):
+    for (_, previous_end), (start, _) in zip(windows, windows[1:]):
+        assert previous_end <= start
+    for start, end in windows:
+        assert 0 < (end - start).days <= max_days
+    for start, end in ranges:
+        hour = start
+        while hour < end:
+            assert any(PARIS_TZ.localize(w_start) <= hour < PARIS_TZ.localize(w_end) for w_start, w_end in windows)
+            hour += timedelta(hours=1)
+
+
+def test_adjacent_gaps_share_windows_without_overlap():
+    # Trois trous qui se touchent (fin de l'un = début du suivant), 9 jours au total
+    ranges = [
+        (paris(2024, 1, 1), paris(2024, 1, 4, 12)),
+        (paris(2024, 1, 4, 12), paris(2024, 1, 7)),
+        (paris(2024, 1, 7), paris(2024, 1, 10)),
+    ]
+    windows = plan_windows(ranges, max_days=4)
+    assert windows == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 5)),
+        (datetime(2024, 1, 5), datetime(2024, 1, 9)),
+        (datetime(2024, 1, 9), datetime(2024, 1, 10)),
+    ]
+    assert_disjoint_cover(windows, ranges, 4)
+
+
+def test_overlapping_gap_past_the_window_does_not_overlap_it():
+    # Le deuxième trou commence dans la première fenêtre mais finit au-delà
+    ranges = [(paris(2024, 1, 1), paris(2024, 1, 2)), (paris(2024, 1, 3), paris(2024, 1, 12))]
+    windows = plan_windows(ranges, max_days=5)
+    assert windows == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 6)),
+        (datetime(2024, 1, 6), datetime(2024, 1, 11)),
+        (datetime(2024, 1, 11), datetime(2024, 1, 12)),
+    ]
+    assert_disjoint_cover(windows, ranges, 5)
+
+
+def test_distant_gaps_get_their_own_windows():
+    ranges = [(paris(2024, 1, 1, 3), paris(2024, 1, 1, 5)), (paris(2024, 3, 1, 22), paris(2024, 3, 2, 1))]
+    assert plan_windows(ranges, max_days=10) == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 2)),
+        (datetime(2024, 3, 1), datetime(2024, 3, 3)),
+    ]
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from rte_series import hourly_series, parse_short_term
+
+
+def short_term_block(series_type, day, drop=()):
+    """Bloc short_term 15 min couvrant le jour local `day` (heure de Paris)."""
+    start    = pd.Timestamp(day).tz_localize("Europe/Paris")
+    end      = (pd.Timestamp(day) + pd.Timedelta(days=1)).tz_localize("Europe/Paris")
+    quarters = pd.date_range(start, end, freq="15min", inclusive="left")
+    values   = [
+        {"start_date": ts.isoformat(), "value": 1000 + i}
+        for i, ts in enumerate(quarters) if ts.isoformat() not in drop
+    ]
+    return {"type": series_type, "values": values}
+
+
+def test_hourly_series_keeps_both_october_two_oclock_hours():
+    hourly = hourly_series(parse_short_term([short_term_block("REALISED", "2024-10-27"),
+                                             short_term_block("D-1", "2024-10-27")]))
+    assert hourly.groupby("series_type").size().to_dict() == {"D-1": 25, "REALISED": 25}
+    realised = hourly[hourly["series_type"] == "REALISED"]
+    assert list(realised["start_date"][2:4]) == ["2024-10-27T02:00:00+02:00", "2024-10-27T02:00:00+01:00"]
+    assert realised["mean_value_hourly"].iloc[0] == 1001.5
+
+
+def test_hourly_series_skips_hours_without_values():
+    block = short_term_block("D-1", "2024-06-15", drop={f"2024-06-15T05:{m:02d}:00+02:00" for m in (0, 15, 30, 45)})
+    hourly = hourly_series(parse_short_term([block]))
+    assert len(hourly) == 23
+    assert "2024-06-15T05:00:00+02:00" not in set(hourly["start_date"])